@@ -0,0 +1,172 @@
+"""
+Faux serveur HTTP Shwary pour les benchmarks.
+
+Le serveur imite les deux endpoints utilisés par le SDK :
+- POST .../payment/[sandbox/]<PAYS>  -> initiation d'un paiement
+- GET  .../transactions/<id>         -> lecture du statut
+
+Il permet de configurer une latence artificielle, un taux d'erreur (réponses 500)
+et une progression de statuts (ex. "pending,pending,completed") appliquée à chaque
+lecture successive d'une même transaction.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from shwary import Shwary, ShwaryAsync
+
+PAYMENT_RE = re.compile(r"/payment/(?:sandbox/)?(?P<country>[A-Z]+)/?$")
+TRANSACTION_RE = re.compile(r"/transactions/(?P<id>[^/]+)/?$")
+
+
+class FakeShwaryServer:
+    """
+    Serveur Shwary local démarré dans un thread.
+
+    Usage:
+        with FakeShwaryServer(latency=0.05, error_rate=0.01) as server:
+            client = server.client()
+            client.initiate_payment(country="DRC", amount=5000, phone_number="+243...")
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        progression: tuple[str, ...] = ("pending", "completed"),
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.progression = tuple(progression)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # shwary_id -> nombre de lectures déjà servies
+        self._reads: dict[str, int] = {}
+        self.requests_count = 0
+        self.errors_count = 0
+        self._httpd = None
+        self._thread = None
+
+    # --- Cycle de vie ---
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1/merchants"
+
+    def start(self) -> "FakeShwaryServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sans cela, Nagle + ACK retardé ajoutent ~40ms à chaque réponse keep-alive
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def log_message(self, format, *args):
+                # Silence : le serveur est sollicité des milliers de fois
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeShwaryServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    # --- Clients pointant vers le serveur ---
+
+    def client(self, timeout: float = 30.0) -> Shwary:
+        """Retourne un client sync du SDK redirigé vers ce serveur."""
+        client = Shwary(merchant_id="bench", merchant_key="bench", is_sandbox=True, timeout=timeout)
+        client._client.close()
+        client._client = httpx.Client(base_url=self.url, timeout=timeout, headers=client.headers)
+        return client
+
+    def async_client(self, timeout: float = 30.0) -> ShwaryAsync:
+        """Retourne un client async du SDK redirigé vers ce serveur."""
+        client = ShwaryAsync(merchant_id="bench", merchant_key="bench", is_sandbox=True, timeout=timeout)
+        client._client = httpx.AsyncClient(base_url=self.url, timeout=timeout, headers=client.headers)
+        return client
+
+    # --- Logique des endpoints ---
+
+    def status_for(self, shwary_id: str) -> str:
+        """Statut servi à la prochaine lecture de `shwary_id` (avance la progression)."""
+        with self._lock:
+            reads = self._reads.get(shwary_id, 0)
+            self._reads[shwary_id] = reads + 1
+        return self.progression[min(reads, len(self.progression) - 1)]
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = json.loads(handler.rfile.read(length) or b"{}") if length else {}
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests_count += 1
+            failed = self.error_rate and self._random.random() < self.error_rate
+            if failed:
+                self.errors_count += 1
+
+        if failed:
+            return self._reply(handler, 500, {"message": "Fake upstream error"})
+
+        now = datetime.now(timezone.utc).isoformat()
+
+        if method == "POST" and (match := PAYMENT_RE.search(handler.path)):
+            shwary_id = str(uuid.uuid4())
+            return self._reply(handler, 200, {
+                "id": shwary_id,
+                "status": self.progression[0],
+                "amount": body.get("amount"),
+                "isSandbox": "/sandbox/" in handler.path,
+                "country": match["country"],
+                "createdAt": now,
+            })
+
+        if method == "GET" and (match := TRANSACTION_RE.search(handler.path)):
+            shwary_id = match["id"]
+            return self._reply(handler, 200, {
+                "id": shwary_id,
+                "status": self.status_for(shwary_id),
+                "amount": 5000,
+                "updatedAt": now,
+            })
+
+        return self._reply(handler, 404, {"message": "Not found"})
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, status: int, data: dict) -> None:
+        payload = json.dumps(data).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
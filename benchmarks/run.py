@@ -0,0 +1,320 @@
+"""
+Runner de benchmarks dj-shwary.
+
+Mesure, contre un faux serveur Shwary local (voir `fake_server.py`) :
+- le débit de `ShwaryService.make_payment` ;
+- le débit et la latence (p50/p99) du webhook `ShwaryWebhookView` ;
+- le débit (lignes/s) de `check_pending_pay` pour plusieurs tailles de backlog ;
+- le nombre de requêtes SQL de la changelist admin.
+
+Les résultats sont écrits en JSON pour comparer les versions entre elles :
+
+    python -m benchmarks.run --output bench-0.1.6.json
+    python -m benchmarks.run --output bench-new.json --compare bench-0.1.6.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+# Métriques pour lesquelles une valeur plus grande est meilleure
+HIGHER_IS_BETTER = ("ops_per_second", "rows_per_second", "requests_per_second")
+
+
+def percentile_ms(samples: list[float], pct: float) -> float:
+    """Percentile de `samples` (secondes), en ms."""
+    from dj_shwary.utils import percentile
+
+    return round(percentile(samples, pct) * 1000, 3)
+
+
+def summarize(samples: list[float], elapsed: float, rate_key: str) -> dict:
+    return {
+        "operations": len(samples),
+        "seconds": round(elapsed, 4),
+        rate_key: round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": percentile_ms(samples, 50),
+        "p99_ms": percentile_ms(samples, 99),
+    }
+
+
+def setup_django() -> None:
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    db_name = settings.DATABASES["default"]["NAME"]
+    if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3") and os.path.exists(db_name):
+        os.remove(db_name)
+
+    django.setup()
+    call_command("migrate", verbosity=0, interactive=False)
+
+
+def reset_transactions() -> None:
+    from dj_shwary.models import ShwaryTransaction
+
+    ShwaryTransaction.objects.all().delete()
+
+
+def get_user(username: str = "bench"):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(username=username)
+    return user
+
+
+def seed_pending(count: int, age_minutes: int = 30, prefix: str = "BENCH") -> None:
+    """Insère `count` transactions PENDING, antidatées de `age_minutes`."""
+    from django.contrib.contenttypes.models import ContentType
+    from dj_shwary.models import ShwaryTransaction
+
+    user = get_user()
+    content_type = ContentType.objects.get_for_model(user)
+    batch = [
+        ShwaryTransaction(
+            shwary_id=f"{prefix}-{i}",
+            amount=5000,
+            phone_number="+243972345678",
+            content_type=content_type,
+            object_id=str(user.pk),
+            status=ShwaryTransaction.Status.PENDING,
+        )
+        for i in range(count)
+    ]
+    ShwaryTransaction.objects.bulk_create(batch, batch_size=2000)
+    ShwaryTransaction.objects.update(created_at=datetime.now(dt_timezone.utc) - timedelta(minutes=age_minutes))
+
+
+# --- Benchmarks ---
+
+
+def bench_make_payment(server, iterations: int) -> dict:
+    from dj_shwary.services import ShwaryService
+
+    reset_transactions()
+    user = get_user()
+    service = ShwaryService(client=server.client())
+    samples, failures = [], 0
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            service.make_payment(related_object=user, amount=5000, phone_number="+243972345678")
+        except Exception:
+            failures += 1
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples, elapsed, "ops_per_second")
+    result["failures"] = failures
+    return result
+
+
+def bench_webhook(server, iterations: int) -> dict:
+    from django.test import Client
+    from django.urls import reverse
+    from dj_shwary.services import ShwaryService
+
+    reset_transactions()
+    seed_pending(iterations, prefix="WH")
+    client = Client()
+    url = reverse("dj_shwary:shwary-webhook")
+    upstream = server.client()
+    samples, statuses = [], {}
+
+    with mock.patch("dj_shwary.views.ShwaryService", lambda *a, **kw: ShwaryService(client=upstream)):
+        started = time.perf_counter()
+        for i in range(iterations):
+            body = json.dumps({"id": f"WH-{i}", "status": "completed"})
+            t0 = time.perf_counter()
+            response = client.post(url, data=body, content_type="application/json")
+            samples.append(time.perf_counter() - t0)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        elapsed = time.perf_counter() - started
+
+    result = summarize(samples, elapsed, "requests_per_second")
+    result["status_codes"] = statuses
+    return result
+
+
+def bench_check_pending(server, sizes: list[int]) -> dict:
+    from django.core.management import call_command
+
+    results = {}
+    upstream = server.client()
+    for size in sizes:
+        reset_transactions()
+        seed_pending(size, prefix=f"CP{size}")
+        with mock.patch("dj_shwary.management.commands.check_pending_pay.get_client", return_value=upstream):
+            started = time.perf_counter()
+            call_command("check_pending_pay", older_than=5, stdout=StringIO())
+            elapsed = time.perf_counter() - started
+        results[str(size)] = {
+            "rows": size,
+            "seconds": round(elapsed, 4),
+            "rows_per_second": round(size / elapsed, 2) if elapsed else 0.0,
+        }
+    return results
+
+
+def bench_admin_changelist(rows: int) -> dict:
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    reset_transactions()
+    seed_pending(rows, prefix="ADM")
+    User = get_user_model()
+    admin_user, _ = User.objects.get_or_create(
+        username="bench-admin", defaults={"is_staff": True, "is_superuser": True}
+    )
+    client = Client()
+    client.force_login(admin_user)
+    url = "/admin/dj_shwary/shwarytransaction/"
+
+    # Premier appel à blanc pour remplir les caches (ContentType, Site...)
+    client.get(url)
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rows": rows,
+        "status_code": response.status_code,
+        "queries": len(ctx.captured_queries),
+        "seconds": round(elapsed, 4),
+    }
+
+
+# --- Comparaison ---
+
+
+def flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Retourne la liste des régressions dépassant `threshold` (ex. 0.10 = 10%)."""
+    regressions = []
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    for name, old_value in old.items():
+        if name not in new or not old_value:
+            continue
+        metric = name.rsplit(".", 1)[-1]
+        if metric not in HIGHER_IS_BETTER and not metric.endswith("_ms") and metric != "queries":
+            continue
+        change = (new[name] - old_value) / old_value
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        if worse > threshold:
+            regressions.append(f"{name}: {old_value} -> {new[name]} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench-results.json", help="Fichier JSON de sortie")
+    parser.add_argument("--compare", help="Fichier JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Seuil de régression (défaut: 0.10)")
+    parser.add_argument("--payments", type=int, default=200, help="Nombre d'appels make_payment")
+    parser.add_argument("--webhooks", type=int, default=500, help="Nombre de webhooks envoyés")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tailles de backlog pour check_pending_pay")
+    parser.add_argument("--admin-rows", type=int, default=100, help="Lignes affichées dans la changelist")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence du faux serveur Shwary")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Taux de réponses 500 du faux serveur")
+    parser.add_argument("--progression", default="completed", help="Progression des statuts (ex. pending,completed)")
+    parser.add_argument("--only", help="Benchmarks à lancer (make_payment,webhook,check_pending_pay,admin_changelist)")
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    import django
+    from django.db import connection
+    from dj_shwary import __version__
+    from benchmarks.fake_server import FakeShwaryServer
+
+    selected = set(args.only.split(",")) if args.only else None
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    config = {
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "progression": args.progression,
+        "payments": args.payments,
+        "webhooks": args.webhooks,
+        "sizes": sizes,
+        "admin_rows": args.admin_rows,
+    }
+    results = {}
+
+    with FakeShwaryServer(
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        progression=tuple(args.progression.split(",")),
+        seed=42,
+    ) as server:
+        benches = {
+            "make_payment": lambda: bench_make_payment(server, args.payments),
+            "webhook": lambda: bench_webhook(server, args.webhooks),
+            "check_pending_pay": lambda: bench_check_pending(server, sizes),
+            "admin_changelist": lambda: bench_admin_changelist(args.admin_rows),
+        }
+        for name, bench in benches.items():
+            if selected and name not in selected:
+                continue
+            print(f"> {name}...", flush=True)
+            results[name] = bench()
+            print(f"  {json.dumps(results[name])}", flush=True)
+
+    report = {
+        "meta": {
+            "dj_shwary": __version__,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(),
+            "config": config,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Résultats écrits dans {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Régressions détectées :")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("Aucune régression au-delà du seuil.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Settings Django utilisés par le runner de benchmarks.
+
+La base SQLite est un fichier (et non `:memory:`) pour que les threads du serveur
+de test et du runner partagent les mêmes données. `SHWARY_BENCH_DB` permet de
+pointer vers un autre fichier. Pour mesurer PostgreSQL, copiez ce module et
+surchargez `DATABASES`, puis passez-le via `DJANGO_SETTINGS_MODULE`.
+"""
+
+import os
+import tempfile
+
+SECRET_KEY = "bench-key"
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.sites",
+    "dj_shwary",
+]
+
+MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "SHWARY_BENCH_DB", os.path.join(tempfile.gettempdir(), "dj_shwary_bench.sqlite3")
+        ),
+        "OPTIONS": {"timeout": 30},
+    }
+}
+
+SITE_ID = 1
+USE_TZ = True
+ROOT_URLCONF = "benchmarks.urls"
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+SHWARY = {
+    "MERCHANT_ID": "bench",
+    "MERCHANT_KEY": "bench",
+    "SANDBOX": True,
+}
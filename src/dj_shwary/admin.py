@@ -1,11 +1,21 @@
 import json
+import re
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 
-from .models import ShwaryTransaction
+from . import exports
+from .badges import admin_badge_html
+from .models import ShwaryDailyRollup, ShwaryTask, ShwaryTrace, ShwaryTransaction
+from .reconciliation import apply_status, refresh_record
+from .settlements import collect_settlements
+
+PHONE_SEARCH_RE = re.compile(r"\+?[\d\s().-]{9,}")
+
 
 @admin.register(ShwaryTransaction)
 class ShwaryTransactionAdmin(admin.ModelAdmin):
@@ -19,8 +29,9 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
         'created_at'
     )
     
-    list_filter = ('status', 'is_sandbox', 'currency', 'created_at')
+    list_filter = ('status', 'settled_via', 'is_sandbox', 'merchant', 'country', 'currency', 'created_at')
     
+    # Numéros complets : voir aussi get_search_results (index sur phone_normalized)
     search_fields = (
         'shwary_id', 
         'phone_number', 
@@ -29,11 +40,21 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
     )
     
     date_hierarchy = 'created_at'
+
+    # Pas de COUNT(*) sur toute la table à chaque affichage filtré
+    # (les totaux sont dans les agrégats journaliers)
+    show_full_result_count = False
     
-    # Configuration du formulaire de détail
+    # Configuration du formulaire de détail. Le statut n'est pas éditable : un
+    # save() direct contournerait set_status (settled_at, signaux, cache d'état).
+    # Les corrections manuelles passent par les actions "Marquer comme...".
     readonly_fields = (
+        'status',
         'created_at', 
         'updated_at', 
+        'initiated_at',
+        'settled_at',
+        'settled_via',
         'shwary_id', 
         'pretty_raw_response', # JSON formaté
         'related_object_link_detail'
@@ -41,13 +62,15 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
 
     fieldsets = (
         (_("Identifiants"), {
-            'fields': ('shwary_id', 'is_sandbox', 'related_object_link_detail')
+            'fields': ('shwary_id', 'merchant', 'country', 'is_sandbox', 'related_object_link_detail')
         }),
         (_("Finances"), {
             'fields': ('amount', 'currency', 'phone_number')
         }),
         (_("État"), {
-            'fields': ('status', 'error_message', 'created_at', 'updated_at')
+            'fields': (
+                'status', 'error_message', 'created_at', 'initiated_at', 'settled_at', 'settled_via', 'updated_at'
+            )
         }),
         (_("Données Techniques"), {
             'classes': ('collapse',), # Caché par défaut pour ne pas polluer
@@ -56,11 +79,29 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        # On pré-charge le content_type pour que related_object_link ne fasse pas une requête par ligne
-        return super().get_queryset(request).select_related('content_type')
+        # On pré-charge le content_type et les objets liés (une requête par type de contenu)
+        # pour que related_object_link ne fasse pas une requête par ligne
+        queryset = super().get_queryset(request).select_related('content_type').prefetch_related('content_object')
+
+        # L'affichage de la liste est une lecture sans risque : réplica si SHWARY["READ_DATABASE"]
+        # est défini. Les POST de la liste (actions, dont delete_selected, et list_editable)
+        # reçoivent ce même queryset et écrivent : ils restent, comme le formulaire, sur le primaire.
+        match = request.resolver_match
+        if request.method in ('GET', 'HEAD') and match and match.url_name and match.url_name.endswith('_changelist'):
+            queryset = queryset.for_reads()
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # Un numéro complet, quelle que soit sa saisie ("097...", "+243 97..."), est aussi
+        # cherché par égalité sur le numéro normalisé, en plus de la recherche par défaut
+        # (shwary_id, object_id, numéros partiels)
+        if PHONE_SEARCH_RE.fullmatch(search_term.strip()):
+            results = results | queryset.for_phone(search_term)
+        return results, may_have_duplicates
 
     # Actions personnalisées
-    actions = ['refresh_status_from_api']
+    actions = ['refresh_status_from_api', 'mark_completed', 'mark_failed', 'export_csv']
 
     @admin.action(description=_("🔄 Mettre à jour le statut depuis l'API Shwary"))
     def refresh_status_from_api(self, request, queryset):
@@ -71,17 +112,53 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
         success_count = 0
         errors_count = 0
 
-        for txn in queryset:
-            if txn.refresh_from_api():
-                success_count += 1
-            else:
-                errors_count += 1
+        # Records légers : seules les transactions dont le statut change sont chargées en entier.
+        # Les paiements réglés sont aussi annoncés en un seul payments_settled_bulk.
+        with collect_settlements(sender=self.__class__):
+            for record in queryset.select_related(None).prefetch_related(None).records():
+                if refresh_record(record, via=ShwaryTransaction.SettledVia.ADMIN):
+                    success_count += 1
+                else:
+                    errors_count += 1
         
         if success_count:
             self.message_user(request, f"{success_count} transactions mises à jour.", messages.SUCCESS)
         if errors_count:
             self.message_user(request, f"{errors_count} erreurs lors de la mise à jour.", messages.ERROR)
 
+    @admin.action(description=_("✅ Marquer comme réussies"), permissions=['change'])
+    def mark_completed(self, request, queryset):
+        self.apply_manual_status(request, queryset, ShwaryTransaction.Status.COMPLETED)
+
+    @admin.action(description=_("❌ Marquer comme échouées"), permissions=['change'])
+    def mark_failed(self, request, queryset):
+        self.apply_manual_status(request, queryset, ShwaryTransaction.Status.FAILED)
+
+    def apply_manual_status(self, request, queryset, status):
+        """
+        Correction manuelle : même chemin que le rattrapage (verrou sur le primaire,
+        set_status), avec settled_via="admin", les signaux et le cache d'état.
+        """
+        changed = 0
+        with collect_settlements(sender=self.__class__):
+            for record in queryset.select_related(None).prefetch_related(None).records():
+                if apply_status(record, status, sender=self.__class__, via=ShwaryTransaction.SettledVia.ADMIN):
+                    changed += 1
+        self.message_user(request, f"{changed} transactions passées au statut « {status} ».", messages.SUCCESS)
+
+    @admin.action(description=_("📄 Exporter en CSV"))
+    def export_csv(self, request, queryset):
+        """
+        Export en flux (voir dj_shwary.exports) : lecture par paquets et envoi
+        immédiat, quelle que soit la taille de la sélection.
+        """
+        # Seules les colonnes exportées sont lues : pas de pré-chargement des objets liés
+        queryset = queryset.select_related(None).prefetch_related(None)
+        response = StreamingHttpResponse(exports.export(queryset), content_type="text/csv; charset=utf-8")
+        filename = f"shwary-transactions-{timezone.now():%Y%m%d-%H%M%S}.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     # Méthodes d'affichage (Badges & Liens)
 
     def amount_display(self, obj):
@@ -89,18 +166,8 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
     amount_display.short_description = _("Montant")
 
     def status_badge(self, obj):
-        """Affiche un badge coloré selon le statut."""
-        colors = {
-            'completed': 'green',
-            'failed': 'red',
-            'cancelled': 'gray',
-            'pending': 'orange',
-            'refunded': 'purple',
-        }
-        color = colors.get(obj.status, 'black')
-        # Style CSS simple injecté
-        style = f"background-color: {color}; color: white; padding: 3px 10px; border-radius: 10px; font-weight: bold;"
-        return format_html('<span style="{}">{}</span>', style, obj.get_status_display())
+        """Affiche un badge coloré selon le statut (HTML pré-calculé, voir badges.py)."""
+        return admin_badge_html(obj.status, obj.get_status_display())
     status_badge.short_description = _("Statut")
 
     def related_object_link(self, obj):
@@ -136,4 +203,50 @@ class ShwaryTransactionAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         if obj and obj.status == 'completed' and not request.user.is_superuser:
             return False
-        return super().has_delete_permission(request, obj)
\ No newline at end of file
+        return super().has_delete_permission(request, obj)
+
+
+@admin.register(ShwaryTask)
+class ShwaryTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'last_error', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('name', 'kwargs', 'attempts', 'last_error', 'created_at', 'updated_at')
+
+
+@admin.register(ShwaryDailyRollup)
+class ShwaryDailyRollupAdmin(admin.ModelAdmin):
+    """Agrégats journaliers, en lecture seule (voir `shwary_rebuild_rollups`)."""
+
+    list_display = ('day', 'currency', 'status_badge', 'is_sandbox', 'count', 'amount')
+    list_filter = ('currency', 'status', 'is_sandbox')
+    date_hierarchy = 'day'
+
+    def status_badge(self, obj):
+        return admin_badge_html(obj.status, obj.get_status_display())
+    status_badge.short_description = _("Statut")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ShwaryTrace)
+class ShwaryTraceAdmin(admin.ModelAdmin):
+    """Traces des opérations lentes (voir dj_shwary.tracing.DatabaseSink), en lecture seule."""
+
+    list_display = ('name', 'duration_ms', 'sql_count', 'started_at')
+    list_filter = ('name',)
+    date_hierarchy = 'started_at'
+    readonly_fields = ('trace_id', 'name', 'started_at', 'duration_ms', 'sql_count', 'trace')
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -12,4 +12,15 @@ class DjShwaryConfig(AppConfig):
         try:
             import dj_shwary.signals  # noqa: F401
         except ImportError:
-            pass
\ No newline at end of file
+            pass
+
+        # Récepteurs internes (notifications de statut...)
+        import dj_shwary.receivers  # noqa: F401
+
+        # Préchauffage optionnel du pool de connexions (workers web), en arrière-plan
+        from .utils import get_shwary_setting
+
+        if get_shwary_setting("WARMUP", False):
+            from .merchants import warm_up
+
+            warm_up()
\ No newline at end of file
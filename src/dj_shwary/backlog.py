@@ -0,0 +1,110 @@
+"""
+Jauge du backlog de rattrapage, pour dimensionner automatiquement les workers
+`check_pending_pay` (HPA, KEDA...) sans `COUNT(*)` sur toute la table.
+
+    get_backlog()
+    # {"pending": {"total": 1200, "older_than": {"60": 900, "300": 420, ...}, "truncated": False},
+    #  "oldest_pending_age": 5400.2, "tasks": {"queued": 3}, "webhooks": {"in_flight": 2, ...},
+    #  "computed_at": "...", "max_age": 5}
+
+Chaque compteur est une requête bornée (`LIMIT SHWARY["BACKLOG_COUNT_LIMIT"]`,
+défaut 10000) sur l'index (status, created_at) : au-delà de la limite, la
+valeur est plafonnée et `truncated` vaut True, ce qui suffit à un scaler.
+La partie base est partagée via le cache pendant SHWARY["BACKLOG_CACHE_TIMEOUT"]
+secondes (défaut 5) : quel que soit le nombre de pollers, la base voit au plus
+une série de requêtes par intervalle.
+
+Les compteurs de webhooks (en cours, délestés, file du batcher) sont lus en
+mémoire à chaque appel ; hors compteur global (`WEBHOOK_MAX_IN_FLIGHT_GLOBAL`),
+ils ne concernent que le processus qui répond.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .routers import get_read_database
+from .utils import get_shwary_cache, get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "shwary:backlog"
+
+# Seuils d'âge (secondes) des compteurs cumulés "en attente depuis plus de"
+DEFAULT_BUCKETS = (60, 300, 900, 3600, 6 * 3600, 24 * 3600)
+
+
+def capped_count(queryset, limit: int) -> int:
+    # COUNT(*) sur une sous-requête LIMIT : la base s'arrête après `limit` lignes d'index
+    return queryset.order_by().values("pk")[:limit].count()
+
+
+def compute_backlog(using: str | None = None) -> dict:
+    """Partie base de la jauge (sans cache) : transactions en attente et tâches en file."""
+    from .models import ShwaryTask, ShwaryTransaction
+
+    limit = get_shwary_setting("BACKLOG_COUNT_LIMIT", 10_000)
+    buckets = get_shwary_setting("BACKLOG_BUCKETS", DEFAULT_BUCKETS)
+    now = timezone.now()
+
+    pending = ShwaryTransaction.objects.for_reads(using).recent().filter(status=ShwaryTransaction.Status.PENDING)
+    total = capped_count(pending, limit)
+    older_than = {
+        str(seconds): capped_count(pending.filter(created_at__lte=now - timedelta(seconds=seconds)), limit)
+        for seconds in buckets
+    }
+    oldest = pending.order_by("created_at").values_list("created_at", flat=True).first()
+
+    # File de l'initiation différée (DatabaseBackend), index (status, run_after)
+    tasks = ShwaryTask.objects.using(get_read_database(using)).filter(status=ShwaryTask.Status.QUEUED)
+    queued = capped_count(tasks, limit)
+
+    return {
+        "pending": {
+            "total": total,
+            "older_than": older_than,
+            "truncated": total >= limit,
+        },
+        "oldest_pending_age": (now - oldest).total_seconds() if oldest else 0.0,
+        "tasks": {"queued": queued},
+        "computed_at": now.isoformat(),
+    }
+
+
+def get_webhook_depth() -> dict:
+    """Webhooks en cours de traitement (voir dj_shwary.limits) et en file du batcher du processus."""
+    from .batching import get_webhook_batcher
+    from .limits import get_shedding_stats
+
+    depth = dict(get_shedding_stats()["webhook"])
+    batcher = get_webhook_batcher()
+    depth["batch_queue"] = batcher.queue.qsize() if batcher is not None else 0
+    return depth
+
+
+def get_backlog(using: str | None = None, refresh: bool = False) -> dict:
+    """
+    Jauge complète, partie base servie depuis le cache (SHWARY["BACKLOG_CACHE_TIMEOUT"]).
+
+    Args:
+        refresh: Recalcule la partie base même si le cache est frais.
+    """
+    timeout = get_shwary_setting("BACKLOG_CACHE_TIMEOUT", 5)
+    cache = get_shwary_cache()
+    key = f"{CACHE_KEY}:{using or 'default'}"
+
+    backlog = None
+    if not refresh:
+        try:
+            backlog = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Lecture de la jauge de backlog impossible: {e}")
+    if backlog is None:
+        backlog = compute_backlog(using)
+        try:
+            cache.set(key, backlog, timeout)
+        except Exception as e:
+            logger.warning(f"Écriture de la jauge de backlog impossible: {e}")
+
+    return {**backlog, "webhooks": get_webhook_depth(), "max_age": timeout}
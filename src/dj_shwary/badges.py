@@ -0,0 +1,100 @@
+"""
+Rendu des badges de statut.
+
+Le HTML de chaque statut connu est calculé une seule fois (à l'import, puis à
+chaque modification de `settings.SHWARY`) au lieu d'être reconstruit à chaque
+ligne affichée. Les couleurs sont personnalisables :
+
+    SHWARY = {
+        ...,
+        "BADGE_COLORS": {"completed": "#16a34a", "refunded": "#0ea5e9"},
+    }
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.utils.html import format_html
+from django.utils.translation import get_language
+
+# Couleurs du filtre de template (styles inline : fonctionne même sans Bootstrap)
+DEFAULT_COLORS = {
+    'completed': '#10b981',  # Vert Emeraude
+    'failed': '#ef4444',     # Rouge
+    'cancelled': '#6b7280',  # Gris
+    'pending': '#f59e0b',    # Orange
+    'refunded': '#8b5cf6',   # Violet
+}
+DEFAULT_COLOR = '#374151'  # Gris foncé
+
+# Couleurs de l'interface d'administration
+ADMIN_COLORS = {
+    'completed': 'green',
+    'failed': 'red',
+    'cancelled': 'gray',
+    'pending': 'orange',
+    'refunded': 'purple',
+}
+ADMIN_DEFAULT_COLOR = 'black'
+
+BADGE_STYLE = "background-color: {}; color: white; padding: 4px 8px; border-radius: 9999px; font-size: 0.75rem; font-weight: 600;"
+ADMIN_BADGE_STYLE = "background-color: {}; color: white; padding: 3px 10px; border-radius: 10px; font-weight: bold;"
+
+_badges: dict[str, str] = {}
+_admin_colors: dict[str, str] = {}
+# (statut, langue) -> HTML ; le libellé admin est traduit, d'où la clé par langue
+_admin_badges: dict[tuple[str, str], str] = {}
+
+
+def _render(style: str, color: str, label) -> str:
+    return format_html('<span style="{}">{}</span>', style.format(color), label)
+
+
+def build_badges() -> None:
+    """(Re)calcule le HTML des badges pour tous les statuts connus."""
+    custom = getattr(settings, "SHWARY", {}).get("BADGE_COLORS", {})
+
+    colors = {**DEFAULT_COLORS, **custom}
+    _badges.clear()
+    for status, color in colors.items():
+        _badges[status] = _render(BADGE_STYLE, color, status.capitalize())
+
+    _admin_colors.clear()
+    _admin_colors.update({**ADMIN_COLORS, **custom})
+    _admin_badges.clear()
+
+
+def status_badge_html(status) -> str:
+    """Badge HTML (SafeString) pour un statut, utilisé par le filtre `shwary_badge`."""
+    key = str(status).lower()
+    badge = _badges.get(key)
+    if badge is None:
+        badge = _render(BADGE_STYLE, DEFAULT_COLOR, str(status).capitalize())
+    return badge
+
+
+def admin_badge_html(status: str, label) -> str:
+    """Badge HTML pour l'admin (libellé traduit, mis en cache par langue)."""
+    key = (status, get_language())
+    badge = _admin_badges.get(key)
+    if badge is None:
+        badge = _render(ADMIN_BADGE_STYLE, _admin_colors.get(status, ADMIN_DEFAULT_COLOR), label)
+        _admin_badges[key] = badge
+    return badge
+
+
+def badge_cache_key(transaction) -> str:
+    """
+    Clé de cache d'un fragment de template pour une transaction,
+    basée sur (id, statut, updated_at) : elle change dès que le statut change.
+    """
+    updated_at = transaction.updated_at.timestamp() if transaction.updated_at else ""
+    return f"{transaction.pk}:{transaction.status}:{updated_at}"
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting == "SHWARY":
+        build_badges()
+
+
+setting_changed.connect(_on_setting_changed)
+build_badges()
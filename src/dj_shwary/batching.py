@@ -0,0 +1,235 @@
+"""
+Vérification groupée des webhooks (micro-batching).
+
+Par défaut, chaque webhook fait son propre appel `get_transaction` et sa propre
+transaction en base. En rafale, des centaines de callbacks arrivent dans la
+même seconde : avec
+
+    SHWARY = {
+        ...,
+        "WEBHOOK_BATCH_WINDOW_MS": 20,      # active le mode groupé
+        "WEBHOOK_BATCH_MAX_SIZE": 100,      # taille maximale d'un lot
+        "WEBHOOK_BATCH_CONCURRENCY": 20,    # appels API simultanés par lot
+        "WEBHOOK_BATCH_TIMEOUT": 30,        # attente maximale d'une requête (s)
+    }
+
+les requêtes reçues pendant la fenêtre sont confiées à un thread par processus
+qui vérifie tous les identifiants en parallèle via le client async (une boucle
+d'événements et des connexions conservées d'un lot à l'autre), applique toutes
+les mises à jour dans une seule transaction, puis répond à chaque requête avec
+son propre résultat.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from django.db import close_old_connections
+from django.db import transaction as db_transaction
+
+from . import hedging, tracing
+from .merchants import get_merchant, new_async_client
+from .routers import get_write_database
+from .settlements import collect_settlements
+from .utils import get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+
+def default_client_factory(merchant: str):
+    """Client async d'un marchand (connexions conservées d'un lot à l'autre par le batcher)."""
+    return new_async_client(get_merchant(merchant))
+
+
+@dataclass
+class WebhookItem:
+    shwary_id: str
+    claimed_status: str
+    sender: type | None = None
+    future: Future = field(default_factory=Future)
+
+
+class WebhookBatcher:
+    """Regroupe les vérifications de webhooks d'un processus (voir le docstring du module)."""
+
+    def __init__(self, window_ms: float = 20, max_size: int = 100, concurrency: int = 20, client_factory=None):
+        """
+        Args:
+            client_factory: `client_factory(merchant)` retourne le client async utilisé pour
+                vérifier les webhooks du marchand (défaut : client Shwary configuré ; un stub
+                pour les tests de charge).
+        """
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.concurrency = concurrency
+        self.client_factory = client_factory or default_client_factory
+        self.queue: queue.Queue[WebhookItem] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._clients: dict = {}
+
+    def submit(self, shwary_id: str, claimed_status: str, sender=None) -> Future:
+        """Ajoute un webhook au prochain lot ; le Future reçoit (code HTTP, corps)."""
+        self._ensure_started()
+        item = WebhookItem(shwary_id, claimed_status, sender)
+        self.queue.put(item)
+        return item.future
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="shwary-webhook-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            items = self.collect()
+            try:
+                self.flush(items)
+            except Exception as e:
+                logger.exception(f"Erreur critique lors du traitement d'un lot de webhooks: {e}")
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_result((500, "Internal Error"))
+            finally:
+                close_old_connections()
+
+    def collect(self) -> list[WebhookItem]:
+        """Attend un premier webhook, puis ceux qui arrivent pendant la fenêtre."""
+        items = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(items) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def flush(self, items: list[WebhookItem]) -> None:
+        """Vérifie et applique un lot, puis résout le Future de chaque requête."""
+        with tracing.operation("webhook.batch", size=len(items)), collect_settlements(sender=type(self)):
+            self._flush(items)
+
+    def _flush(self, items: list[WebhookItem]) -> None:
+        from .models import ShwaryTransaction
+
+        ids = {item.shwary_id for item in items}
+        merchants = dict(
+            ShwaryTransaction.objects.on_primary()
+            .recent()
+            .filter(shwary_id__in=ids)
+            .values_list("shwary_id", "merchant")
+        )
+        with tracing.span("shwary.verify_all", count=len(merchants)):
+            responses = self.run_async(self.verify_all(merchants))
+
+        results: dict[str, tuple[int, str]] = {}
+        claimed = {item.shwary_id: item for item in items}
+        with db_transaction.atomic(using=get_write_database(ShwaryTransaction)):
+            with tracing.span("lock.select_for_update"):
+                txns = {
+                    txn.shwary_id: txn
+                    for txn in ShwaryTransaction.objects.select_for_update().recent().filter(
+                        shwary_id__in=[shwary_id for shwary_id, r in responses.items() if not isinstance(r, Exception)]
+                    )
+                }
+            for shwary_id in ids:
+                response = responses.get(shwary_id)
+                if isinstance(response, Exception):
+                    logger.error(f"Impossible de vérifier le statut auprès de l'API Shwary pour {shwary_id}: {response}")
+                    results[shwary_id] = (500, "Verification failed, try again later")
+                    continue
+
+                txn = txns.get(shwary_id)
+                if txn is None:
+                    logger.warning(f"Transaction {shwary_id} introuvable localement (Webhook arrivé trop vite).")
+                    results[shwary_id] = (404, "Transaction not found yet")
+                    continue
+
+                real_status = response.status.lower()
+                item = claimed[shwary_id]
+                if real_status != item.claimed_status:
+                    logger.warning(
+                        f"ALERTE SÉCURITÉ : Discordance détectée pour {shwary_id} ! "
+                        f"Webhook: '{item.claimed_status}' vs API: '{real_status}'. "
+                        f"La valeur de l'API est retenue."
+                    )
+
+                try:
+                    # Un point de sauvegarde par transaction : un receiver en
+                    # erreur n'annule pas les autres mises à jour du lot.
+                    with db_transaction.atomic(using=get_write_database(ShwaryTransaction)):
+                        txn.set_status(
+                            real_status,
+                            response.model_dump(mode="json"),
+                            sender=item.sender,
+                            via=ShwaryTransaction.SettledVia.WEBHOOK,
+                        )
+                    results[shwary_id] = (200, "OK")
+                except Exception as e:
+                    logger.exception(f"Erreur critique lors de l'enregistrement du webhook {shwary_id}: {e}")
+                    results[shwary_id] = (500, "Internal Error")
+
+        for item in items:
+            item.future.set_result(results[item.shwary_id])
+
+    def run_async(self, coro):
+        # Boucle conservée entre les lots : les clients async (et leurs connexions) lui sont liés
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def async_client(self, merchant: str):
+        client = self._clients.get(merchant)
+        if client is None:
+            client = self._clients[merchant] = self.client_factory(merchant)
+        return client
+
+    async def verify_all(self, merchants: dict[str, str]) -> dict:
+        """Vérifie les identifiants en parallèle ; {shwary_id: réponse ou exception}."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def verify(shwary_id, merchant):
+            async with semaphore:
+                try:
+                    get_transaction = self.async_client(merchant).get_transaction
+                    return shwary_id, await hedging.acall(
+                        get_transaction, shwary_id, deadline=get_shwary_setting("VERIFY_DEADLINE")
+                    )
+                except Exception as e:
+                    return shwary_id, e
+
+        pairs = await asyncio.gather(*(verify(shwary_id, merchant) for shwary_id, merchant in merchants.items()))
+        return dict(pairs)
+
+
+_batcher: WebhookBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+def get_webhook_batcher() -> WebhookBatcher | None:
+    """Batcher du processus, ou None si SHWARY["WEBHOOK_BATCH_WINDOW_MS"] n'est pas défini."""
+    global _batcher
+
+    window_ms = get_shwary_setting("WEBHOOK_BATCH_WINDOW_MS")
+    if not window_ms:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = WebhookBatcher(
+                    window_ms=window_ms,
+                    max_size=get_shwary_setting("WEBHOOK_BATCH_MAX_SIZE", 100),
+                    concurrency=get_shwary_setting("WEBHOOK_BATCH_CONCURRENCY", 20),
+                )
+    return _batcher
@@ -0,0 +1,255 @@
+"""
+Requêtes de vérification "couvertes" (hedging) et délai maximal.
+
+La vérification par référence (`get_transaction`) attend normalement jusqu'au
+TIMEOUT du client : quelques réponses lentes de Shwary suffisent à dégrader
+le p99 du webhook. En mode hedging, si la première requête n'a pas répondu
+après le délai observé au percentile choisi, une seconde lecture identique
+est envoyée et la première réponse l'emporte :
+
+    SHWARY = {
+        ...,
+        "HEDGE": True,
+        "HEDGE_PERCENTILE": 95,     # délai = p95 des latences récentes
+        "HEDGE_AFTER_MS": 300,      # délai tant qu'il n'y a pas assez d'échantillons
+        "VERIFY_DEADLINE": 5.0,     # délai maximal d'une vérification (s), optionnel
+    }
+
+Seules les lectures (`get_transaction`) sont couvertes, jamais `initiate_payment`.
+Le délai maximal peut aussi être fixé par appel : `ShwaryService(deadline=2.0)`.
+Les compteurs sont exposés par `get_hedging_stats()`.
+
+Les appels partent dans un pool de SHWARY["HEDGE_MAX_WORKERS"] threads (défaut 32)
+par processus, sans file d'attente : un appel abandonné (couvert ou hors délai)
+garde son thread jusqu'à la réponse de Shwary. Quand une panne lente occupe tout
+le pool, aucune requête de couverture n'est envoyée et une vérification est
+refusée immédiatement (`PoolSaturated`) au lieu d'attendre un thread sans que
+cette attente ne compte dans le délai.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .utils import get_shwary_setting, percentile
+
+MIN_SAMPLES = 20
+
+
+class DeadlineExceeded(TimeoutError):
+    """Aucune réponse de Shwary avant le délai maximal de la vérification."""
+
+
+class PoolSaturated(DeadlineExceeded):
+    """Tous les threads du pool attendent déjà Shwary : vérification refusée sans attendre."""
+
+
+class HedgingStats:
+    def __init__(self, size: int = 500):
+        self.latencies: deque[float] = deque(maxlen=size)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.saturated = 0
+        self.lock = threading.Lock()
+
+    def incr(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_latency(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """Délai (s) avant d'envoyer la requête de couverture."""
+        with self.lock:
+            samples = list(self.latencies)
+        if len(samples) < MIN_SAMPLES:
+            return get_shwary_setting("HEDGE_AFTER_MS", 300) / 1000
+        return percentile(samples, get_shwary_setting("HEDGE_PERCENTILE", 95))
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "saturated": self.saturated,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "samples": len(self.latencies),
+        }
+
+
+stats = HedgingStats()
+
+_executor: ThreadPoolExecutor | None = None
+# Un jeton par thread du pool, rendu quand l'appel se termine réellement
+_slots: threading.BoundedSemaphore | None = None
+_executor_lock = threading.Lock()
+
+
+def get_hedging_stats() -> dict:
+    return stats.as_dict()
+
+
+def _get_executor() -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = get_shwary_setting("HEDGE_MAX_WORKERS", 32)
+                _slots = threading.BoundedSemaphore(max_workers)
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shwary-hedge")
+    return _executor, _slots
+
+
+def _submit(func, args):
+    """Lance `func(*args)` sur un thread libre du pool ; None si tous sont occupés (jamais mis en file)."""
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        return None
+    future = executor.submit(_timed, func, args)
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _timed(func, args):
+    started = time.monotonic()
+    result = func(*args)
+    stats.record_latency(time.monotonic() - started)
+    return result
+
+
+def _remaining(end: float | None) -> float | None:
+    return None if end is None else max(0.0, end - time.monotonic())
+
+
+def call(func, *args, deadline: float | None = None, hedge: bool | None = None):
+    """
+    Exécute une lecture idempotente `func(*args)` (client sync) avec hedging
+    et délai maximal optionnels. Lève DeadlineExceeded si rien n'a répondu à temps.
+    """
+    if hedge is None:
+        hedge = get_shwary_setting("HEDGE", False)
+    if not hedge and deadline is None:
+        return func(*args)
+
+    stats.incr("calls")
+    end = time.monotonic() + deadline if deadline is not None else None
+    first = _submit(func, args)
+    if first is None:
+        stats.incr("saturated")
+        raise PoolSaturated("Pool de vérification saturé : Shwary ne répond plus assez vite")
+    futures = [first]
+
+    if hedge:
+        delay = stats.hedge_delay()
+        if end is not None:
+            delay = min(delay, _remaining(end))
+        done, _ = wait(futures, timeout=delay)
+        if not done and (end is None or time.monotonic() < end):
+            # Pool saturé : pas de couverture, elle aggraverait la panne
+            second = _submit(func, args)
+            if second is not None:
+                stats.incr("hedged")
+                futures.append(second)
+
+    pending = list(futures)
+    error = None
+    while pending:
+        done, _ = wait(pending, timeout=_remaining(end), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            pending.remove(future)
+            if future.exception() is None:
+                if future is not futures[0]:
+                    stats.incr("hedge_wins")
+                return future.result()
+            error = error or future.exception()
+
+    if error is not None and not pending:
+        raise error
+    stats.incr("deadline_exceeded")
+    raise DeadlineExceeded(f"Pas de réponse de Shwary en {deadline}s")
+
+
+async def acall(func, *args, deadline: float | None = None, hedge: bool | None = None):
+    """Équivalent async de `call` : `func(*args)` est une coroutine (client ShwaryAsync)."""
+    if hedge is None:
+        hedge = get_shwary_setting("HEDGE", False)
+    if not hedge and deadline is None:
+        return await func(*args)
+
+    async def timed():
+        started = time.monotonic()
+        result = await func(*args)
+        stats.record_latency(time.monotonic() - started)
+        return result
+
+    stats.incr("calls")
+    end = time.monotonic() + deadline if deadline is not None else None
+    tasks = [asyncio.ensure_future(timed())]
+    try:
+        if hedge:
+            delay = stats.hedge_delay()
+            if end is not None:
+                delay = min(delay, _remaining(end))
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and (end is None or time.monotonic() < end):
+                stats.incr("hedged")
+                tasks.append(asyncio.ensure_future(timed()))
+
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=_remaining(end), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        stats.incr("hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+
+        if error is not None and not pending:
+            raise error
+        stats.incr("deadline_exceeded")
+        raise DeadlineExceeded(f"Pas de réponse de Shwary en {deadline}s")
+    finally:
+        # La requête perdante est annulée : sa connexion est rendue au pool
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+class HedgedClient:
+    """
+    Enveloppe d'un client Shwary sync : `get_transaction` passe par `call`,
+    toutes les autres méthodes sont déléguées telles quelles.
+    """
+
+    def __init__(self, client, deadline: float | None = None):
+        self.client = client
+        self.deadline = deadline
+
+    def get_transaction(self, transaction_id):
+        return call(self.client.get_transaction, transaction_id, deadline=self.deadline)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def wrap(client, deadline: float | None = None):
+    """Enveloppe `client` si le hedging ou un délai maximal est configuré, sinon le renvoie tel quel."""
+    if deadline is None:
+        deadline = get_shwary_setting("VERIFY_DEADLINE")
+    if deadline is None and not get_shwary_setting("HEDGE", False):
+        return client
+    return HedgedClient(client, deadline)
@@ -0,0 +1,94 @@
+"""
+Historique des paiements d'un client (numéro de téléphone) ou d'un objet
+métier, paginé par curseur (keyset).
+
+Les pages suivantes reprennent après le dernier (created_at, id) vu au lieu
+d'un OFFSET : chaque page coûte une descente d'index, quelle que soit sa
+profondeur. Index utilisés : (phone_normalized, created_at) et
+(content_type, object_id, created_at).
+
+    page = history_for_phone("+243 97 234 5678", limit=50)
+    page = history_for_phone("+243972345678", cursor=page.next_cursor)
+"""
+
+import base64
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+HISTORY_FIELDS = (
+    "id",
+    "shwary_id",
+    "created_at",
+    "status",
+    "amount",
+    "currency",
+    "phone_number",
+    "merchant",
+    "content_type_id",
+    "object_id",
+)
+
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class HistoryPage:
+    results: list[dict]
+    next_cursor: str | None
+
+
+def encode_cursor(created_at: datetime, pk) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    try:
+        parsed = parse_datetime(created_at)
+        # Validé ici : un pk invalide ne lèverait qu'à l'évaluation du queryset (erreur 500)
+        pk = str(uuid.UUID(pk))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if parsed is None:
+        raise InvalidCursor(cursor)
+    return parsed, pk
+
+
+def paginate(queryset, cursor: str | None = None, limit: int = 50) -> HistoryPage:
+    """Page de `limit` transactions (plus récentes d'abord) après `cursor`."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    queryset = queryset.order_by("-created_at", "-pk")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # Une ligne de plus que demandé : indique s'il existe une page suivante
+    rows = list(queryset.values(*HISTORY_FIELDS)[: limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return HistoryPage(rows, next_cursor)
+
+
+def history_for_phone(phone: str, cursor: str | None = None, limit: int = 50, using: str | None = None) -> HistoryPage:
+    from .models import ShwaryTransaction
+
+    return paginate(ShwaryTransaction.objects.for_reads(using).for_phone(phone), cursor, limit)
+
+
+def history_for_object(obj, cursor: str | None = None, limit: int = 50, using: str | None = None) -> HistoryPage:
+    from .models import ShwaryTransaction
+
+    return paginate(ShwaryTransaction.objects.for_reads(using).for_object(obj), cursor, limit)
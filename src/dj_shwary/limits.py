@@ -0,0 +1,132 @@
+"""
+Délestage du webhook en cas d'afflux de callbacks.
+
+Après une panne côté Shwary, les callbacks arrivent en rafale : chacun occupe
+un worker et un appel de vérification à l'API, au détriment des pages de
+checkout. Au-delà d'un nombre de webhooks traités simultanément, la vue répond
+immédiatement 503 + `Retry-After`, sans toucher à la base ni à l'API ; Shwary
+renverra le callback plus tard.
+
+    SHWARY = {
+        ...,
+        "WEBHOOK_MAX_IN_FLIGHT": 8,           # par processus (None = illimité)
+        "WEBHOOK_MAX_IN_FLIGHT_GLOBAL": 32,   # tous processus confondus, via le cache
+        "WEBHOOK_RETRY_AFTER": 5,             # secondes, en-tête Retry-After
+    }
+
+La limite globale repose sur un compteur du cache Django (SHWARY["CACHE_ALIAS"]) :
+elle est approximative (le compteur expire après SHWARY["WEBHOOK_IN_FLIGHT_TTL"]
+secondes pour ne pas rester bloqué après le crash d'un worker) et ne doit être
+utilisée qu'avec un cache partagé (Redis, Memcached). En cas de panne du cache,
+les webhooks sont acceptés.
+
+Les compteurs de délestage sont exposés par `get_shedding_stats()`.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from .utils import get_shwary_cache, get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightLimiter:
+    """Limite le nombre de traitements simultanés d'un même type (ex. "webhook")."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def setting_prefix(self) -> str:
+        return self.name.upper()
+
+    def key(self, suffix: str) -> str:
+        return f"shwary:inflight:{self.name}:{suffix}"
+
+    def acquire(self) -> bool:
+        """Réserve une place ; False si la limite (locale ou globale) est atteinte."""
+        limit = get_shwary_setting(f"{self.setting_prefix}_MAX_IN_FLIGHT")
+        with self._lock:
+            if limit is not None and self.in_flight >= limit:
+                self.shed += 1
+                self._count_global_shed()
+                return False
+            self.in_flight += 1
+
+        if not self._acquire_global():
+            with self._lock:
+                self.in_flight -= 1
+                self.shed += 1
+            self._count_global_shed()
+            return False
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        if get_shwary_setting(f"{self.setting_prefix}_MAX_IN_FLIGHT_GLOBAL") is not None:
+            try:
+                get_shwary_cache().decr(self.key("count"))
+            except Exception:
+                # Compteur expiré entre-temps (TTL) ou cache indisponible
+                pass
+
+    @contextmanager
+    def slot(self):
+        """`with limiter.slot() as acquired:` ; la place est libérée en sortie de bloc."""
+        acquired = self.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release()
+
+    def _acquire_global(self) -> bool:
+        limit = get_shwary_setting(f"{self.setting_prefix}_MAX_IN_FLIGHT_GLOBAL")
+        if limit is None:
+            return True
+
+        cache = get_shwary_cache()
+        key = self.key("count")
+        try:
+            cache.add(key, 0, get_shwary_setting(f"{self.setting_prefix}_IN_FLIGHT_TTL", 300))
+            if cache.incr(key) > limit:
+                cache.decr(key)
+                return False
+        except Exception as e:
+            logger.warning(f"Limite globale '{self.name}' indisponible, requête acceptée: {e}")
+        return True
+
+    def _count_global_shed(self) -> None:
+        if get_shwary_setting(f"{self.setting_prefix}_MAX_IN_FLIGHT_GLOBAL") is None:
+            return
+        cache = get_shwary_cache()
+        try:
+            cache.add(self.key("shed"), 0, None)
+            cache.incr(self.key("shed"))
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        stats = {"in_flight": self.in_flight, "shed": self.shed}
+        if get_shwary_setting(f"{self.setting_prefix}_MAX_IN_FLIGHT_GLOBAL") is not None:
+            cache = get_shwary_cache()
+            try:
+                stats["global_in_flight"] = cache.get(self.key("count"), 0)
+                stats["global_shed"] = cache.get(self.key("shed"), 0)
+            except Exception:
+                pass
+        return stats
+
+
+webhook_limiter = InFlightLimiter("webhook")
+
+
+def get_shedding_stats() -> dict:
+    """Compteurs de délestage (processus courant, et globaux si la limite globale est active)."""
+    return {"webhook": webhook_limiter.stats()}
@@ -1,13 +1,43 @@
 # shwary_django/management/commands/check_pending_shwary.py
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from django.core.management.base import BaseCommand
+from django.db import connections
 from django.utils import timezone
 from datetime import timedelta
 
+from dj_shwary import hedging, tracing
+from dj_shwary.merchants import get_client
 from dj_shwary.models import ShwaryTransaction
+from dj_shwary.reconciliation import refresh_record
+from dj_shwary.scheduling import ReconciliationScheduler
+from dj_shwary.settlements import collect_settlements
+from dj_shwary.tasks import INITIATION_INTERRUPTED
 
 logger = logging.getLogger(__name__)
 
+
+def close_worker_connections(executor: ThreadPoolExecutor, workers: int) -> None:
+    """
+    Ferme, une fois en fin de passage, la connexion à la base ouverte par chaque
+    thread du pool : une connexion est liée à son thread et ne peut être fermée
+    que depuis celui-ci. La barrière garantit une tâche par thread.
+    """
+    barrier = threading.Barrier(workers)
+
+    def close(_):
+        try:
+            barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        connections.close_all()
+
+    list(executor.map(close, range(workers)))
+
+
 class Command(BaseCommand):
     help = 'Vérifie et met à jour les transactions Shwary en attente (polling de rattrapage).'
 
@@ -19,49 +49,141 @@ class Command(BaseCommand):
             default=5,
             help='Ignorer les transactions créées il y a moins de X minutes (défaut: 5)'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Vérifications simultanées, tous marchands confondus (défaut: 1)"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Transactions lues par aller-retour avec la base, par file devise/pays (défaut: 2000)'
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help="Budget du passage en secondes : s'arrête après la vague en cours, "
+                 "les transactions les plus prioritaires ayant été vérifiées d'abord (défaut: sans limite)"
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="Base à utiliser pour rechercher les transactions en attente, ex. un réplica "
+                 "(défaut: SHWARY['READ_DATABASE']). Les mises à jour vont toujours au primaire."
+        )
 
     def handle(self, *args, **options):
         minutes = options['older_than']
         cutoff_time = timezone.now() - timedelta(minutes=minutes)
 
         # On cherche les transactions PENDING qui sont assez vieilles
-        pending_txns = ShwaryTransaction.objects.filter(
+        # recent() : borne basse optionnelle (partitions récentes uniquement)
+        pending = ShwaryTransaction.objects.for_reads(options['database']).recent().filter(
             status=ShwaryTransaction.Status.PENDING,
             created_at__lte=cutoff_time
         )
+        # Sans shwary_id (initiation différée en file, en cours ou interrompue) : rien à demander à l'API
+        pending_txns = pending.filter(shwary_id__isnull=False)
+        interrupted = pending.filter(shwary_id__isnull=True, error_message=INITIATION_INTERRUPTED).count()
 
-        count = pending_txns.count()
-        if count == 0:
-            self.stdout.write(self.style.SUCCESS("Aucune transaction en attente à vérifier."))
-            return
+        # Ordre de priorité (âge / SLA, montant, client en attente), à tour de rôle
+        # par (devise, pays) : voir dj_shwary.scheduling. Records légers (id,
+        # shwary_id, statut, marchand) lus par pages à la demande : seules les
+        # transactions qui changent de statut sont chargées en entier.
+        scheduler = iter(ReconciliationScheduler(pending_txns, page_size=options['chunk_size']))
+        deadline = time.monotonic() + options['max_seconds'] if options['max_seconds'] else None
+
+        # Chaque marchand a ses propres identifiants : un client partagé (et ses connexions) par marchand
+        clients = {}
 
-        self.stdout.write(f"Vérification de {count} transactions en attente...")
+        def client_for(merchant):
+            if merchant not in clients:
+                clients[merchant] = hedging.wrap(get_client(merchant))
+            return clients[merchant]
 
-        updated_count = 0
-        errors_count = 0
+        count = updated_count = errors_count = 0
+        stopped = False
 
-        for txn in pending_txns:
+        # Un seul payments_settled_bulk par paquet de paiements réglés (voir dj_shwary.settlements)
+        with collect_settlements(sender=self.__class__) as batch, ThreadPoolExecutor(
+            max_workers=options['workers']
+        ) as executor:
             try:
-                self.stdout.write(f"  - Vérification {txn.shwary_id}...", ending='')
-                
-                # C'est ici que la magie opère : on utilise la méthode du modèle
-                # qui va utiliser get_shwary_client en interne
-                if txn.refresh_from_api():
-                    # Si le statut a changé (plus PENDING)
-                    if txn.status != ShwaryTransaction.Status.PENDING:
-                        self.stdout.write(self.style.SUCCESS(f" OK -> {txn.status}"))
-                        updated_count += 1
+                while True:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        stopped = next(scheduler, None) is not None
+                        break
+                    # Une vague de `--workers` vérifications, les plus prioritaires d'abord
+                    records = list(islice(scheduler, options['workers']))
+                    if not records:
+                        break
+                    if options['workers'] > 1:
+                        results = list(executor.map(
+                            lambda record: self.check_threaded(record, client_for(record.merchant), batch), records
+                        ))
                     else:
-                        self.stdout.write(" Toujours Pending")
-                else:
-                    self.stdout.write(self.style.ERROR(" Erreur API"))
-                    errors_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Erreur commande check_pending pour {txn.shwary_id}: {e}")
-                self.stdout.write(self.style.ERROR(f" Exception: {e}"))
-                errors_count += 1
+                        results = [self.check(record, client_for(record.merchant)) for record in records]
+
+                    count += len(records)
+                    for outcome in results:
+                        if outcome == "updated":
+                            updated_count += 1
+                        elif outcome == "error":
+                            errors_count += 1
+            finally:
+                # Chaque thread garde sa connexion pendant tout le passage
+                if options['workers'] > 1:
+                    close_worker_connections(executor, options['workers'])
+
+        if interrupted:
+            self.stdout.write(self.style.WARNING(
+                f"{interrupted} initiations différées interrompues (état inconnu chez Shwary) : "
+                "à vérifier manuellement, elles ne sont pas interrogées."
+            ))
+
+        if count == 0 and not stopped:
+            self.stdout.write(self.style.SUCCESS("Aucune transaction en attente à vérifier."))
+            return
 
         self.stdout.write(self.style.SUCCESS(
             f"\nTerminé. {updated_count} mises à jour, {errors_count} erreurs sur {count} transactions."
-        ))
\ No newline at end of file
+        ))
+        if stopped:
+            self.stdout.write(self.style.WARNING(
+                f"Budget de {options['max_seconds']}s atteint : les transactions restantes, "
+                "moins prioritaires, seront vérifiées au prochain passage."
+            ))
+
+    def check_threaded(self, record, client, batch):
+        # Connexion du thread réutilisée d'une transaction à l'autre, quel que soit
+        # CONN_MAX_AGE : fermée une seule fois en fin de passage (close_worker_connections)
+        with collect_settlements(batch=batch):
+            return self.check(record, client)
+
+    def check(self, record, client) -> str:
+        """Vérifie une transaction ; retourne 'updated', 'pending' ou 'error'."""
+        with tracing.operation("check_pending_pay.check", shwary_id=record.shwary_id):
+            return self._check(record, client)
+
+    def _check(self, record, client) -> str:
+        try:
+            # C'est ici que la magie opère : même logique que refresh_from_api,
+            # avec le client partagé du marchand de la transaction
+            if refresh_record(record, client=client):
+                # Si le statut a changé (plus PENDING)
+                if record.status != ShwaryTransaction.Status.PENDING:
+                    self.stdout.write(f"  - Vérification {record.shwary_id}..." + self.style.SUCCESS(f" OK -> {record.status}"))
+                    return "updated"
+                self.stdout.write(f"  - Vérification {record.shwary_id}... Toujours Pending")
+                return "pending"
+
+            self.stdout.write(f"  - Vérification {record.shwary_id}..." + self.style.ERROR(" Erreur API"))
+            return "error"
+
+        except Exception as e:
+            logger.error(f"Erreur commande check_pending pour {record.shwary_id}: {e}")
+            self.stdout.write(f"  - Vérification {record.shwary_id}..." + self.style.ERROR(f" Exception: {e}"))
+            return "error"
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.utils import normalize_phone
+
+
+class Command(BaseCommand):
+    help = (
+        "Renseigne ShwaryTransaction.phone_normalized (E.164) pour les transactions existantes, "
+        "par paquets parcourus par clé primaire (sans OFFSET ni verrou de table)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Transactions lues et mises à jour par paquet (défaut: 1000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalculer aussi les numéros déjà normalisés (ex. après un changement de PHONE_REGION)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        transactions = ShwaryTransaction.objects.on_primary().order_by('pk')
+        if not options['all']:
+            transactions = transactions.filter(phone_normalized__isnull=True)
+
+        scanned = updated = 0
+        last_pk = None
+        while True:
+            chunk = transactions if last_pk is None else transactions.filter(pk__gt=last_pk)
+            rows = list(chunk.values_list('pk', 'phone_number', 'phone_normalized')[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            scanned += len(rows)
+
+            # Instances minimales : bulk_update n'écrit que phone_normalized, une requête par paquet
+            changes = [
+                ShwaryTransaction(pk=pk, phone_normalized=normalized)
+                for pk, phone, current in rows
+                if (normalized := normalize_phone(phone)) != current
+            ]
+            if changes:
+                ShwaryTransaction.objects.on_primary().bulk_update(changes, ['phone_normalized'])
+                updated += len(changes)
+            self.stdout.write(f"  {scanned} transactions parcourues, {updated} mises à jour...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé. {updated} numéros normalisés sur {scanned} transactions parcourues."
+        ))
@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dj_shwary import exports
+from dj_shwary.models import ShwaryTransaction
+
+
+class Command(BaseCommand):
+    help = "Exporte les transactions Shwary en flux (CSV ou JSON Lines), sans les charger en mémoire."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help='Fichier de sortie (défaut: sortie standard)')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv', help='Format (défaut: csv)')
+        parser.add_argument('--since', help='Premier jour de création inclus, AAAA-MM-JJ')
+        parser.add_argument('--until', help='Dernier jour de création inclus, AAAA-MM-JJ')
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=ShwaryTransaction.Status.values,
+            help='Statut à exporter (répétable, défaut: tous)'
+        )
+        parser.add_argument('--gzip', action='store_true', help='Compresser la sortie (gzip)')
+        parser.add_argument('--raw', action='store_true', help='Inclure les champs de raw_response aplatis (raw.*)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Lignes lues par aller-retour avec la base (défaut: 2000)'
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="Base à lire, ex. un réplica (défaut: SHWARY['READ_DATABASE'])"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(f"Date invalide: {e}")
+
+        queryset = exports.filter_transactions(
+            ShwaryTransaction.objects.for_reads(options['database']), since, until, options['status']
+        )
+        chunks = exports.export(
+            queryset,
+            fmt=options['format'],
+            include_raw=options['raw'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['output'] == '-':
+            output = getattr(self.stdout, 'buffer', None)
+            if output is None and options['gzip']:
+                raise CommandError("--gzip vers une sortie texte : utilisez --output.")
+            for chunk in chunks:
+                if output is not None:
+                    output.write(chunk)
+                else:
+                    self.stdout.write(chunk.decode(), ending='')
+            self.stdout.flush()
+            return
+
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Export terminé : {options['output']} ({size} octets)."))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from dj_shwary import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintenance du partitionnement mensuel de la table des transactions (PostgreSQL) : "
+        "conversion, création des partitions à venir, rotation des plus anciennes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convertir la table en table partitionnée (bloquant : recopie les données)'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Nombre de partitions futures à garantir (défaut: 3)'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=None,
+            help='Détacher les partitions plus anciennes que X mois (défaut: aucune)'
+        )
+        parser.add_argument('--drop', action='store_true', help='Supprimer les partitions détachées')
+        parser.add_argument('--dry-run', action='store_true', help='Afficher le SQL sans l\'exécuter')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Base à maintenir (défaut: default)')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        dry_run = options['dry_run']
+
+        if not partitioning.is_supported(connection):
+            self.stdout.write(self.style.WARNING(
+                f"Partitionnement non supporté sur {connection.vendor} : la table reste une table classique."
+            ))
+            return
+
+        statements = []
+        if options['convert']:
+            with connection.schema_editor(collect_sql=dry_run) as editor:
+                converted = partitioning.convert(editor, options['months_ahead'])
+            statements += editor.collected_sql if dry_run else converted
+
+        if not dry_run and not partitioning.is_partitioned(connection):
+            self.stdout.write(self.style.WARNING("La table n'est pas partitionnée (voir --convert)."))
+            return
+
+        statements += partitioning.ensure_partitions(connection, options['months_ahead'], dry_run=dry_run)
+        if options['retain_months'] is not None:
+            statements += partitioning.detach_old_partitions(
+                connection, options['retain_months'], drop=options['drop'], dry_run=dry_run
+            )
+
+        for sql in statements:
+            self.stdout.write(f"{sql};" if dry_run else f"  - {sql}")
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Terminé. {len(statements)} instructions exécutées."))
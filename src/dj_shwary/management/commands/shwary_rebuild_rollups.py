@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dj_shwary import rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats journaliers (ShwaryDailyRollup) depuis la table des transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Premier jour à recalculer, AAAA-MM-JJ (défaut: depuis le début)')
+        parser.add_argument('--until', help='Dernier jour à recalculer, AAAA-MM-JJ (défaut: aujourd\'hui)')
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="Base où lire les transactions, ex. un réplica (défaut: SHWARY['READ_DATABASE'])"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options['since']) if options['since'] else None
+            until = date.fromisoformat(options['until']) if options['until'] else None
+        except ValueError as e:
+            raise CommandError(f"Date invalide: {e}")
+
+        count = rollups.rebuild(since, until, using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"Terminé. {count} agrégats journaliers recalculés."))
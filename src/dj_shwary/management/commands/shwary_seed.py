@@ -0,0 +1,254 @@
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from dj_shwary import rollups
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.routers import get_write_database
+
+SEED_PREFIX = "SEED-"
+# Refus à l'initiation (sans shwary_id) : reconnus par leur message pour --clear
+SEED_ERROR = "[seed] Invalid phone number"
+SEED_USER_PREFIX = "shwary-seed-"
+
+# (devise, pays, poids, montant médian, indicatif, préfixes mobiles)
+MARKETS = (
+    ("CDF", "DRC", 0.55, 25_000, "243", ("97", "99", "81", "82", "84", "89")),
+    ("USD", "DRC", 0.20, 20, "243", ("97", "99", "81", "82")),
+    ("KES", "KE", 0.15, 1_500, "254", ("70", "71", "72", "79")),
+    ("UGX", "UG", 0.10, 40_000, "256", ("70", "75", "77", "78")),
+)
+
+Status = ShwaryTransaction.Status
+Via = ShwaryTransaction.SettledVia
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    `bulk_create` applique auto_now / auto_now_add à chaque ligne : on les
+    suspend le temps de l'insertion pour conserver les dates générées.
+    """
+    fields = [ShwaryTransaction._meta.get_field(name) for name in ("created_at", "updated_at")]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère des transactions Shwary synthétiques (statuts, âges, devises, numéros, "
+        "taille de raw_response réalistes) par bulk_create, pour les tests de charge et d'index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Transactions à générer (défaut: 100000)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Lignes par INSERT (défaut: 5000)')
+        parser.add_argument('--days', type=int, default=90, help='Ancienneté maximale des transactions (défaut: 90)')
+        parser.add_argument(
+            '--related-model',
+            help="Modèle métier existant (app_label.model) auquel lier les transactions. "
+                 "Sinon, des utilisateurs auth.User sont générés comme objets liés."
+        )
+        parser.add_argument(
+            '--hosts',
+            type=int,
+            default=None,
+            help='Objets liés à générer ou à échantillonner (défaut: un pour 3 transactions)'
+        )
+        parser.add_argument('--raw-bytes', type=int, default=600, help='Taille médiane de raw_response (défaut: 600)')
+        parser.add_argument('--sandbox-ratio', type=float, default=0.05, help='Part en mode sandbox (défaut: 0.05)')
+        parser.add_argument('--seed', type=int, default=None, help='Graine aléatoire (jeu de données reproductible)')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help=f"Supprimer d'abord les transactions ({SEED_PREFIX}*) et utilisateurs ({SEED_USER_PREFIX}*) "
+                 "générés précédemment ; avec --count 0, supprime seulement"
+        )
+        parser.add_argument('--database', default=None, help="Base cible (défaut: la base d'écriture)")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.options = options
+        database = options['database'] or get_write_database(ShwaryTransaction)
+        count, chunk_size = options['count'], options['chunk_size']
+        if count < 0 or chunk_size <= 0 or (count == 0 and not options['clear']):
+            raise CommandError("--count et --chunk-size doivent être positifs.")
+
+        if options['clear']:
+            self.clear(database, chunk_size)
+            if count == 0:
+                return
+
+        content_type, host_ids = self.get_hosts(database, options['hosts'] or max(1, count // 3))
+        # Clients récurrents : un numéro pour ~5 transactions (historiques par client réalistes)
+        self.phones = [self.make_phone(self.pick_market()) for _ in range(max(1, count // 5))]
+        self.now = timezone.now()
+
+        created = 0
+        started = time.perf_counter()
+        with explicit_timestamps():
+            while created < count:
+                size = min(chunk_size, count - created)
+                rows = [self.make_transaction(content_type, self.random.choice(host_ids)) for _ in range(size)]
+                with db_transaction.atomic(using=database):
+                    ShwaryTransaction.objects.using(database).bulk_create(rows, batch_size=chunk_size)
+                    # bulk_create n'envoie pas post_save : agrégats journaliers tenus ici
+                    rollups.record_bulk_create(rows, using=database)
+                created += size
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {created}/{count} transactions, {created / elapsed:.0f} lignes/s")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé. {created} transactions générées en {elapsed:.1f}s ({created / elapsed:.0f} lignes/s)."
+        ))
+
+    def clear(self, database: str, chunk_size: int) -> None:
+        """
+        Supprime les transactions générées par paquets de pk, sans les charger
+        (`_raw_delete` : ni raw_response lu, ni post_delete par ligne), puis
+        recalcule les agrégats des jours concernés.
+        """
+        seeded = ShwaryTransaction.objects.using(database).filter(
+            Q(shwary_id__startswith=SEED_PREFIX) | Q(shwary_id__isnull=True, error_message=SEED_ERROR)
+        )
+        bounds = seeded.aggregate(first=Min('created_at'), last=Max('created_at'))
+        deleted = 0
+        while pks := list(seeded.order_by('pk').values_list('pk', flat=True)[:chunk_size]):
+            # Aucune clé étrangère ne pointe vers ShwaryTransaction : pas de cascade à gérer
+            deleted += ShwaryTransaction.objects.using(database).filter(pk__in=pks)._raw_delete(database)
+        if deleted and rollups.is_enabled():
+            rollups.rebuild(rollups.rollup_day(bounds['first']), rollups.rollup_day(bounds['last']), using=database)
+        self.stdout.write(f"{deleted} transactions générées supprimées.")
+
+        if apps.is_installed("django.contrib.auth"):
+            from django.contrib.auth import get_user_model
+
+            User = get_user_model()
+            _, per_model = User.objects.db_manager(database).filter(
+                **{f"{User.USERNAME_FIELD}__startswith": SEED_USER_PREFIX}
+            ).delete()
+            self.stdout.write(f"{per_model.get(User._meta.label, 0)} utilisateurs générés supprimés.")
+
+    def get_hosts(self, database: str, hosts: int) -> tuple[ContentType, list[str]]:
+        """Objets métier liés : lignes existantes de --related-model, sinon utilisateurs générés."""
+        if self.options['related_model']:
+            try:
+                model = apps.get_model(self.options['related_model'])
+            except (LookupError, ValueError) as e:
+                raise CommandError(f"Modèle inconnu: {e}")
+            host_ids = [str(pk) for pk in model._default_manager.using(database).values_list('pk', flat=True)[:hosts]]
+            if not host_ids:
+                raise CommandError(f"Aucune ligne dans {self.options['related_model']} à laquelle lier les transactions.")
+            return ContentType.objects.db_manager(database).get_for_model(model), host_ids
+
+        if not apps.is_installed("django.contrib.auth"):
+            raise CommandError("django.contrib.auth n'est pas installé : utilisez --related-model.")
+        from django.contrib.auth import get_user_model
+
+        User = get_user_model()
+        run = uuid.uuid4().hex[:8]
+        users = [
+            User(**{User.USERNAME_FIELD: f"{SEED_USER_PREFIX}{run}-{i}", "password": "!"})
+            for i in range(hosts)
+        ]
+        for start in range(0, len(users), self.options['chunk_size']):
+            User.objects.db_manager(database).bulk_create(users[start:start + self.options['chunk_size']])
+        host_ids = [
+            str(pk) for pk in User.objects.db_manager(database)
+            .filter(**{f"{User.USERNAME_FIELD}__startswith": f"{SEED_USER_PREFIX}{run}-"})
+            .values_list('pk', flat=True)
+        ]
+        return ContentType.objects.db_manager(database).get_for_model(User), host_ids
+
+    def pick_market(self):
+        return self.random.choices(MARKETS, weights=[market[2] for market in MARKETS])[0]
+
+    def make_phone(self, market) -> str:
+        return f"+{market[4]}{self.random.choice(market[5])}{self.random.randrange(10_000_000):07d}"
+
+    def make_transaction(self, content_type: ContentType, object_id: str) -> ShwaryTransaction:
+        rand = self.random
+        phone = rand.choice(self.phones)
+        # Le marché suit le numéro du client
+        market = next(m for m in MARKETS if phone.startswith(f"+{m[4]}"))
+        if market[1] == "DRC" and rand.random() < 0.25:
+            market = MARKETS[1]
+        currency, country, _, median, _, _ = market
+
+        # Âges concentrés sur les derniers jours, traîne jusqu'à --days
+        age = timedelta(seconds=min(rand.expovariate(1 / (self.options['days'] * 86400 / 6)),
+                                    self.options['days'] * 86400))
+        created_at = self.now - age
+
+        # Les transactions encore en attente sont surtout récentes
+        if age < timedelta(hours=1):
+            status = rand.choices((Status.PENDING, Status.COMPLETED, Status.FAILED), (0.6, 0.3, 0.1))[0]
+        else:
+            status = rand.choices((Status.PENDING, Status.COMPLETED, Status.FAILED), (0.02, 0.83, 0.15))[0]
+
+        shwary_id = f"{SEED_PREFIX}{uuid.UUID(int=rand.getrandbits(128)).hex}"
+        initiated_at = created_at + timedelta(milliseconds=rand.lognormvariate(6, 0.5))
+        settled_at = settled_via = None
+        error_message = None
+        if status != Status.PENDING:
+            if status == Status.FAILED and rand.random() < 0.2:
+                # Refus à l'initiation : jamais transmise à Shwary
+                shwary_id = initiated_at = None
+                settled_at, settled_via = created_at, Via.INITIATION
+                error_message = SEED_ERROR
+            else:
+                settled_at = initiated_at + timedelta(seconds=rand.lognormvariate(3.5, 1))
+                settled_via = rand.choices((Via.WEBHOOK, Via.RECONCILE, Via.ADMIN), (0.85, 0.13, 0.02))[0]
+
+        places = 0 if currency in ("CDF", "UGX") else 2
+        amount = Decimal(f"{rand.lognormvariate(0, 0.8) * median:.{places}f}")
+        return ShwaryTransaction(
+            shwary_id=shwary_id,
+            amount=amount,
+            currency=currency,
+            country=country,
+            phone_number=phone,
+            phone_normalized=phone,
+            status=status,
+            is_sandbox=rand.random() < self.options['sandbox_ratio'],
+            content_type=content_type,
+            object_id=object_id,
+            raw_response=self.make_raw_response(shwary_id, status, amount, currency, phone),
+            error_message=error_message,
+            created_at=created_at,
+            updated_at=settled_at or initiated_at or created_at,
+            initiated_at=initiated_at,
+            settled_at=settled_at,
+            settled_via=settled_via,
+        )
+
+    def make_raw_response(self, shwary_id, status, amount, currency, phone) -> dict:
+        if shwary_id is None:
+            return {"error": SEED_ERROR}
+        # Taille log-normale autour de --raw-bytes (métadonnées opérateur de longueur variable)
+        padding = max(0, int(self.random.lognormvariate(0, 0.5) * self.options['raw_bytes']) - 150)
+        return {
+            "id": shwary_id,
+            "status": status,
+            "amount": str(amount),
+            "currency": currency,
+            "phone_number": phone,
+            "metadata": {"operator_reference": self.random.randbytes(padding // 2).hex()},
+        }
@@ -0,0 +1,57 @@
+import json
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.stats import settlement_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Délai de règlement (p50/p95/p99, en secondes) et part webhook / rattrapage "
+        "par pays et par jour de règlement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Premier jour de règlement inclus, AAAA-MM-JJ (défaut: il y a 7 jours)')
+        parser.add_argument('--until', help="Dernier jour de règlement inclus, AAAA-MM-JJ (défaut: aujourd'hui)")
+        parser.add_argument('--country', action='append', help='Pays à inclure (répétable, défaut: tous)')
+        parser.add_argument('--format', choices=('table', 'json'), default='table', help='Format (défaut: table)')
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="Base à lire, ex. un réplica (défaut: SHWARY['READ_DATABASE'])"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            until = date.fromisoformat(options['until']) if options['until'] else timezone.localdate()
+            since = date.fromisoformat(options['since']) if options['since'] else until - timedelta(days=7)
+        except ValueError as e:
+            raise CommandError(f"Date invalide: {e}")
+
+        queryset = ShwaryTransaction.objects.for_reads(options['database'])
+        if options['country']:
+            queryset = queryset.filter(country__in=options['country'])
+        stats = settlement_stats(queryset, since, until)
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps([row.as_dict() for row in stats], indent=2))
+            return
+
+        if not stats:
+            self.stdout.write(f"Aucun règlement entre le {since} et le {until}.")
+            return
+
+        self.stdout.write(
+            f"{'Jour':<11} {'Pays':<5} {'Réglées':>8} {'Webhook':>8} {'Polling':>8} {'Admin':>6} "
+            f"{'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9}"
+        )
+        for row in stats:
+            self.stdout.write(
+                f"{row.day.isoformat():<11} {row.country:<5} {row.settled:>8} "
+                f"{row.webhook_share:>8.0%} {row.reconcile_share:>8.0%} {row.admin_share:>6.0%} "
+                f"{row.p50:>9.1f} {row.p95:>9.1f} {row.p99:>9.1f}"
+            )
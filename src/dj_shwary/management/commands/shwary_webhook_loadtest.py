@@ -0,0 +1,387 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+
+from dj_shwary import rollups
+from dj_shwary.batching import WebhookBatcher, get_webhook_batcher
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.signals import payment_failed, payment_status_changed, payment_success, payments_settled_bulk
+from dj_shwary.utils import percentile
+
+LOADTEST_PREFIX = "LOADTEST-"
+
+
+@contextmanager
+def muted_receivers(*signals):
+    """
+    Déconnecte le temps du bloc les receivers applicatifs des signaux de paiement :
+    les transactions synthétiques ne doivent ni livrer de commande ni notifier
+    de client. Ceux de dj_shwary (dispatch_uid "dj_shwary_...") restent mesurés.
+    """
+    saved = []
+    for signal in signals:
+        with signal.lock:
+            saved.append((signal, signal.receivers))
+            signal.receivers = [
+                entry for entry in signal.receivers
+                if isinstance(entry[0][0], str) and entry[0][0].startswith("dj_shwary_")
+            ]
+            signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            with signal.lock:
+                signal.receivers = receivers
+                signal.sender_receivers_cache.clear()
+
+
+class LockTimer:
+    """
+    Wrapper d'exécution SQL qui mesure le temps passé dans les requêtes
+    `SELECT ... FOR UPDATE` (attente de verrou + lecture).
+    """
+
+    def __init__(self):
+        self.samples: list[float] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if "FOR UPDATE" not in sql.upper():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.samples.append(time.perf_counter() - started)
+
+
+class StubUpstream:
+    """
+    Remplace `ShwaryService` dans la vue : la vérification renvoie le statut
+    annoncé par le webhook, après une latence optionnelle, sans appeler l'API.
+    """
+
+    def __init__(self, statuses: dict[str, str], latency: float = 0.0):
+        self.statuses = statuses
+        self.latency = latency
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    @property
+    def client(self):
+        return self
+
+    def get_transaction(self, transaction_id):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.response(transaction_id)
+
+    def async_client(self, merchant):
+        """Client async du mode groupé (SHWARY["WEBHOOK_BATCH_WINDOW_MS"]), même stub."""
+        return AsyncStubUpstream(self)
+
+    def response(self, transaction_id):
+        from shwary import TransactionResponse
+
+        return TransactionResponse(
+            id=transaction_id,
+            status=self.statuses.get(transaction_id, ShwaryTransaction.Status.PENDING),
+            amount=0,
+        )
+
+
+class AsyncStubUpstream:
+    def __init__(self, stub: StubUpstream):
+        self.stub = stub
+
+    async def get_transaction(self, transaction_id):
+        if self.stub.latency:
+            await asyncio.sleep(self.stub.latency)
+        return self.stub.response(transaction_id)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue des webhooks Shwary (enregistrés ou synthétiques) contre ShwaryWebhookView "
+        "pour mesurer le débit absorbable (planification de capacité)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Nombre de webhooks à envoyer (défaut: 1000)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Nombre de requêtes simultanées (défaut: 10)')
+        parser.add_argument(
+            '--payloads',
+            help='Fichier JSONL de webhooks enregistrés (un payload par ligne). Sinon payloads synthétiques.'
+        )
+        parser.add_argument(
+            '--duplicate-ratio',
+            type=float,
+            default=0.0,
+            help='Part des webhooks qui renvoient un ID déjà envoyé (défaut: 0)'
+        )
+        parser.add_argument(
+            '--missing-ratio',
+            type=float,
+            default=0.0,
+            help='Part des webhooks synthétiques visant une transaction inexistante (défaut: 0)'
+        )
+        parser.add_argument(
+            '--status-mix',
+            default='completed=0.8,failed=0.2',
+            help='Répartition des statuts synthétiques (défaut: completed=0.8,failed=0.2)'
+        )
+        parser.add_argument('--url', help="URL du webhook à cibler. Sinon la vue est appelée en interne (test client).")
+        parser.add_argument(
+            '--real-upstream',
+            action='store_true',
+            help="En interne : vérifier auprès de la vraie API Shwary au lieu d'un stub"
+        )
+        parser.add_argument(
+            '--upstream-latency-ms',
+            type=float,
+            default=0.0,
+            help='Latence simulée de la vérification par le stub (défaut: 0)'
+        )
+        parser.add_argument(
+            '--with-receivers',
+            action='store_true',
+            help="En interne : garder les receivers applicatifs de payment_success / payment_failed... "
+                 "(base dédiée uniquement). Par défaut, ils sont déconnectés pendant le test."
+        )
+        parser.add_argument('--keep', action='store_true', help='Ne pas supprimer les transactions synthétiques')
+        parser.add_argument('--seed', type=int, help='Graine aléatoire pour rejouer un scénario identique')
+        parser.add_argument('--json', action='store_true', help='Affiche le rapport en JSON')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        in_process = not options['url']
+
+        if options['payloads']:
+            payloads = self.load_payloads(options['payloads'])
+            created = []
+        else:
+            payloads, created = self.synthetic_payloads(options, rng, create=in_process)
+
+        if not payloads:
+            raise CommandError("Aucun payload à envoyer.")
+
+        plan = self.build_plan(payloads, options['requests'], options['duplicate_ratio'], rng)
+        statuses = {p.get('id'): p.get('status') for p in payloads}
+        lock_timer = LockTimer()
+
+        self.stdout.write(
+            f"Envoi de {len(plan)} webhooks ({options['concurrency']} en parallèle) "
+            f"{'en interne' if in_process else 'vers ' + options['url']}..."
+        )
+
+        try:
+            if in_process:
+                patchers = []
+                if not options['real_upstream']:
+                    stub = StubUpstream(statuses, options['upstream_latency_ms'] / 1000)
+                    patchers.append(mock.patch("dj_shwary.views.ShwaryService", stub))
+                    batcher = get_webhook_batcher()
+                    if batcher is not None:
+                        # Mode groupé : le batcher du processus crée ses propres clients async,
+                        # un batcher dédié vérifie auprès du stub
+                        patchers.append(mock.patch("dj_shwary.views.get_webhook_batcher", return_value=WebhookBatcher(
+                            window_ms=batcher.window * 1000,
+                            max_size=batcher.max_size,
+                            concurrency=batcher.concurrency,
+                            client_factory=stub.async_client,
+                        )))
+                    for patcher in patchers:
+                        patcher.start()
+                signals = () if options['with_receivers'] else (
+                    payment_success, payment_failed, payment_status_changed, payments_settled_bulk
+                )
+                try:
+                    with muted_receivers(*signals):
+                        results, elapsed = self.run_in_process(plan, options['concurrency'], lock_timer)
+                finally:
+                    for patcher in patchers:
+                        patcher.stop()
+            else:
+                results, elapsed = self.run_against_url(plan, options['url'], options['concurrency'])
+        finally:
+            if created and not options['keep']:
+                ShwaryTransaction.objects.filter(pk__in=created).delete()
+
+        report = self.build_report(results, elapsed, lock_timer if in_process else None)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    # --- Préparation des payloads ---
+
+    def load_payloads(self, path):
+        payloads = []
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    payloads.append(json.loads(line))
+        return payloads
+
+    def synthetic_payloads(self, options, rng, create):
+        mix = []
+        for part in options['status_mix'].split(','):
+            status, _, weight = part.partition('=')
+            mix.append((status.strip(), float(weight or 1)))
+        statuses, weights = zip(*mix)
+
+        unique = max(1, round(options['requests'] * (1 - options['duplicate_ratio'])))
+        run_id = f"{LOADTEST_PREFIX}{int(time.time())}-"
+        payloads = []
+        for i in range(unique):
+            missing = rng.random() < options['missing_ratio']
+            payloads.append({
+                "id": f"{run_id}{'missing-' if missing else ''}{i}",
+                "status": rng.choices(statuses, weights)[0],
+                "amount": 5000,
+            })
+
+        created = []
+        if create:
+            txns = [
+                ShwaryTransaction(
+                    shwary_id=p["id"],
+                    amount=p["amount"],
+                    phone_number="+243000000000",
+                    status=ShwaryTransaction.Status.PENDING,
+                )
+                for p in payloads
+                if "-missing-" not in p["id"]
+            ]
+            ShwaryTransaction.objects.bulk_create(txns, batch_size=1000)
+            # bulk_create n'envoie pas post_save : comptées ici, décomptées à la suppression
+            rollups.record_bulk_create(txns)
+            created = [txn.pk for txn in txns]
+        return payloads, created
+
+    def build_plan(self, payloads, total, duplicate_ratio, rng):
+        """Ordre d'envoi : chaque payload unique une fois, complété par des doublons, mélangé."""
+        unique = payloads[:max(1, round(total * (1 - duplicate_ratio)))]
+        plan = list(unique[:total])
+        while len(plan) < total:
+            plan.append(rng.choice(unique))
+        rng.shuffle(plan)
+        return plan
+
+    # --- Exécution ---
+
+    def run_in_process(self, plan, concurrency, lock_timer):
+        from django.test import Client
+
+        url = reverse("dj_shwary:shwary-webhook")
+        local = threading.local()
+
+        def send(payload):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+            body = json.dumps(payload)
+            with connection.execute_wrapper(lock_timer):
+                started = time.perf_counter()
+                response = client.post(url, data=body, content_type="application/json")
+                return response.status_code, time.perf_counter() - started
+
+        return self.run(plan, send, concurrency, close_connections=True)
+
+    def run_against_url(self, plan, url, concurrency):
+        import httpx
+
+        with httpx.Client(timeout=30.0) as http:
+            def send(payload):
+                started = time.perf_counter()
+                try:
+                    response = http.post(url, json=payload)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                return status, time.perf_counter() - started
+
+            return self.run(plan, send, concurrency)
+
+    def run(self, plan, send, concurrency, close_connections=False):
+        def worker(payload):
+            try:
+                return send(payload)
+            finally:
+                if close_connections and concurrency > 1:
+                    connections.close_all()
+
+        started = time.perf_counter()
+        if concurrency <= 1:
+            results = [send(payload) for payload in plan]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(worker, plan))
+        return results, time.perf_counter() - started
+
+    # --- Rapport ---
+
+    def build_report(self, results, elapsed, lock_timer):
+        latencies = [latency for _, latency in results]
+        codes = {}
+        for status, _ in results:
+            codes[str(status)] = codes.get(str(status), 0) + 1
+        total = len(results)
+
+        report = {
+            "requests": total,
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(total / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                name: round(percentile(latencies, pct) * 1000, 2)
+                for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "status_codes": codes,
+            "rate_404": round(codes.get("404", 0) / total, 4),
+            "rate_500": round(codes.get("500", 0) / total, 4),
+        }
+        if lock_timer is not None:
+            waits = lock_timer.samples
+            report["lock_wait_ms"] = {
+                "queries": len(waits),
+                "total": round(sum(waits) * 1000, 2),
+                "p99": round(percentile(waits, 99) * 1000, 2),
+                "max": round(max(waits, default=0) * 1000, 2),
+            }
+        return report
+
+    def print_report(self, report):
+        latency = report["latency_ms"]
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{report['requests']} webhooks en {report['seconds']}s "
+            f"-> {report['requests_per_second']} req/s"
+        ))
+        self.stdout.write(
+            f"Latence (ms) : p50={latency['p50']} p95={latency['p95']} "
+            f"p99={latency['p99']} max={latency['max']}"
+        )
+        self.stdout.write(f"Codes HTTP : {report['status_codes']}")
+        self.stdout.write(f"Taux 404 : {report['rate_404']:.2%} | Taux 500 : {report['rate_500']:.2%}")
+        if "lock_wait_ms" in report:
+            lock = report["lock_wait_ms"]
+            if lock["queries"]:
+                self.stdout.write(
+                    f"Verrous (SELECT FOR UPDATE) : {lock['queries']} requêtes, "
+                    f"total={lock['total']}ms p99={lock['p99']}ms max={lock['max']}ms"
+                )
+            else:
+                self.stdout.write(
+                    "Verrous : aucun SELECT FOR UPDATE émis (base sans verrouillage de ligne, ex. SQLite)"
+                )
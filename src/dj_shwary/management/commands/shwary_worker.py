@@ -0,0 +1,118 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from dj_shwary.models import ShwaryTask
+from dj_shwary.tasks import run_task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches Shwary en file d'attente en base (DatabaseBackend)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Vider la file une fois puis quitter')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Nombre de tâches réservées par itération (défaut: 20)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Pause quand la file est vide, en secondes (défaut: 1)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=300,
+            help="Reprendre les tâches 'en cours' depuis plus de X secondes (worker tombé, défaut: 300)"
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help="Nombre d'essais avant d'abandonner une tâche (défaut: 5)"
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            tasks = self.claim(options['batch_size'], options['stale_after'])
+            for task in tasks:
+                # Le lot s'exécute en série : chaque tâche est re-réservée juste avant de tourner,
+                # pour ne pas être reprise comme "tombée" pendant que les précédentes s'exécutent
+                if not self.touch(task):
+                    continue
+                self.run_one(task, options['max_attempts'])
+                processed += 1
+
+            if not tasks:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Terminé. {processed} tâches exécutées."))
+
+    def claim(self, batch_size, stale_after):
+        """
+        Réserve un lot de tâches prêtes. `skip_locked` permet de lancer
+        plusieurs workers en parallèle (PostgreSQL, MySQL 8+, Oracle).
+        """
+        now = timezone.now()
+        ready = Q(status=ShwaryTask.Status.QUEUED, run_after__lte=now)
+        stale = Q(status=ShwaryTask.Status.RUNNING, updated_at__lte=now - timedelta(seconds=stale_after))
+
+        with db_transaction.atomic():
+            tasks = list(
+                ShwaryTask.objects.select_for_update(skip_locked=True)
+                .filter(ready | stale)
+                .order_by("run_after")[:batch_size]
+            )
+            if tasks:
+                claimed_at = timezone.now()
+                ShwaryTask.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                    status=ShwaryTask.Status.RUNNING, updated_at=claimed_at
+                )
+                for task in tasks:
+                    task.status, task.updated_at = ShwaryTask.Status.RUNNING, claimed_at
+        return tasks
+
+    def touch(self, task) -> bool:
+        """
+        Rafraîchit la réservation d'une tâche avant de l'exécuter. False si un autre
+        worker l'a reprise entre-temps (réservation jugée périmée) : elle n'est pas rejouée.
+        """
+        now = timezone.now()
+        touched = ShwaryTask.objects.filter(
+            pk=task.pk, status=ShwaryTask.Status.RUNNING, updated_at=task.updated_at
+        ).update(updated_at=now)
+        task.updated_at = now
+        return bool(touched)
+
+    def run_one(self, task, max_attempts):
+        try:
+            run_task(task.name, task.kwargs)
+        except Exception as e:
+            logger.exception(f"Tâche Shwary {task.pk} ({task.name}) en erreur: {e}")
+            task.attempts += 1
+            task.last_error = str(e)
+            if task.attempts >= max_attempts:
+                task.status = ShwaryTask.Status.FAILED
+                self.stdout.write(self.style.ERROR(f"  - {task} abandonnée: {e}"))
+            else:
+                # Backoff exponentiel : 2s, 4s, 8s...
+                task.status = ShwaryTask.Status.QUEUED
+                task.run_after = timezone.now() + timedelta(seconds=2 ** task.attempts)
+            task.save(update_fields=("status", "attempts", "last_error", "run_after", "updated_at"))
+        else:
+            # Une tâche terminée n'a plus d'intérêt : on garde la table petite
+            task.delete()
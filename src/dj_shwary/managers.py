@@ -0,0 +1,190 @@
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models import CharField, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .routers import get_read_database, get_write_database
+from .utils import get_shwary_setting, normalize_phone
+
+
+class TransactionRecord:
+    """
+    Vue légère d'une transaction pour les parcours de masse (rattrapage...) :
+    ni `raw_response` désérialisé, ni Decimal, ni machinerie du modèle.
+    """
+
+    __slots__ = ("id", "shwary_id", "status", "merchant")
+
+    fields = ("id", "shwary_id", "status", "merchant")
+
+    def __init__(self, id, shwary_id, status, merchant):
+        self.id = id
+        self.shwary_id = shwary_id
+        self.status = status
+        self.merchant = merchant
+
+    def __repr__(self) -> str:
+        return f"<TransactionRecord {self.shwary_id} ({self.status})>"
+
+
+class ShwaryTransactionQuerySet(models.QuerySet):
+    """
+    QuerySet des transactions Shwary.
+    Regroupe les requêtes sur la liaison générique (content_type, object_id),
+    qui s'appuient sur l'index existant de ces deux colonnes.
+    """
+
+    def for_reads(self, using: str | None = None):
+        """
+        Lecture sans risque (statut, listes, scans) : sur `using`, sinon sur
+        SHWARY["READ_DATABASE"], sinon là où les routeurs l'envoient.
+        """
+        return self.using(get_read_database(using))
+
+    def on_primary(self):
+        """Lecture qui doit voir les écritures récentes (ex. transaction tout juste créée)."""
+        return self.using(get_write_database(self.model))
+
+    def recent(self, days: int | None = None):
+        """
+        Transactions créées dans les `days` derniers jours (défaut :
+        SHWARY["PARTITION_LOOKBACK_DAYS"], sans borne s'il n'est pas défini).
+        Sur une table partitionnée par mois, la borne sur created_at permet à
+        PostgreSQL de n'interroger que les partitions récentes.
+        """
+        if days is None:
+            days = get_shwary_setting("PARTITION_LOOKBACK_DAYS")
+        if days is None:
+            return self
+        return self.filter(created_at__gte=timezone.now() - timedelta(days=days))
+
+    def records(self, chunk_size: int = 2000):
+        """
+        Itère sur des `TransactionRecord`, lus par paquets de `chunk_size`
+        via `values_list` (curseur serveur quand la base le permet).
+        """
+        rows = self.values_list(*TransactionRecord.fields).iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield TransactionRecord(*row)
+
+    def for_phone(self, phone: str):
+        """Transactions d'un numéro, quelle que soit sa saisie (index sur phone_normalized)."""
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            return self.none()
+        return self.filter(phone_normalized=normalized)
+
+    def for_object(self, obj):
+        """Transactions liées à un objet métier (ex. une commande)."""
+        content_type = ContentType.objects.get_for_model(obj)
+        return self.filter(content_type=content_type, object_id=str(obj.pk))
+
+    def for_objects(self, objs):
+        """
+        Transactions liées à une liste d'objets métier.
+        Une seule clause par type de contenu, donc une seule requête au total.
+        """
+        by_type: dict[int, set[str]] = {}
+        for obj in objs:
+            content_type = ContentType.objects.get_for_model(obj)
+            by_type.setdefault(content_type.pk, set()).add(str(obj.pk))
+
+        if not by_type:
+            return self.none()
+
+        condition = models.Q()
+        for content_type_id, object_ids in by_type.items():
+            condition |= models.Q(content_type_id=content_type_id, object_id__in=object_ids)
+        return self.filter(condition)
+
+    def latest_status_by_object(self, objs) -> dict[tuple[int, str], str]:
+        """
+        Dernier statut connu pour chaque objet, en une requête.
+        Retourne un dict {(content_type_id, object_id): statut}.
+        """
+        statuses: dict[tuple[int, str], str] = {}
+        rows = (
+            self.for_objects(objs)
+            .order_by("content_type_id", "object_id", "-created_at")
+            .values_list("content_type_id", "object_id", "status")
+        )
+        for content_type_id, object_id, status in rows:
+            # Tri décroissant sur created_at : la première ligne vue est la plus récente
+            statuses.setdefault((content_type_id, object_id), status)
+        return statuses
+
+
+class ShwaryDailyRollupQuerySet(models.QuerySet):
+    """
+    Lecture des agrégats journaliers : O(jours) au lieu de O(transactions).
+
+    Usage:
+        ShwaryDailyRollup.objects.between(start, end).filter(is_sandbox=False).totals("currency", "status")
+    """
+
+    def between(self, start=None, end=None):
+        """Jours compris entre `start` et `end` (inclus), bornes optionnelles."""
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        return queryset
+
+    def totals(self, *group_by):
+        """Nombre et montant cumulés, regroupés par les champs donnés (ex. "day", "currency")."""
+        return (
+            self.exclude(count=0)  # lignes vidées par des transitions ou suppressions
+            .values(*group_by)
+            .annotate(total_count=Sum("count"), total_amount=Sum("amount"))
+            .order_by(*group_by)
+        )
+
+
+class ShwaryPayableQuerySet(models.QuerySet):
+    """
+    QuerySet à utiliser sur vos modèles métier (Order, Subscription...) pour
+    annoter le statut de paiement Shwary sans requête supplémentaire par ligne.
+
+    Usage:
+        class Order(models.Model):
+            objects = ShwaryPayableQuerySet.as_manager()
+
+        Order.objects.with_latest_shwary_status().with_paid_total()
+    """
+
+    def _shwary_transactions(self):
+        from .models import ShwaryTransaction
+
+        content_type = ContentType.objects.get_for_model(self.model)
+        # object_id est un CharField : on caste la clé primaire de l'hôte
+        # pour que la comparaison utilise l'index (content_type, object_id).
+        return ShwaryTransaction.objects.filter(
+            content_type_id=content_type.pk,
+            object_id=Cast(OuterRef("pk"), output_field=CharField()),
+        )
+
+    def with_latest_shwary_status(self, name: str = "shwary_status"):
+        """Annote le statut de la transaction la plus récente (None si aucune)."""
+        latest = self._shwary_transactions().order_by("-created_at").values("status")[:1]
+        return self.annotate(**{name: Subquery(latest)})
+
+    def with_paid_total(self, name: str = "shwary_paid_total"):
+        """Annote la somme des montants des transactions réussies (0 si aucune)."""
+        from .models import ShwaryTransaction
+
+        total = (
+            self._shwary_transactions()
+            .filter(status=ShwaryTransaction.Status.COMPLETED)
+            .order_by()
+            .values("object_id")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        output_field = DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            **{name: Coalesce(Subquery(total, output_field=output_field), Value(0), output_field=output_field)}
+        )
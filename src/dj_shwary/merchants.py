@@ -0,0 +1,199 @@
+"""
+Registre des marchands Shwary et pool de clients.
+
+Configuration historique (un seul marchand, nommé "default") :
+
+    SHWARY = {"MERCHANT_ID": "...", "MERCHANT_KEY": "...", "SANDBOX": True}
+
+Plusieurs marchands (marques, pays) dans un même déploiement :
+
+    SHWARY = {
+        "SANDBOX": False,            # valeurs par défaut communes
+        "TIMEOUT": 30.0,
+        "DEFAULT_MERCHANT": "drc",
+        "MERCHANTS": {
+            "drc": {"MERCHANT_ID": "...", "MERCHANT_KEY": "...", "COUNTRIES": ["DRC"]},
+            "east": {"MERCHANT_ID": "...", "MERCHANT_KEY": "...", "COUNTRIES": ["KE", "UG"]},
+        },
+    }
+
+Chaque marchand dispose d'un client sync unique et réutilisé (pool de connexions
+HTTP conservé entre les appels, au lieu d'un nouveau handshake TLS par appel).
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+
+DEFAULT_MERCHANT = "default"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MerchantConfig:
+    name: str
+    merchant_id: str
+    merchant_key: str
+    is_sandbox: bool = True
+    timeout: float = 30.0
+    countries: tuple[str, ...] = field(default=())
+
+
+def get_merchants() -> dict[str, MerchantConfig]:
+    """Tous les marchands configurés, indexés par nom."""
+    shwary = getattr(settings, "SHWARY", {})
+    is_sandbox = shwary.get("SANDBOX", True)
+    timeout = shwary.get("TIMEOUT", 30.0)
+
+    merchants: dict[str, MerchantConfig] = {}
+    if shwary.get("MERCHANT_ID") or shwary.get("MERCHANT_KEY"):
+        merchants[DEFAULT_MERCHANT] = MerchantConfig(
+            name=DEFAULT_MERCHANT,
+            merchant_id=shwary.get("MERCHANT_ID"),
+            merchant_key=shwary.get("MERCHANT_KEY"),
+            is_sandbox=is_sandbox,
+            timeout=timeout,
+        )
+
+    for name, conf in shwary.get("MERCHANTS", {}).items():
+        merchants[name] = MerchantConfig(
+            name=name,
+            merchant_id=conf.get("MERCHANT_ID"),
+            merchant_key=conf.get("MERCHANT_KEY"),
+            is_sandbox=conf.get("SANDBOX", is_sandbox),
+            timeout=conf.get("TIMEOUT", timeout),
+            countries=tuple(conf.get("COUNTRIES", ())),
+        )
+
+    for merchant in merchants.values():
+        if not merchant.merchant_id or not merchant.merchant_key:
+            raise ImproperlyConfigured(
+                "La configuration Shwary est incomplète. "
+                "Veuillez définir les clés MERCHANT_ID et MERCHANT_KEY dans le dictionnaire SHWARY dans le settings.py"
+                + (f" (marchand '{merchant.name}')" if merchant.name != DEFAULT_MERCHANT else "")
+            )
+
+    if not merchants:
+        raise ImproperlyConfigured(
+            "La configuration Shwary est incomplète. "
+            "Veuillez définir les clés MERCHANT_ID et MERCHANT_KEY dans le dictionnaire SHWARY dans le settings.py"
+        )
+    return merchants
+
+
+def get_merchant(name: str | None = None) -> MerchantConfig:
+    """Configuration d'un marchand ; sans nom, celle du marchand par défaut."""
+    merchants = get_merchants()
+    if name is None:
+        name = getattr(settings, "SHWARY", {}).get("DEFAULT_MERCHANT")
+        if name is None:
+            name = DEFAULT_MERCHANT if DEFAULT_MERCHANT in merchants else next(iter(merchants))
+    try:
+        return merchants[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Marchand Shwary inconnu : '{name}'.")
+
+
+def resolve_merchant(country: str | None = None) -> MerchantConfig:
+    """Marchand à utiliser pour un pays (COUNTRIES), sinon le marchand par défaut."""
+    if country:
+        for merchant in get_merchants().values():
+            if country in merchant.countries:
+                return merchant
+    return get_merchant()
+
+
+# --- Pool de clients ---
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str | None = None):
+    """
+    Client sync partagé d'un marchand (thread-safe, à ne pas fermer).
+    Recréé automatiquement si la configuration du marchand change.
+    """
+    merchant = get_merchant(name)
+    client = _clients.get(merchant)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(merchant)
+            if client is None:
+                client = _clients[merchant] = new_client(merchant)
+    return client
+
+
+def new_client(merchant: MerchantConfig):
+    """Nouveau client sync (non partagé) pour un marchand."""
+    from shwary import Shwary
+
+    return Shwary(
+        merchant_id=merchant.merchant_id,
+        merchant_key=merchant.merchant_key,
+        is_sandbox=merchant.is_sandbox,
+        timeout=merchant.timeout,
+    )
+
+
+def new_async_client(merchant: MerchantConfig):
+    """Nouveau client async pour un marchand (lié à la boucle d'événements qui l'utilise)."""
+    from shwary import ShwaryAsync
+
+    return ShwaryAsync(
+        merchant_id=merchant.merchant_id,
+        merchant_key=merchant.merchant_key,
+        is_sandbox=merchant.is_sandbox,
+        timeout=merchant.timeout,
+    )
+
+
+def close_clients() -> None:
+    """Ferme et oublie tous les clients du pool."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def warm_up(background: bool = True) -> threading.Thread | None:
+    """
+    Crée le client partagé de chaque marchand et ouvre sa connexion (DNS + TLS)
+    par une requête HEAD sur l'URL de base de l'API, pour que le premier paiement
+    après un déploiement ne paie pas ce coût. Les erreurs sont journalisées, jamais levées.
+    """
+
+    def run():
+        try:
+            names = list(get_merchants())
+        except ImproperlyConfigured as e:
+            logger.warning(f"Préchauffage Shwary ignoré : {e}")
+            return
+        for name in names:
+            try:
+                http = getattr(get_client(name), "_client", None)
+                if http is not None:
+                    http.head("")
+            except Exception as e:
+                logger.warning(f"Préchauffage du client Shwary '{name}' impossible : {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="shwary-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _on_setting_changed(setting, **kwargs):
+    if setting == "SHWARY":
+        close_clients()
+
+
+setting_changed.connect(_on_setting_changed)
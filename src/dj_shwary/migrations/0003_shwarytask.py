@@ -0,0 +1,35 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:30
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dj_shwary', '0002_alter_shwarytransaction_raw_response_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShwaryTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tâche')),
+                ('kwargs', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Arguments')),
+                ('status', models.CharField(choices=[('queued', 'En file'), ('running', 'En cours'), ('failed', 'Échouée')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécuter après')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tâche Shwary',
+                'verbose_name_plural': 'Tâches Shwary',
+                'ordering': ('run_after',),
+                'indexes': [models.Index(fields=['status', 'run_after'], name='dj_shwary_s_status_a0b56a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dj_shwary', '0003_shwarytask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='merchant',
+            field=models.CharField(default='default', help_text="Nom du marchand (SHWARY['MERCHANTS']) ayant initié la transaction.", max_length=50, verbose_name='Marchand'),
+        ),
+    ]
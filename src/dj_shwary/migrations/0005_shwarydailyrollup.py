@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dj_shwary', '0004_shwarytransaction_merchant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShwaryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('currency', models.CharField(max_length=3, verbose_name='Devise')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('completed', 'Réussi'), ('failed', 'Échoué')], max_length=20)),
+                ('is_sandbox', models.BooleanField(verbose_name='Mode Sandbox')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Nombre')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Montant total')),
+            ],
+            options={
+                'verbose_name': 'Agrégat journalier Shwary',
+                'verbose_name_plural': 'Agrégats journaliers Shwary',
+                'ordering': ('-day', 'currency', 'status'),
+                'constraints': [models.UniqueConstraint(fields=('day', 'currency', 'status', 'is_sandbox'), name='dj_shwary_rollup_unique_key')],
+            },
+        ),
+    ]
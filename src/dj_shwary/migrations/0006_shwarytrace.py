@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:52
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dj_shwary', '0005_shwarydailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShwaryTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trace_id', models.CharField(max_length=32, unique=True, verbose_name='ID de trace')),
+                ('name', models.CharField(max_length=100, verbose_name='Opération')),
+                ('started_at', models.DateTimeField(db_index=True, verbose_name='Début')),
+                ('duration_ms', models.FloatField(verbose_name='Durée (ms)')),
+                ('sql_count', models.PositiveIntegerField(default=0, verbose_name='Requêtes SQL')),
+                ('trace', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Trace')),
+            ],
+            options={
+                'verbose_name': 'Trace Shwary',
+                'verbose_name_plural': 'Traces Shwary',
+                'ordering': ('-started_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dj_shwary', '0006_shwarytrace'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='shwarytransaction',
+            name='dj_shwary_s_content_279467_idx',
+        ),
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, help_text="Numéro au format E.164, renseigné à l'enregistrement (recherche par client).", max_length=20, null=True, verbose_name='Numéro normalisé'),
+        ),
+        migrations.AddIndex(
+            model_name='shwarytransaction',
+            index=models.Index(fields=['content_type', 'object_id', 'created_at'], name='dj_shwary_s_content_607e4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shwarytransaction',
+            index=models.Index(fields=['phone_normalized', 'created_at'], name='dj_shwary_s_phone_n_fa3215_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dj_shwary', '0007_shwarytransaction_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='country',
+            field=models.CharField(blank=True, help_text="Code pays transmis à Shwary à l'initiation (DRC, KE, UG).", max_length=10, null=True, verbose_name='Pays'),
+        ),
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='initiated_at',
+            field=models.DateTimeField(blank=True, help_text="Réponse de l'API Shwary à l'initiation (peut suivre created_at si l'initiation est différée).", null=True, verbose_name='Initiée le'),
+        ),
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, help_text='Passage au premier statut final.', null=True, verbose_name='Réglée le'),
+        ),
+        migrations.AddField(
+            model_name='shwarytransaction',
+            name='settled_via',
+            field=models.CharField(blank=True, choices=[('webhook', 'Webhook'), ('reconcile', 'Rattrapage (polling)'), ('admin', 'Administration'), ('initiation', 'Initiation')], help_text='Écrivain ayant appliqué le statut final (webhook, rattrapage, admin...).', max_length=20, null=True, verbose_name='Réglée via'),
+        ),
+        migrations.AddIndex(
+            model_name='shwarytransaction',
+            index=models.Index(fields=['settled_at', 'country'], name='dj_shwary_s_settled_ccdef9_idx'),
+        ),
+    ]
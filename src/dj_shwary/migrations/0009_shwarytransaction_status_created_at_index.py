@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dj_shwary', '0008_settlement_tracking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shwarytransaction',
+            index=models.Index(fields=['status', 'created_at'], name='dj_shwary_s_status_2c449f_idx'),
+        ),
+    ]
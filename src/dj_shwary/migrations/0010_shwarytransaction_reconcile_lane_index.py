@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dj_shwary', '0009_shwarytransaction_status_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shwarytransaction',
+            index=models.Index(fields=['status', 'currency', 'country', 'created_at'], name='dj_shwary_s_status_878518_idx'),
+        ),
+    ]
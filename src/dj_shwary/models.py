@@ -1,11 +1,18 @@
 import uuid
 
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.serializers.json import DjangoJSONEncoder
 
+from . import settlements, tracing
+from .managers import ShwaryDailyRollupQuerySet, ShwaryPayableQuerySet, ShwaryTransactionQuerySet
+from .routers import get_write_database
+from .signals import payment_failed, payment_status_changed, payment_success
+from .utils import normalize_phone
+
 
 class ShwaryTransaction(models.Model):
     """
@@ -18,6 +25,12 @@ class ShwaryTransaction(models.Model):
         COMPLETED = "completed", _("Réussi")
         FAILED = "failed", _("Échoué")
 
+    class SettledVia(models.TextChoices):
+        WEBHOOK = "webhook", _("Webhook")
+        RECONCILE = "reconcile", _("Rattrapage (polling)")
+        ADMIN = "admin", _("Administration")
+        INITIATION = "initiation", _("Initiation")
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     shwary_id = models.CharField(
         _("ID Shwary"),
@@ -34,6 +47,14 @@ class ShwaryTransaction(models.Model):
         max_length=20,
         help_text=_("Format E.164 (ex. +243...)"),
     )
+    phone_normalized = models.CharField(
+        _("Numéro normalisé"),
+        max_length=20,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Numéro au format E.164, renseigné à l'enregistrement (recherche par client)."),
+    )
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
     )
@@ -42,6 +63,19 @@ class ShwaryTransaction(models.Model):
         default=True,
         help_text=_("Vrai si la transaction a été faite en environnement de teste."),
     )
+    merchant = models.CharField(
+        _("Marchand"),
+        max_length=50,
+        default="default",
+        help_text=_("Nom du marchand (SHWARY['MERCHANTS']) ayant initié la transaction."),
+    )
+    country = models.CharField(
+        _("Pays"),
+        max_length=10,
+        null=True,
+        blank=True,
+        help_text=_("Code pays transmis à Shwary à l'initiation (DRC, KE, UG)."),
+    )
 
     content_type = models.ForeignKey(
         ContentType, on_delete=models.CASCADE, null=True, blank=True
@@ -58,6 +92,25 @@ class ShwaryTransaction(models.Model):
     error_message = models.TextField(_("Message d'erreur"), null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    initiated_at = models.DateTimeField(
+        _("Initiée le"),
+        null=True,
+        blank=True,
+        help_text=_("Réponse de l'API Shwary à l'initiation (peut suivre created_at si l'initiation est différée)."),
+    )
+    settled_at = models.DateTimeField(
+        _("Réglée le"), null=True, blank=True, help_text=_("Passage au premier statut final.")
+    )
+    settled_via = models.CharField(
+        _("Réglée via"),
+        max_length=20,
+        choices=SettledVia.choices,
+        null=True,
+        blank=True,
+        help_text=_("Écrivain ayant appliqué le statut final (webhook, rattrapage, admin...)."),
+    )
+
+    objects = ShwaryTransactionQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Transaction Shwary")
@@ -65,41 +118,265 @@ class ShwaryTransaction(models.Model):
         ordering = ("-created_at",)
         indexes = (
             models.Index(fields=("shwary_id", "status")),
-            models.Index(fields=("content_type", "object_id")),
+            # Historiques paginés par curseur (voir dj_shwary.history) : filtre + tri servis par l'index
+            models.Index(fields=("content_type", "object_id", "created_at")),
+            models.Index(fields=("phone_normalized", "created_at")),
+            # Statistiques de règlement (shwary_stats) : parcours par plage de settled_at
+            models.Index(fields=("settled_at", "country")),
+            # Jauge du backlog et rattrapage : transactions en attente par âge (voir dj_shwary.backlog)
+            models.Index(fields=("status", "created_at")),
+            # Files de rattrapage par (devise, pays), lues par ancienneté (voir dj_shwary.scheduling)
+            models.Index(fields=("status", "currency", "country", "created_at")),
         )
     
     def __str__(self) -> str:
         return f"{self.shwary_id} - {self.amount} {self.currency} ({self.get_status_display()})"
+
+    def save(self, *args, **kwargs):
+        # Transitions de statut (update_fields sans phone_number) : rien à recalculer
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "phone_number" in update_fields:
+            self.phone_normalized = normalize_phone(self.phone_number)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "phone_normalized"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values, **kwargs):
+        instance = super().from_db(db, field_names, values, **kwargs)
+        # Statut tel qu'enregistré en base : permet de détecter une transition
+        # au prochain save() (agrégats journaliers, voir dj_shwary.rollups).
+        instance._saved_status = instance.__dict__.get("status")
+        return instance
     
     @property
     def is_successful(self) -> bool:
         return self.status == self.Status.COMPLETED
     
+    @property
+    def is_final(self) -> bool:
+        return self.status in (self.Status.COMPLETED, self.Status.FAILED)
+
+    def set_status(self, status: str, raw_response: dict | None = None, sender=None, via: str | None = None) -> bool:
+        """
+        Applique un statut, sauvegarde la transaction et envoie les signaux
+        si le statut a changé. C'est le point de passage unique des transitions
+        (webhook, rattrapage, admin) : tout ce qui réagit aux changements
+        (notifications, caches...) se branche sur `payment_status_changed`.
+        L'écriture va toujours au primaire, même si l'instance a été lue sur un réplica.
+
+        Args:
+            via: Écrivain à l'origine de la transition (`SettledVia`), enregistré
+                avec `settled_at` au premier passage à un statut final.
+
+        Returns:
+            bool: True si le statut a changé.
+        """
+        previous_status = self.status
+        self.status = status
+        update_fields = ["status", "updated_at"]
+        if raw_response is not None:
+            self.raw_response = raw_response
+            update_fields.append("raw_response")
+        # Premier statut final seulement : un webhook rejoué ne déplace pas l'horodatage
+        if self.is_final and previous_status != status and self.settled_at is None:
+            self.mark_settled(via)
+            update_fields += ["settled_at", "settled_via"]
+        self.save(update_fields=update_fields, using=get_write_database(type(self), instance=self))
+
+        if previous_status == status:
+            return False
+
+        self.send_status_signals(previous_status, sender=sender)
+        return True
+
+    def mark_settled(self, via: str | None) -> None:
+        """Horodate le règlement (sans sauvegarder) : settled_at, settled_via."""
+        self.settled_at = timezone.now()
+        self.settled_via = via
+
+    def send_status_signals(self, previous_status: str, sender=None) -> None:
+        """
+        Envoie `payment_status_changed`, puis `payment_success` / `payment_failed`
+        si le statut a réellement changé vers un état final.
+        """
+        _signal_params = {
+            "sender": sender or self.__class__,
+            "transaction": self,
+            "raw_data": self.raw_response,
+            "previous_status": previous_status,
+        }
+        with tracing.span("signal.payment_status_changed"):
+            payment_status_changed.send(**_signal_params)
+
+        if previous_status == self.status:
+            return
+
+        # Dans un lot (voir dj_shwary.settlements), les paiements réglés sont
+        # aussi annoncés par payments_settled_bulk ; les signaux individuels
+        # peuvent alors être désactivés.
+        batch = settlements.current_batch()
+        if batch is not None and self.is_final:
+            batch.add(self)
+            if not batch.per_item:
+                return
+
+        match self.status:
+            case self.Status.COMPLETED:
+                with tracing.span("signal.payment_success"):
+                    payment_success.send(**_signal_params)
+            case self.Status.FAILED:
+                with tracing.span("signal.payment_failed"):
+                    payment_failed.send(**_signal_params)
+
     def refresh_from_api(self, client=None) -> bool:
         """
         Met à jour le statut de la transaction en interrogeant l'API Shwary.
+        Pour les parcours de masse, préférer `objects.records()` et
+        `dj_shwary.reconciliation.refresh_record` (pas d'instance complète par ligne).
 
         Args:
-            client: Instance de shwary.Shwary (optionenel)
+            client: Instance de shwary.Shwary (optionenel, par défaut le client
+                partagé du marchand de la transaction)
         """
 
-        from dj_shwary.utils import get_shwary_client
+        from dj_shwary import hedging
+        from dj_shwary.merchants import get_client
         
 
         if not client:
-            client = get_shwary_client()
+            client = hedging.wrap(get_client(self.merchant))
         
         try:
-            response = client.get_transaction(self.shwary_id)
+            with tracing.span("shwary.get_transaction", merchant=self.merchant):
+                response = client.get_transaction(self.shwary_id)
 
             if response.status != self.status:
-                self.status = response.status
-                self.raw_response = response.model_dump(mode="json")
-                self.save(update_fields=("status", "raw_response", "updated_at"))
-             
+                from dj_shwary.managers import TransactionRecord
+                from dj_shwary.reconciliation import apply_status
+
+                # Statut relu sous verrou sur le primaire (l'instance peut venir d'un réplica)
+                record = TransactionRecord(self.pk, self.shwary_id, self.status, self.merchant)
+                apply_status(record, response.status, response.model_dump(mode="json"), via=self.SettledVia.RECONCILE)
+                self.refresh_from_db(using=get_write_database(type(self), instance=self))
+
             return True
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Erreur update transaction {self.shwary_id}: {e}")
             return False
+
+class ShwaryTask(models.Model):
+    """
+    File d'attente en base utilisée par `dj_shwary.tasks.DatabaseBackend`
+    (initiation différée des paiements). Consommée par `manage.py shwary_worker`.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", _("En file")
+        RUNNING = "running", _("En cours")
+        FAILED = "failed", _("Échouée")
+
+    name = models.CharField(_("Tâche"), max_length=100)
+    kwargs = models.JSONField(_("Arguments"), encoder=DjangoJSONEncoder, default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(_("Tentatives"), default=0)
+    run_after = models.DateTimeField(_("Exécuter après"), default=timezone.now)
+    last_error = models.TextField(_("Dernière erreur"), null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Tâche Shwary")
+        verbose_name_plural = _("Tâches Shwary")
+        ordering = ("run_after",)
+        indexes = (
+            models.Index(fields=("status", "run_after")),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class ShwaryDailyRollup(models.Model):
+    """
+    Agrégats journaliers des transactions (nombre et montant), par jour de
+    création, devise, statut et mode sandbox. Tenus à jour à chaque création,
+    transition de statut ou suppression (voir dj_shwary.rollups) ; reconstruits
+    par `manage.py shwary_rebuild_rollups`.
+    """
+
+    day = models.DateField(_("Jour"))
+    currency = models.CharField(_("Devise"), max_length=3)
+    status = models.CharField(max_length=20, choices=ShwaryTransaction.Status.choices)
+    is_sandbox = models.BooleanField(_("Mode Sandbox"))
+    count = models.BigIntegerField(_("Nombre"), default=0)
+    amount = models.DecimalField(_("Montant total"), max_digits=20, decimal_places=2, default=0)
+
+    objects = ShwaryDailyRollupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Agrégat journalier Shwary")
+        verbose_name_plural = _("Agrégats journaliers Shwary")
+        ordering = ("-day", "currency", "status")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("day", "currency", "status", "is_sandbox"), name="dj_shwary_rollup_unique_key"
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.currency} {self.status}: {self.count} ({self.amount})"
+
+
+class ShwaryTrace(models.Model):
+    """
+    Trace d'une opération de paiement lente, écrite par
+    `dj_shwary.tracing.DatabaseSink` (SHWARY["TRACE_SINKS"]).
+    """
+
+    trace_id = models.CharField(_("ID de trace"), max_length=32, unique=True)
+    name = models.CharField(_("Opération"), max_length=100)
+    started_at = models.DateTimeField(_("Début"), db_index=True)
+    duration_ms = models.FloatField(_("Durée (ms)"))
+    sql_count = models.PositiveIntegerField(_("Requêtes SQL"), default=0)
+    trace = models.JSONField(_("Trace"), encoder=DjangoJSONEncoder, default=dict)
+
+    class Meta:
+        verbose_name = _("Trace Shwary")
+        verbose_name_plural = _("Traces Shwary")
+        ordering = ("-started_at",)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.duration_ms:.0f} ms)"
+
+
+class ShwaryPayableMixin(models.Model):
+    """
+    Mixin pour les modèles métier payés via Shwary (Order, Subscription...).
+
+    Fournit `shwary_transactions` et un manager capable d'annoter le statut
+    de paiement en une seule requête :
+
+        orders = Order.objects.with_latest_shwary_status()[:100]
+
+    On n'utilise volontairement pas de GenericRelation : elle supprimerait en
+    cascade les transactions (pièces comptables) avec l'objet métier.
+    """
+
+    objects = ShwaryPayableQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def shwary_transactions(self):
+        return ShwaryTransaction.objects.for_object(self)
+
+    @property
+    def shwary_payment_state(self):
+        """État de paiement en cache (voir `dj_shwary.states.payment_state`)."""
+        from .states import payment_state
+
+        return payment_state(self)
@@ -0,0 +1,108 @@
+"""
+Diffusion des changements de statut vers les pages "en attente de paiement".
+
+Chaque transition (voir `ShwaryTransaction.set_status`) publie, après le commit,
+l'état courant de la transaction dans le cache Django. L'endpoint de statut lit
+cet état au lieu d'interroger la base (ou l'API Shwary) à chaque poll, et le
+mode long-poll/SSE se réveille dès que l'état publié change.
+
+Le notifier est remplaçable via SHWARY["STATUS_NOTIFIER"] (chemin pointé vers
+une classe exposant `publish`, `aget_state` et `wait_for_change`), par exemple
+pour s'appuyer sur un pub/sub Redis.
+"""
+
+import asyncio
+import logging
+
+from django.utils.module_loading import import_string
+
+from .utils import get_shwary_cache, get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+
+def transaction_state(pk, status: str, updated_at) -> dict:
+    """État public d'une transaction, tel que renvoyé par l'endpoint de statut."""
+    from .models import ShwaryTransaction
+
+    return {
+        "id": str(pk),
+        "status": status,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "is_final": status in (ShwaryTransaction.Status.COMPLETED, ShwaryTransaction.Status.FAILED),
+        "etag": f'"{status}-{int(updated_at.timestamp() * 1_000_000) if updated_at else 0}"',
+    }
+
+
+class CacheStatusNotifier:
+    """
+    Notifier par défaut : l'état est stocké dans le cache Django et les
+    attentes (long-poll/SSE) interrogent ce cache, jamais la base, à
+    intervalle régulier (SHWARY["STATUS_POLL_INTERVAL"], défaut 0.5s).
+
+    L'entrée de cache expire après SHWARY["STATUS_CACHE_TIMEOUT"] secondes
+    (défaut 30) : une écriture qui ne passerait pas par `set_status` (ex.
+    formulaire admin) est donc visible au plus tard après ce délai.
+    """
+
+    key_prefix = "shwary:status:"
+
+    def __init__(self):
+        self.cache = get_shwary_cache()
+        self.timeout = get_shwary_setting("STATUS_CACHE_TIMEOUT", 30)
+        self.poll_interval = get_shwary_setting("STATUS_POLL_INTERVAL", 0.5)
+
+    def key(self, pk) -> str:
+        return f"{self.key_prefix}{pk}"
+
+    def publish(self, transaction) -> None:
+        state = transaction_state(transaction.pk, transaction.status, transaction.updated_at)
+        try:
+            self.cache.set(self.key(transaction.pk), state, self.timeout)
+        except Exception as e:
+            # Le cache est une optimisation : une panne ne doit pas casser le webhook
+            logger.warning(f"Publication du statut {transaction.pk} impossible: {e}")
+
+    async def aget_state(self, pk) -> dict | None:
+        """État depuis le cache, ou depuis la base (une requête) en cas d'absence ou de panne du cache."""
+        from .models import ShwaryTransaction
+
+        try:
+            state = await self.cache.aget(self.key(pk))
+        except Exception as e:
+            # Le cache est une optimisation : une panne retombe sur la base
+            logger.warning(f"Lecture du statut {pk} impossible: {e}")
+            state = None
+        if state is not None:
+            return state
+
+        row = await ShwaryTransaction.objects.for_reads().filter(pk=pk).values("status", "updated_at").afirst()
+        if row is None:
+            return None
+
+        state = transaction_state(pk, row["status"], row["updated_at"])
+        try:
+            await self.cache.aset(self.key(pk), state, self.timeout)
+        except Exception as e:
+            logger.warning(f"Publication du statut {pk} impossible: {e}")
+        return state
+
+    async def wait_for_change(self, pk, etag: str, timeout: float) -> dict | None:
+        """
+        Attend que l'ETag publié diffère de `etag`, au plus `timeout` secondes.
+        Retourne le dernier état connu (identique à l'ancien en cas d'expiration).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            state = await self.aget_state(pk)
+            remaining = deadline - loop.time()
+            if state is None or state["etag"] != etag or remaining <= 0:
+                return state
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+
+def get_status_notifier():
+    """Instancie le notifier configuré (SHWARY["STATUS_NOTIFIER"])."""
+    path = get_shwary_setting("STATUS_NOTIFIER", "dj_shwary.notifier.CacheStatusNotifier")
+    return import_string(path)()
@@ -0,0 +1,245 @@
+"""
+Partitionnement mensuel (PostgreSQL) de la table des transactions.
+
+Optionnel : la table reste une table classique tant que la conversion n'est
+pas appliquée, et tout ceci est sans effet sur les autres bases (SQLite...).
+
+Conversion (opération bloquante, à planifier : les données sont recopiées) :
+
+    # myproject/migrations/00xx_partition_shwary.py
+    from dj_shwary.partitioning import ConvertToMonthlyPartitions
+
+    class Migration(migrations.Migration):
+        dependencies = [("dj_shwary", "0005_shwarydailyrollup"), ...]
+        operations = [ConvertToMonthlyPartitions()]
+
+ou `manage.py shwary_partitions --convert`. Ensuite, un cron quotidien crée
+les partitions à venir (et détache, si demandé, les plus anciennes) :
+
+    python manage.py shwary_partitions --months-ahead 3 [--retain-months 24]
+
+Contraintes PostgreSQL : une contrainte UNIQUE d'une table partitionnée doit
+inclure la clé de partition. La clé primaire devient (id, created_at), et
+`shwary_id` n'est plus unique que dans chaque partition (un index unique par
+mois) : deux transactions de mois différents peuvent partager un `shwary_id`.
+Le webhook et le rattrapage, qui cherchent une transaction par `shwary_id`,
+reposent alors sur l'unicité des identifiants émis par Shwary ; un doublon
+entre deux mois y lèverait MultipleObjectsReturned au lieu d'être refusé à
+l'insertion. `PARTITION_LOOKBACK_DAYS` réduit la recherche aux mois récents.
+
+Pour que le webhook et le rattrapage n'interrogent que les partitions récentes,
+définissez SHWARY["PARTITION_LOOKBACK_DAYS"] (voir `ShwaryTransaction.objects.recent()`),
+supérieur à la durée pendant laquelle Shwary renvoie ses callbacks.
+"""
+
+from datetime import date
+
+from django.db import migrations
+
+
+def is_supported(connection) -> bool:
+    return connection.vendor == "postgresql"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _table():
+    from .models import ShwaryTransaction
+
+    return ShwaryTransaction._meta.db_table
+
+
+def partition_name(month: date, table: str | None = None) -> str:
+    return f"{table or _table()}_p{month:%Y_%m}"
+
+
+def create_partition_sql(month: date, table: str | None = None, name: str | None = None) -> str:
+    table = table or _table()
+    month = month_start(month)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{name or partition_name(month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def partition_unique_sql(name: str) -> str:
+    """Unicité de `shwary_id` dans une partition (impossible sur la table parente)."""
+    return f'CREATE UNIQUE INDEX IF NOT EXISTS "{name}_shwary_id_uniq" ON "{name}" ("shwary_id")'
+
+
+def detach_partition_sql(name: str, table: str | None = None) -> str:
+    return f'ALTER TABLE "{table or _table()}" DETACH PARTITION "{name}"'
+
+
+def convert_sql(first_month: date, last_month: date, model=None) -> list[str]:
+    """
+    SQL de conversion de la table existante en table partitionnée par mois
+    (partitions de `first_month` à `last_month` + partition DEFAULT).
+
+    Args:
+        model: Modèle des transactions (historique dans une migration), défaut le modèle courant.
+    """
+    if model is None:
+        from .models import ShwaryTransaction as model
+
+    table = model._meta.db_table
+    content_types = model._meta.get_field("content_type").related_model._meta.db_table
+    new = f"{table}_partitioned"
+    statements = [
+        f'CREATE TABLE "{new}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE ("created_at")',
+        f'ALTER TABLE "{new}" ADD CONSTRAINT "{table}_pkey_part" PRIMARY KEY ("id", "created_at")',
+        f'ALTER TABLE "{new}" ADD CONSTRAINT "{table}_content_type_part_fk" FOREIGN KEY ("content_type_id") '
+        f'REFERENCES "{content_types}" ("id") DEFERRABLE INITIALLY DEFERRED',
+    ]
+
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(month, table)
+        statements += [create_partition_sql(month, new, name), partition_unique_sql(name)]
+        month = add_months(month, 1)
+    statements += [
+        f'CREATE TABLE "{table}_default" PARTITION OF "{new}" DEFAULT',
+        partition_unique_sql(f"{table}_default"),
+        f'INSERT INTO "{new}" SELECT * FROM "{table}"',
+        f'DROP TABLE "{table}"',
+        f'ALTER TABLE "{new}" RENAME TO "{table}"',
+    ]
+    return statements
+
+
+def is_partitioned(connection, table: str | None = None) -> bool:
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s",
+            [table or _table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection) -> list[str]:
+    """Noms des partitions mensuelles existantes (hors DEFAULT), triés."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [_table()],
+        )
+        prefix = f"{_table()}_p"
+        return sorted(name for (name,) in cursor.fetchall() if name.startswith(prefix))
+
+
+def convert(schema_editor, months_ahead: int = 3, model=None) -> list[str]:
+    """
+    Convertit la table (si ce n'est pas déjà fait) dans la transaction du
+    `schema_editor` (DDL transactionnel), puis recrée les index du modèle
+    sous leurs noms Django. Retourne le SQL exécuté (ou collecté).
+
+    Args:
+        model: Modèle des transactions ; dans une migration, le modèle historique
+            (`apps.get_model`), dont les index sont ceux de l'état migré.
+    """
+    from django.db.models import Min
+    from django.utils import timezone
+
+    if model is None:
+        from .models import ShwaryTransaction as model
+
+    connection = schema_editor.connection
+    if not is_supported(connection) or is_partitioned(connection, model._meta.db_table):
+        return []
+
+    today = timezone.now().date()
+    oldest = model._base_manager.using(connection.alias).aggregate(oldest=Min("created_at"))["oldest"]
+    first_month = month_start(oldest.date() if oldest else today)
+    statements = convert_sql(first_month, add_months(month_start(today), months_ahead), model)
+    for sql in statements:
+        schema_editor.execute(sql)
+
+    meta = model._meta
+    for index in meta.indexes:
+        schema_editor.add_index(model, index)
+        statements.append(str(index.create_sql(model, schema_editor)))
+    for field in meta.local_fields:
+        if field.db_index and not field.unique and not field.primary_key:
+            sql = schema_editor._create_index_sql(model, fields=[field])
+            schema_editor.execute(sql)
+            statements.append(str(sql))
+    return statements
+
+
+def ensure_partitions(connection, months_ahead: int = 3, dry_run: bool = False) -> list[str]:
+    """Crée les partitions du mois courant et des `months_ahead` mois suivants."""
+    from django.utils import timezone
+
+    if not is_partitioned(connection):
+        return []
+    current = month_start(timezone.now().date())
+    statements = []
+    for n in range(months_ahead + 1):
+        month = add_months(current, n)
+        statements += [create_partition_sql(month), partition_unique_sql(partition_name(month))]
+    _execute(connection, statements, dry_run)
+    return statements
+
+
+def detach_old_partitions(connection, retain_months: int, drop: bool = False, dry_run: bool = False) -> list[str]:
+    """Détache (ou supprime) les partitions antérieures aux `retain_months` derniers mois."""
+    from django.utils import timezone
+
+    if not is_partitioned(connection):
+        return []
+    limit = partition_name(add_months(month_start(timezone.now().date()), -retain_months))
+    statements = []
+    for name in list_partitions(connection):
+        if name < limit:
+            statements.append(detach_partition_sql(name))
+            if drop:
+                statements.append(f'DROP TABLE "{name}"')
+    _execute(connection, statements, dry_run)
+    return statements
+
+
+def _execute(connection, statements: list[str], dry_run: bool) -> None:
+    if dry_run:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class ConvertToMonthlyPartitions(migrations.operations.base.Operation):
+    """
+    Opération de migration : convertit la table des transactions en table
+    partitionnée par mois sur PostgreSQL ; sans effet sur les autres bases.
+    L'état des modèles Django n'est pas modifié.
+    """
+
+    reversible = False
+    reduces_to_sql = False
+
+    def __init__(self, months_ahead: int = 3):
+        self.months_ahead = months_ahead
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        convert(schema_editor, self.months_ahead, to_state.apps.get_model("dj_shwary", "ShwaryTransaction"))
+
+    def describe(self):
+        return "Convert ShwaryTransaction to monthly range partitions (PostgreSQL only)"
+
+    def deconstruct(self):
+        return (self.__class__.__qualname__, [], {"months_ahead": self.months_ahead})
@@ -0,0 +1,52 @@
+"""
+Récepteurs internes de dj-shwary, branchés sur les signaux de paiement.
+Importé par DjShwaryConfig.ready().
+"""
+
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import rollups, states
+from .models import ShwaryTransaction
+from .notifier import get_status_notifier
+from .signals import payment_status_changed
+
+
+@receiver(payment_status_changed, dispatch_uid="dj_shwary_publish_status")
+def publish_status_change(sender, transaction, **kwargs):
+    # Après le commit : un client réveillé ne doit jamais lire un état non validé
+    db_transaction.on_commit(lambda: get_status_notifier().publish(transaction))
+
+
+@receiver(post_save, sender=ShwaryTransaction, dispatch_uid="dj_shwary_rollup_save")
+def update_rollup_on_save(sender, instance, created, using, raw=False, **kwargs):
+    if raw or not rollups.is_enabled():
+        return
+    rollups.record_save(instance, created, using)
+
+
+@receiver(post_delete, sender=ShwaryTransaction, dispatch_uid="dj_shwary_rollup_delete")
+def update_rollup_on_delete(sender, instance, using, **kwargs):
+    if rollups.is_enabled():
+        rollups.record_delete(instance, using)
+
+
+@receiver(post_save, sender=ShwaryTransaction, dispatch_uid="dj_shwary_payment_state_save")
+def update_payment_state_on_save(sender, instance, created, using, raw=False, update_fields=None, **kwargs):
+    if raw or instance.content_type_id is None:
+        return
+    key = (instance.content_type_id, instance.object_id)
+    if created:
+        # Nouvelle tentative : l'état sera rechargé à la prochaine lecture
+        db_transaction.on_commit(lambda: states.invalidate_state(*key), using=using)
+    elif update_fields is None or "status" in update_fields:
+        # Toutes les transitions (webhook, rattrapage, admin, initiation) écrivent le statut ici
+        db_transaction.on_commit(lambda: states.refresh_state(*key), using=using)
+
+
+@receiver(post_delete, sender=ShwaryTransaction, dispatch_uid="dj_shwary_payment_state_delete")
+def invalidate_payment_state_on_delete(sender, instance, using, **kwargs):
+    if instance.content_type_id is not None:
+        key = (instance.content_type_id, instance.object_id)
+        db_transaction.on_commit(lambda: states.invalidate_state(*key), using=using)
@@ -0,0 +1,57 @@
+"""
+Rattrapage des statuts à partir de `TransactionRecord` (voir
+`ShwaryTransaction.objects.records()`).
+
+Seules les transactions dont le statut a réellement changé sont chargées
+en instance complète (verrouillée), pour passer par `set_status` : signaux,
+agrégats et notifications restent identiques au webhook.
+"""
+
+import logging
+
+from django.db import transaction as db_transaction
+
+from . import hedging, tracing
+from .routers import get_write_database
+
+logger = logging.getLogger(__name__)
+
+
+def apply_status(
+    record, status: str, raw_response: dict | None = None, sender=None, via: str = "reconcile"
+) -> bool:
+    """
+    Applique un statut vérifié à la transaction d'un record ; True si le statut a changé.
+    `via` : "reconcile" (rattrapage, défaut) ou "admin" (action manuelle).
+    """
+    from .models import ShwaryTransaction
+
+    with db_transaction.atomic(using=get_write_database(ShwaryTransaction)):
+        with tracing.span("lock.select_for_update"):
+            txn = ShwaryTransaction.objects.on_primary().select_for_update().get(pk=record.id)
+        changed = txn.set_status(status, raw_response, sender=sender, via=via)
+    record.status = txn.status
+    return changed
+
+
+def refresh_record(record, client=None, sender=None, via: str = "reconcile") -> bool:
+    """
+    Équivalent de `ShwaryTransaction.refresh_from_api` pour un record.
+
+    Returns:
+        bool: True si l'API a répondu (statut changé ou non), False en cas d'erreur.
+    """
+    from .merchants import get_client
+
+    if client is None:
+        client = hedging.wrap(get_client(record.merchant))
+
+    try:
+        with tracing.span("shwary.get_transaction", merchant=record.merchant):
+            response = client.get_transaction(record.shwary_id)
+        if response.status != record.status:
+            apply_status(record, response.status, response.model_dump(mode="json"), sender=sender, via=via)
+        return True
+    except Exception as e:
+        logger.error(f"Erreur update transaction {record.shwary_id}: {e}")
+        return False
@@ -0,0 +1,157 @@
+"""
+Maintenance incrémentale des agrégats journaliers (ShwaryDailyRollup).
+
+Chaque création, transition de statut ou suppression de transaction ajuste la
+ligne (jour de création, devise, statut, sandbox) concernée, après le commit
+de l'écriture (`on_commit`) : la ligne du jour, commune à tous les webhooks,
+n'est jamais verrouillée pendant leur transaction (`select_for_update`), et une
+écriture annulée n'est pas comptée. Les tableaux de bord lisent ensuite
+quelques lignes par jour au lieu d'agréger toute la table des transactions.
+
+Désactivable via SHWARY["DAILY_ROLLUP"] = False, ou le temps d'un bloc avec
+`suspended()`. Les écritures qui ne passent pas par `save()` / `delete()`
+(ex. `QuerySet.update()`, `_raw_delete`) ne sont pas suivies ; `bulk_create`
+doit être suivi de `record_bulk_create()`. `manage.py shwary_rebuild_rollups`
+recalcule les agrégats depuis la table (ex. après un crash entre le commit et
+la mise à jour de l'agrégat).
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .utils import get_shwary_setting
+
+
+_suspended: ContextVar[bool] = ContextVar("shwary_rollups_suspended", default=False)
+
+
+def is_enabled() -> bool:
+    return get_shwary_setting("DAILY_ROLLUP", True) and not _suspended.get()
+
+
+@contextmanager
+def suspended():
+    """Ignore les créations / suppressions du bloc (ex. nettoyage de données synthétiques)."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def rollup_day(created_at) -> date:
+    """Jour d'une transaction, dans le fuseau courant (comme TruncDate)."""
+    if settings.USE_TZ:
+        return timezone.localdate(created_at)
+    return created_at.date()
+
+
+def add(using, day, currency, status, is_sandbox, count: int, amount) -> None:
+    """Ajoute (ou retire, si négatif) un nombre et un montant à une ligne d'agrégat."""
+    from .models import ShwaryDailyRollup
+
+    key = {"day": day, "currency": currency, "status": status, "is_sandbox": is_sandbox}
+    rollups = ShwaryDailyRollup.objects.using(using).filter(**key)
+    if rollups.update(count=F("count") + count, amount=F("amount") + amount):
+        return
+
+    try:
+        # Point de sauvegarde : une création concurrente ne doit pas annuler la transaction englobante
+        with db_transaction.atomic(using=using):
+            ShwaryDailyRollup.objects.using(using).create(**key, count=count, amount=amount)
+    except IntegrityError:
+        rollups.update(count=F("count") + count, amount=F("amount") + amount)
+
+
+def schedule(using, day, currency, status, is_sandbox, count: int, amount) -> None:
+    """`add` après le commit de la transaction en cours (immédiat hors transaction)."""
+    db_transaction.on_commit(lambda: add(using, day, currency, status, is_sandbox, count, amount), using=using)
+
+
+def record_save(transaction, created: bool, using) -> None:
+    """Répercute la création ou le changement de statut d'une transaction."""
+    previous_status = getattr(transaction, "_saved_status", None)
+    transaction._saved_status = transaction.status
+    if not created and (previous_status is None or previous_status == transaction.status):
+        return
+
+    day = rollup_day(transaction.created_at)
+    args = (using, day, transaction.currency)
+    if not created:
+        schedule(*args, previous_status, transaction.is_sandbox, -1, -transaction.amount)
+    schedule(*args, transaction.status, transaction.is_sandbox, 1, transaction.amount)
+
+
+def record_delete(transaction, using) -> None:
+    status = getattr(transaction, "_saved_status", None) or transaction.status
+    schedule(using, rollup_day(transaction.created_at), transaction.currency, status,
+             transaction.is_sandbox, -1, -transaction.amount)
+
+
+def record_bulk_create(transactions, using: str | None = None) -> None:
+    """
+    Compte des transactions insérées par `bulk_create` (qui n'envoie pas post_save),
+    une mise à jour par ligne d'agrégat. Les suppressions ultérieures restent symétriques.
+    """
+    from .models import ShwaryTransaction
+    from .routers import get_write_database
+
+    if not is_enabled():
+        return
+    using = using or get_write_database(ShwaryTransaction)
+    deltas = defaultdict(lambda: [0, Decimal("0")])
+    for transaction in transactions:
+        transaction._saved_status = transaction.status
+        key = (rollup_day(transaction.created_at), transaction.currency, transaction.status, transaction.is_sandbox)
+        deltas[key][0] += 1
+        deltas[key][1] += Decimal(str(transaction.amount))
+    for key, (count, amount) in deltas.items():
+        schedule(using, *key, count, amount)
+
+
+def rebuild(start: date | None = None, end: date | None = None, using: str | None = None) -> int:
+    """
+    Recalcule les agrégats des jours [start, end] depuis la table des
+    transactions (lue sur `using`, ex. un réplica). Retourne le nombre de lignes écrites.
+    """
+    from .models import ShwaryDailyRollup, ShwaryTransaction
+    from .routers import get_write_database
+
+    transactions = ShwaryTransaction.objects.for_reads(using).annotate(day=TruncDate("created_at"))
+    if start is not None:
+        transactions = transactions.filter(day__gte=start)
+    if end is not None:
+        transactions = transactions.filter(day__lte=end)
+
+    rows = (
+        transactions.values("day", "currency", "status", "is_sandbox")
+        .annotate(total_count=Count("pk"), total_amount=Sum("amount"))
+        .order_by()
+    )
+    rollups = [
+        ShwaryDailyRollup(
+            day=row["day"],
+            currency=row["currency"],
+            status=row["status"],
+            is_sandbox=row["is_sandbox"],
+            count=row["total_count"],
+            amount=row["total_amount"] or Decimal("0"),
+        )
+        for row in rows.iterator()
+    ]
+
+    write_database = get_write_database(ShwaryDailyRollup)
+    with db_transaction.atomic(using=write_database):
+        ShwaryDailyRollup.objects.using(write_database).between(start, end).delete()
+        ShwaryDailyRollup.objects.using(write_database).bulk_create(rollups, batch_size=1000)
+    return len(rollups)
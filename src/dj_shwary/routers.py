@@ -0,0 +1,115 @@
+"""
+Répartition des requêtes dj-shwary entre base primaire et réplicas de lecture.
+
+Deux façons de décharger le primaire :
+
+1. Sans routeur, en désignant un alias pour les lectures « sans risque »
+   (statuts, listes de l'admin, scan de `check_pending_pay`, template tags) :
+
+    SHWARY = {..., "READ_DATABASE": "replica"}
+
+2. Avec le routeur fourni, qui envoie toutes les lectures des modèles
+   dj_shwary vers les réplicas et toutes les écritures vers le primaire :
+
+    DATABASE_ROUTERS = ["dj_shwary.routers.ShwaryReplicaRouter"]
+    SHWARY = {
+        ...,
+        "PRIMARY_DATABASE": "default",            # défaut
+        "READ_REPLICAS": ["replica1", "replica2"],
+    }
+
+Dans les deux cas, `select_for_update()` et les écritures (`save`, `set_status`)
+restent sur le primaire. Les lectures qui doivent voir une écriture récente
+(webhook, tâches différées) passent par `ShwaryTransaction.objects.on_primary()`
+ou le bloc `with pin_primary():`.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, router
+
+from .utils import get_shwary_setting
+
+APP_LABEL = "dj_shwary"
+
+_primary_pinned: ContextVar[bool] = ContextVar("shwary_primary_pinned", default=False)
+
+
+@contextmanager
+def pin_primary():
+    """Force les lectures du routeur sur le primaire dans ce bloc (lecture de ses propres écritures)."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def get_primary_database() -> str:
+    return get_shwary_setting("PRIMARY_DATABASE") or DEFAULT_DB_ALIAS
+
+
+def get_read_databases() -> list[str]:
+    """Alias configurés pour les lectures (réplicas)."""
+    replicas = list(get_shwary_setting("READ_REPLICAS", []))
+    read_database = get_shwary_setting("READ_DATABASE")
+    if read_database and read_database not in replicas:
+        replicas.append(read_database)
+    return replicas
+
+
+def get_read_database(using: str | None = None) -> str | None:
+    """
+    Alias à utiliser pour une lecture sans risque : `using` s'il est fourni,
+    sinon SHWARY["READ_DATABASE"], sinon None (décision laissée aux routeurs).
+    """
+    return using or get_shwary_setting("READ_DATABASE")
+
+
+def get_write_database(model, instance=None) -> str:
+    """
+    Alias d'écriture pour `model`. Sans routeur, Django écrirait une instance
+    sur la base d'où elle a été lue : on ramène les réplicas vers le primaire.
+    """
+    primary = get_shwary_setting("PRIMARY_DATABASE")
+    if primary:
+        return primary
+    alias = router.db_for_write(model, instance=instance)
+    if alias in get_read_databases():
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+class ShwaryReplicaRouter:
+    """
+    Lectures des modèles dj_shwary sur un réplica (choisi au hasard parmi
+    SHWARY["READ_REPLICAS"]), écritures et `select_for_update` sur le primaire.
+    Les autres applications ne sont pas concernées.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        if _primary_pinned.get():
+            return get_primary_database()
+        replicas = get_read_databases()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        return get_primary_database()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaire et réplicas contiennent les mêmes données
+        databases = {get_primary_database(), *get_read_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == APP_LABEL and db in get_read_databases():
+            return False
+        return None
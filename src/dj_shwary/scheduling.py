@@ -0,0 +1,149 @@
+"""
+Ordonnancement du rattrapage : les transactions en attente sont vérifiées par
+priorité décroissante plutôt que dans l'ordre `-created_at` du modèle, pour
+qu'un passage interrompu (`check_pending_pay --max-seconds`) ait traité les
+plus urgentes.
+
+Priorité d'une transaction :
+
+    âge / SLA                                   (SHWARY["RECONCILE_SLA"], défaut 900s)
+    + RECONCILE_AMOUNT_WEIGHT * montant / montant max de la page   (défaut 0.5)
+    + RECONCILE_WATCH_BOOST si un client attend sur la page de statut  (défaut 1.0)
+
+Équité : une file par couple (devise, pays), servies à tour de rôle ; un marché
+très actif ne peut pas affamer les autres. Chaque file est lue par pages, des
+plus anciennes aux plus récentes (keyset sur l'index (status, created_at)), et
+triée par priorité à l'intérieur de la page ; sa première page inclut aussi les
+transactions récentes suivies sur la page de statut.
+
+La page de statut (`ShwaryStatusView`) marque les transactions suivies dans le
+cache pendant SHWARY["RECONCILE_WATCH_TTL"] secondes (défaut 60).
+"""
+
+import logging
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .managers import TransactionRecord
+from .utils import get_shwary_cache, get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+WATCH_PREFIX = "shwary:watch:"
+
+ROW_FIELDS = (*TransactionRecord.fields, "created_at", "amount")
+
+
+def watch_key(pk) -> str:
+    return f"{WATCH_PREFIX}{pk}"
+
+
+async def amark_watched(pk) -> None:
+    """Signale qu'un client attend le statut de la transaction (page de statut)."""
+    try:
+        await get_shwary_cache().aset(watch_key(pk), 1, get_shwary_setting("RECONCILE_WATCH_TTL", 60))
+    except Exception as e:
+        # Simple bonus de priorité : une panne du cache ne doit pas casser la page de statut
+        logger.warning(f"Marquage de la transaction suivie {pk} impossible: {e}")
+
+
+def watched_ids(pks) -> set[str]:
+    """Parmi `pks`, les transactions suivies (une lecture `get_many`)."""
+    keys = {watch_key(pk): str(pk) for pk in pks}
+    if not keys:
+        return set()
+    try:
+        return {keys[key] for key in get_shwary_cache().get_many(keys)}
+    except Exception as e:
+        logger.warning(f"Lecture des transactions suivies impossible: {e}")
+        return set()
+
+
+class Lane:
+    """File d'une (devise, pays) : pages keyset des plus anciennes, triées par priorité."""
+
+    def __init__(self, scheduler: "ReconciliationScheduler", currency: str, country: str | None):
+        self.scheduler = scheduler
+        self.queryset = scheduler.queryset.filter(currency=currency, country=country)
+        self.after: tuple[datetime, object] | None = None
+        self.buffer: list[TransactionRecord] = []
+        self.first_page = True
+        self.exhausted = False
+
+    def next(self) -> TransactionRecord | None:
+        while not self.buffer and not self.exhausted:
+            self.load()
+        return self.buffer.pop() if self.buffer else None
+
+    def load(self) -> None:
+        size = self.scheduler.page_size
+        oldest = self.queryset.order_by("created_at", "pk")
+        if self.after is not None:
+            created_at, pk = self.after
+            oldest = oldest.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        rows = list(oldest.values_list(*ROW_FIELDS)[:size])
+        if len(rows) < size:
+            self.exhausted = True
+        if rows:
+            self.after = (rows[-1][4], rows[-1][0])
+
+        if self.first_page:
+            # Les clients qui attendent sont sur les transactions récentes, hors de la première page
+            self.first_page = False
+            newest = list(self.queryset.order_by("-created_at", "-pk").values_list(*ROW_FIELDS)[:size])
+            watched = watched_ids(row[0] for row in rows + newest)
+            # File plus petite qu'une page : les récentes suivies sont déjà dans `rows`
+            in_page = {row[0] for row in rows}
+            rows += [row for row in newest if str(row[0]) in watched and row[0] not in in_page]
+        else:
+            watched = watched_ids(row[0] for row in rows)
+
+        rows = [row for row in rows if row[0] not in self.scheduler.seen]
+        self.scheduler.seen.update(row[0] for row in rows)
+        max_amount = max((row[5] for row in rows), default=0) or 1
+        scored = sorted(
+            rows, key=lambda row: self.scheduler.score(row[4], row[5], max_amount, str(row[0]) in watched)
+        )
+        # Priorité la plus haute en fin de liste : pop() en O(1)
+        self.buffer = [TransactionRecord(*row[:4]) for row in scored]
+
+
+class ReconciliationScheduler:
+    """
+    Itère sur les transactions de `queryset` par priorité, à tour de rôle entre
+    les couples (devise, pays). Les pages sont lues à la demande : un passage
+    arrêté tôt n'a lu que ce qu'il a traité.
+
+        for record in ReconciliationScheduler(pending):
+            refresh_record(record)
+    """
+
+    def __init__(self, queryset, page_size: int = 500, now: datetime | None = None):
+        self.queryset = queryset.order_by()
+        self.page_size = page_size
+        self.now = now or timezone.now()
+        self.sla = get_shwary_setting("RECONCILE_SLA", 900)
+        self.amount_weight = get_shwary_setting("RECONCILE_AMOUNT_WEIGHT", 0.5)
+        self.watch_boost = get_shwary_setting("RECONCILE_WATCH_BOOST", 1.0)
+        self.seen: set = set()
+
+    def score(self, created_at: datetime, amount, max_amount, watched: bool) -> float:
+        age = (self.now - created_at).total_seconds()
+        score = age / self.sla + self.amount_weight * float(amount) / float(max_amount)
+        return score + self.watch_boost if watched else score
+
+    def lanes(self) -> list[Lane]:
+        pairs = self.queryset.values_list("currency", "country").distinct()
+        return [Lane(self, currency, country) for currency, country in sorted(pairs, key=str)]
+
+    def __iter__(self):
+        lanes = self.lanes()
+        while lanes:
+            for lane in list(lanes):
+                record = lane.next()
+                if record is None:
+                    lanes.remove(lane)
+                else:
+                    yield record
@@ -1,11 +1,13 @@
 from typing import Literal
 from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
+from django.utils import timezone
 
-from shwary import Shwary, ShwaryError
-
-from .utils import get_shwary_config, get_webhook_absolute_url
+from . import hedging, tracing
+from .merchants import get_client, get_merchant, resolve_merchant
+from .utils import get_shwary_setting, get_webhook_absolute_url
 from .models import ShwaryTransaction
+from .reconciliation import apply_status
 
 
 class ShwaryService:
@@ -19,18 +21,35 @@ class ShwaryService:
     - Gère les erreurs de manière robuste pour éviter les incohérences dans la base de données et fournir des feedbacks clairs à l'utilisateur ou au développeur.
     """
 
-    def __init__(self, client=None):
+    def __init__(self, client=None, merchant: str | None = None, using: str | None = None,
+                 deadline: float | None = None):
+        self.merchant = get_merchant(merchant)
+        # Délai maximal (s) des vérifications de statut, défaut SHWARY["VERIFY_DEADLINE"]
+        # (voir dj_shwary.hedging, qui gère aussi le hedging des lectures).
+        self.deadline = deadline
+        # Alias de base pour les lectures de statut (réplica) ; les écritures
+        # restent sur le primaire (voir dj_shwary.routers).
+        self.using = using
         self.merchant_id, self.merchant_key, self.is_sandbox, self.timeout = (
-            get_shwary_config()
+            self.merchant.merchant_id,
+            self.merchant.merchant_key,
+            self.merchant.is_sandbox,
+            self.merchant.timeout,
         )
 
-        self.client = client or Shwary(
-            merchant_id=self.merchant_id,
-            merchant_key=self.merchant_key,
-            is_sandbox=self.is_sandbox,
-            timeout=self.timeout,
-        )
+        # Sans marchand explicite ni client fourni, chaque paiement est routé
+        # vers le marchand de son pays (voir merchants.resolve_merchant).
+        self._route_by_country = merchant is None and client is None
+        self._custom_client = client is not None
+        self.client = hedging.wrap(client or get_client(self.merchant.name), deadline)
+
+    def client_for(self, merchant: str):
+        """Client à utiliser pour une transaction du marchand `merchant`."""
+        if self._custom_client or merchant == self.merchant.name:
+            return self.client
+        return hedging.wrap(get_client(merchant), self.deadline)
 
+    @tracing.traced("service.make_payment")
     def make_payment(
         self,
         related_object,
@@ -39,6 +58,7 @@ class ShwaryService:
         country: Literal["DRC", "KE", "UG"] = "DRC",
         currency: str = "CDF",
         callback_url: str | None = None,
+        defer: bool | None = None,
     ) -> ShwaryTransaction:
         """
         Crée une transaction locale et initie le paiement sur l'API Shwary.
@@ -48,11 +68,19 @@ class ShwaryService:
             amount: Montant (Decimal ou float)
             phone_number: Numéro du client
             country: Code pays (DRC, KE, UG)
+            defer: Si True, l'appel à l'API est confié au backend de tâches
+                (SHWARY["TASK_BACKEND"]) et la transaction PENDING est retournée
+                immédiatement. Par défaut : SHWARY["DEFER_INITIATION"] (False).
 
         Returns:
             ShwaryTransaction: L'instance créée ou mise à jour avec les infos de Shwary.
         """
 
+        if defer is None:
+            defer = get_shwary_setting("DEFER_INITIATION", False)
+
+        merchant = resolve_merchant(country) if self._route_by_country else self.merchant
+
         # Préparation de la liaison générique (GenericForeignKey)
         content_type = ContentType.objects.get_for_model(related_object)
         object_id = str(related_object.pk)
@@ -65,7 +93,9 @@ class ShwaryService:
             amount=amount,
             currency=currency,
             phone_number=phone_number,
-            is_sandbox=self.is_sandbox,
+            is_sandbox=merchant.is_sandbox,
+            merchant=merchant.name,
+            country=country,
             status=ShwaryTransaction.Status.PENDING,
             error_message="Initiating...",
         )
@@ -73,31 +103,73 @@ class ShwaryService:
         if not callback_url:
             # Si callback_url n'est pas fourni, on génère une par défaut
             relative_url = reverse("dj_shwary:shwary-webhook")
-            callback_url = get_webhook_absolute_url(relative_url)
+            with tracing.span("site.lookup"):
+                callback_url = get_webhook_absolute_url(relative_url)
+
+        if defer:
+            from .tasks import caller_service, enqueue_task
+
+            # Exécutée sur place (EagerBackend), la tâche garde ce service (client, délai) ;
+            # ailleurs, le worker utilise le marchand enregistré sur la transaction
+            with caller_service(self):
+                backend = enqueue_task(
+                    "initiate_payment",
+                    transaction_id=str(txn.pk),
+                    country=country,
+                    callback_url=callback_url,
+                )
+            if backend.eager:
+                # La tâche a travaillé sur sa propre instance
+                txn.refresh_from_db()
+            return txn
+
+        return self.initiate_payment(txn, country, callback_url)
+
+    @tracing.traced("service.initiate_payment")
+    def initiate_payment(
+        self,
+        txn: ShwaryTransaction,
+        country: str,
+        callback_url: str | None,
+        notify: bool = False,
+    ) -> ShwaryTransaction:
+        """
+        Appelle l'API Shwary pour une transaction locale déjà créée et enregistre le résultat.
+
+        Args:
+            notify: Envoie les signaux de paiement une fois le résultat enregistré
+                (initiation différée : personne n'attend l'exception).
+
+        Raises:
+            ShwaryError: Si l'API refuse ou échoue (la transaction est marquée FAILED).
+        """
+        previous_status = txn.status
 
         try:
             # Appel API via le SDK
-            response = self.client.initiate_payment(
-                country=country,
-                amount=amount,
-                phone_number=phone_number,
-                callback_url=callback_url,
-            )
+            with tracing.span("shwary.initiate_payment", merchant=txn.merchant):
+                response = self.client_for(txn.merchant).initiate_payment(
+                    country=country,
+                    amount=txn.amount,
+                    phone_number=txn.phone_number,
+                    callback_url=callback_url,
+                )
 
             # Mise à jour succès (On a l'ID Shwary !)
             txn.shwary_id = response.id
             txn.status = response.status
             txn.raw_response = response.model_dump(mode="json")
             txn.error_message = None
-            txn.save(
-                update_fields=(
-                    "shwary_id",
-                    "status",
-                    "raw_response",
-                    "error_message",
-                    "updated_at",
-                )
-            )
+            txn.initiated_at = timezone.now()
+            update_fields = ["shwary_id", "status", "raw_response", "error_message", "initiated_at", "updated_at"]
+            if txn.is_final:
+                # Réglée dès l'initiation (rare) : horodatée comme les autres écrivains
+                txn.mark_settled(ShwaryTransaction.SettledVia.INITIATION)
+                update_fields += ["settled_at", "settled_via"]
+            txn.save(update_fields=update_fields)
+
+            if notify:
+                txn.send_status_signals(previous_status, sender=self.__class__)
 
             return txn
 
@@ -109,30 +181,53 @@ class ShwaryService:
             if hasattr(e, "raw_response"):
                 txn.raw_response = e.raw_response
 
-            txn.save(update_fields=("status", "error_message", "updated_at"))
+            txn.mark_settled(ShwaryTransaction.SettledVia.INITIATION)
+            txn.save(
+                update_fields=(
+                    "status",
+                    "error_message",
+                    "raw_response",
+                    "settled_at",
+                    "settled_via",
+                    "updated_at",
+                )
+            )
+
+            if notify:
+                txn.send_status_signals(previous_status, sender=self.__class__)
+
+            # Import différé : le SDK n'est chargé qu'au premier appel (voir apps.py)
+            from shwary import ShwaryError
 
             # On relève l'exception pour que le contrôleur (View) puisse afficher un message à l'utilisateur
             raise ShwaryError from e
 
+    @tracing.traced("service.check_status")
     def check_status(self, transaction_id):
         """
         Force la vérification du statut d'une transaction (Polling).
         Utile si le webhook n'est jamais arrivé.
         """
-        try:
-            # Récupération locale
-            txn = ShwaryTransaction.objects.get(shwary_id=transaction_id)
-
-            # Appel API
-            api_response = self.client.get_transaction(transaction_id)
-
-            # Mise à jour si changement
-            if txn.status != api_response.status:
-                txn.status = api_response.status
-                txn.raw_response = api_response.model_dump(mode="json")
-                txn.save(update_fields=("status", "raw_response", "updated_at"))
+        # Lecture légère (éventuellement sur un réplica) : seul le marchand sert à l'appel API
+        record = next(
+            ShwaryTransaction.objects.for_reads(self.using).filter(shwary_id=transaction_id).records(), None
+        )
+        if record is None:
+            return None
 
-            return api_response.status
+        # Appel API
+        with tracing.span("shwary.get_transaction", merchant=record.merchant):
+            api_response = self.client_for(record.merchant).get_transaction(transaction_id)
+
+        # Mise à jour si changement : statut relu sous verrou sur le primaire, un
+        # réplica en retard ne peut pas renvoyer les signaux d'un webhook déjà appliqué
+        if record.status != api_response.status:
+            apply_status(
+                record,
+                api_response.status,
+                api_response.model_dump(mode="json"),
+                sender=self.__class__,
+                via=ShwaryTransaction.SettledVia.RECONCILE,
+            )
 
-        except ShwaryTransaction.DoesNotExist:
-            return None
+        return api_response.status
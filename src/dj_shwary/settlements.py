@@ -0,0 +1,99 @@
+"""
+Regroupement des paiements réglés en un signal par lot.
+
+`payment_success` / `payment_failed` partent une fois par transaction : quand
+le rattrapage règle 5 000 paiements, les receivers font 5 000 requêtes. Dans un
+bloc `collect_settlements()`, les transactions arrivées à un statut final sont
+collectées, puis `payments_settled_bulk` est envoyé une seule fois (après le
+commit, et au plus toutes les SHWARY["BULK_SIGNAL_SIZE"] transactions) :
+
+    @receiver(payments_settled_bulk)
+    def mark_orders_paid(sender, transactions, succeeded, failed, **kwargs):
+        Order.objects.filter(pk__in=[t.object_id for t in succeeded]).update(paid=True)
+
+    with collect_settlements(sender=MyImport):
+        for txn in txns:
+            txn.set_status("completed")
+
+Utilisé par `check_pending_pay`, l'action admin de mise à jour et les webhooks
+groupés. Les signaux par transaction restent envoyés, sauf si
+SHWARY["BULK_PER_ITEM_SIGNALS"] = False (ou `per_item=False`) : seuls
+`payment_status_changed` (notifications internes) et le signal groupé partent alors.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction as db_transaction
+
+from .utils import get_shwary_setting
+
+
+class SettlementBatch:
+    def __init__(self, sender=None, per_item: bool | None = None, max_size: int | None = None):
+        self.sender = sender
+        self.per_item = get_shwary_setting("BULK_PER_ITEM_SIGNALS", True) if per_item is None else per_item
+        self.max_size = max_size or get_shwary_setting("BULK_SIGNAL_SIZE", 1000)
+        self.transactions: list = []
+        self.lock = threading.Lock()
+
+    def add(self, transaction) -> None:
+        """Collecte une transaction réglée, une fois son écriture validée (commit)."""
+        from .models import ShwaryTransaction
+        from .routers import get_write_database
+
+        # Enregistré dans le point de sauvegarde courant : une mise à jour annulée n'est pas collectée
+        db_transaction.on_commit(lambda: self._append(transaction), using=get_write_database(ShwaryTransaction))
+
+    def _append(self, transaction) -> None:
+        with self.lock:
+            self.transactions.append(transaction)
+            full = len(self.transactions) >= self.max_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        from .models import ShwaryTransaction
+        from .signals import payments_settled_bulk
+
+        with self.lock:
+            transactions, self.transactions = self.transactions, []
+        if not transactions:
+            return
+        payments_settled_bulk.send(
+            sender=self.sender or ShwaryTransaction,
+            transactions=transactions,
+            succeeded=[txn for txn in transactions if txn.status == ShwaryTransaction.Status.COMPLETED],
+            failed=[txn for txn in transactions if txn.status == ShwaryTransaction.Status.FAILED],
+        )
+
+
+_current: ContextVar[SettlementBatch | None] = ContextVar("shwary_settlement_batch", default=None)
+
+
+def current_batch() -> SettlementBatch | None:
+    return _current.get()
+
+
+@contextmanager
+def collect_settlements(sender=None, per_item: bool | None = None, batch: SettlementBatch | None = None):
+    """
+    Collecte les paiements réglés du bloc et envoie `payments_settled_bulk`
+    à la sortie. Avec `batch`, rejoint un lot existant (ex. depuis un thread
+    de travail) : le signal est alors envoyé par le bloc qui a créé le lot.
+    """
+    owner = batch is None
+    if owner:
+        batch = SettlementBatch(sender, per_item)
+    token = _current.set(batch)
+    try:
+        yield batch
+    finally:
+        _current.reset(token)
+        if owner:
+            from .models import ShwaryTransaction
+            from .routers import get_write_database
+
+            # Après les collectes en attente de commit si le bloc est dans une transaction
+            db_transaction.on_commit(batch.flush, using=get_write_database(ShwaryTransaction))
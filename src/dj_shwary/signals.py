@@ -1,7 +1,9 @@
 from django.dispatch import Signal
 
+# Tous les signaux de paiement reçoivent les mêmes arguments :
+# sender, transaction (instance du modèle), raw_data (dict), previous_status (str)
+
 # Signal envoyé quand un paiement réussit
-# Arguments: sender, transaction (instance du modèle), raw_data (dict)
 payment_success = Signal()
 
 # Signal envoyé quand un paiement échoue
@@ -9,3 +11,8 @@ payment_failed = Signal()
 
 # Signal générique pour tout changement de statut
 payment_status_changed = Signal()
+
+# Signal envoyé une fois par lot (rattrapage, webhooks groupés, collect_settlements) :
+# sender, transactions (liste des transactions arrivées à un statut final),
+# succeeded, failed (les mêmes, séparées par statut). Voir dj_shwary.settlements.
+payments_settled_bulk = Signal()
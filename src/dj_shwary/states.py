@@ -0,0 +1,169 @@
+"""
+État de paiement d'un objet métier ("cette commande est-elle payée ?") servi
+par le cache Django au lieu d'une requête générique sur (content_type, object_id)
+à chaque appel.
+
+    from dj_shwary.states import payment_state, payment_states
+
+    payment_state(order).is_paid
+    states = payment_states(orders)          # {order: PaymentState}, une requête au plus
+
+L'entrée d'un objet est réécrite après le commit de chaque transition
+(webhook, rattrapage, action admin : tout passe par `set_status`) et de chaque
+création, et effacée à la suppression d'une transaction. Les absences sont
+résolues en une seule requête groupée puis mises en cache avec `cache.add` :
+un lecteur ne remplace jamais une entrée écrite entre-temps par une
+transition, plus récente que ce qu'il a lu (éventuellement sur un réplica).
+
+Les écritures qui contournent le modèle (`queryset.update()`) ne sont visibles
+qu'à l'expiration de l'entrée (SHWARY["PAYMENT_STATE_TIMEOUT"], défaut 600s).
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.contrib.contenttypes.models import ContentType
+
+from .utils import get_shwary_cache, get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "shwary:payment_state:"
+
+
+@dataclass(frozen=True)
+class PaymentState:
+    # Statut de la transaction la plus récente (None si l'objet n'en a aucune)
+    status: str | None = None
+    # Au moins une transaction réussie (un nouvel essai échoué ne "dé-paie" pas l'objet)
+    is_paid: bool = False
+    transaction_id: str | None = None
+
+
+def state_key(content_type_id: int, object_id: str) -> str:
+    return f"{KEY_PREFIX}{content_type_id}:{object_id}"
+
+
+def object_key(obj) -> tuple[int, str]:
+    return ContentType.objects.get_for_model(obj).pk, str(obj.pk)
+
+
+def get_timeout() -> int:
+    return get_shwary_setting("PAYMENT_STATE_TIMEOUT", 600)
+
+
+def load_states(keys, using: str | None = None) -> dict[tuple[int, str], PaymentState]:
+    """États calculés depuis la base pour des (content_type_id, object_id), en une requête."""
+    from django.db.models import Q
+
+    from .models import ShwaryTransaction
+
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    by_type: dict[int, set[str]] = {}
+    for content_type_id, object_id in keys:
+        by_type.setdefault(content_type_id, set()).add(object_id)
+    condition = Q()
+    for content_type_id, object_ids in by_type.items():
+        condition |= Q(content_type_id=content_type_id, object_id__in=object_ids)
+
+    rows = (
+        ShwaryTransaction.objects.for_reads(using)
+        .filter(condition)
+        .order_by("content_type_id", "object_id", "-created_at")
+        .values_list("content_type_id", "object_id", "pk", "status")
+    )
+    latest: dict[tuple[int, str], tuple[str, str]] = {}
+    paid: set[tuple[int, str]] = set()
+    for content_type_id, object_id, pk, status in rows:
+        key = (content_type_id, object_id)
+        # Tri décroissant sur created_at : la première ligne vue est la plus récente
+        latest.setdefault(key, (str(pk), status))
+        if status == ShwaryTransaction.Status.COMPLETED:
+            paid.add(key)
+
+    states = {}
+    for key in keys:
+        if key in latest:
+            transaction_id, status = latest[key]
+            states[key] = PaymentState(status=status, is_paid=key in paid, transaction_id=transaction_id)
+        else:
+            states[key] = PaymentState()
+    return states
+
+
+def get_states(keys, using: str | None = None) -> dict[tuple[int, str], PaymentState]:
+    """États depuis le cache ; les absences sont chargées en une requête puis mises en cache."""
+    keys = set(keys)
+    cache = get_shwary_cache()
+    cache_keys = {state_key(*key): key for key in keys}
+    try:
+        cached = cache.get_many(cache_keys)
+    except Exception as e:
+        # Le cache est une optimisation : une panne retombe sur la base
+        logger.warning(f"Lecture des états de paiement impossible: {e}")
+        cached = {}
+
+    states = {cache_keys[cache_key]: state for cache_key, state in cached.items()}
+    missing = keys - states.keys()
+    if missing:
+        loaded = load_states(missing, using)
+        states.update(loaded)
+        store_states(loaded, overwrite=False)
+    return states
+
+
+def store_states(states: dict[tuple[int, str], PaymentState], overwrite: bool = True) -> None:
+    """
+    Args:
+        overwrite: False pour un remplissage après absence : `add` n'écrase pas
+            l'état qu'une transition aurait écrit depuis la lecture.
+    """
+    cache = get_shwary_cache()
+    timeout = get_timeout()
+    try:
+        if overwrite:
+            cache.set_many({state_key(*key): state for key, state in states.items()}, timeout)
+        else:
+            for key, state in states.items():
+                cache.add(state_key(*key), state, timeout)
+    except Exception as e:
+        logger.warning(f"Écriture des états de paiement impossible: {e}")
+
+
+def refresh_state(content_type_id: int, object_id: str) -> None:
+    """
+    Recalcule et réécrit l'état d'un objet. Lu sur le primaire : appelé
+    juste après un commit, un réplica pourrait encore servir l'ancien statut.
+    """
+    from .routers import get_write_database
+    from .models import ShwaryTransaction
+
+    key = (content_type_id, object_id)
+    store_states(load_states([key], using=get_write_database(ShwaryTransaction)))
+
+
+def invalidate_state(content_type_id: int, object_id: str) -> None:
+    try:
+        get_shwary_cache().delete(state_key(content_type_id, object_id))
+    except Exception as e:
+        logger.warning(f"Invalidation de l'état de paiement impossible: {e}")
+
+
+def payment_state(obj, using: str | None = None) -> PaymentState:
+    """État de paiement d'un objet métier (cache, sinon une requête)."""
+    key = object_key(obj)
+    return get_states([key], using)[key]
+
+
+def payment_states(objs, using: str | None = None) -> dict:
+    """
+    États de paiement d'une liste d'objets métier : {obj: PaymentState}.
+    Une seule lecture de cache (`get_many`) et au plus une requête pour les absents.
+    """
+    objs = list(objs)
+    keys = {obj: object_key(obj) for obj in objs}
+    states = get_states(keys.values(), using)
+    return {obj: states[key] for obj, key in keys.items()}
@@ -0,0 +1,89 @@
+"""
+Statistiques de règlement : délai initiation -> statut final (p50/p95/p99) et
+part des règlements arrivés par webhook ou par rattrapage (polling), par pays
+et par jour de règlement.
+
+La lecture est un parcours de plage sur l'index (settled_at, country) : seules
+les transactions réglées dans la période sont lues, colonne par colonne
+(`values_list`), par paquets. Les percentiles sont calculés en Python
+(`utils.percentile`), sans dépendre de fonctions SQL propres à une base.
+
+    rows = settlement_stats(ShwaryTransaction.objects.for_reads(), since, until)
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .exports import day_start
+from .utils import percentile
+
+PERCENTILES = (50, 95, 99)
+
+UNKNOWN_COUNTRY = "?"
+
+
+@dataclass
+class SettlementStats:
+    day: date
+    country: str
+    settled: int
+    webhook_share: float
+    reconcile_share: float
+    admin_share: float
+    p50: float
+    p95: float
+    p99: float
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["day"] = self.day.isoformat()
+        return data
+
+
+def settlement_stats(
+    queryset, since: date | None = None, until: date | None = None, chunk_size: int = 2000
+) -> list[SettlementStats]:
+    """
+    Statistiques par (jour de règlement, pays) sur [since, until] (bornes incluses).
+
+    Les échecs à l'initiation (settled_via="initiation") sont exclus : ils ne
+    mesurent pas le délai de règlement. Le délai part de `initiated_at`
+    (ou `created_at` pour les transactions antérieures au champ), en secondes.
+    """
+    from .models import ShwaryTransaction
+
+    queryset = queryset.filter(settled_at__isnull=False).exclude(
+        settled_via=ShwaryTransaction.SettledVia.INITIATION
+    )
+    if since is not None:
+        queryset = queryset.filter(settled_at__gte=day_start(since))
+    if until is not None:
+        queryset = queryset.filter(settled_at__lt=day_start(until + timedelta(days=1)))
+
+    durations = defaultdict(list)
+    channels = defaultdict(Counter)
+    rows = queryset.order_by().values_list("country", "settled_via", "created_at", "initiated_at", "settled_at")
+    for country, via, created_at, initiated_at, settled_at in rows.iterator(chunk_size=chunk_size):
+        day = timezone.localtime(settled_at).date() if settings.USE_TZ else settled_at.date()
+        key = (day, country or UNKNOWN_COUNTRY)
+        durations[key].append(max(0.0, (settled_at - (initiated_at or created_at)).total_seconds()))
+        channels[key][via] += 1
+
+    stats = []
+    for key in sorted(durations):
+        values, counts = durations[key], channels[key]
+        total = len(values)
+        stats.append(SettlementStats(
+            day=key[0],
+            country=key[1],
+            settled=total,
+            webhook_share=counts[ShwaryTransaction.SettledVia.WEBHOOK] / total,
+            reconcile_share=counts[ShwaryTransaction.SettledVia.RECONCILE] / total,
+            admin_share=counts[ShwaryTransaction.SettledVia.ADMIN] / total,
+            **{f"p{pct}": percentile(values, pct) for pct in PERCENTILES},
+        ))
+    return stats
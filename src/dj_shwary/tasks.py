@@ -0,0 +1,185 @@
+"""
+Tâches asynchrones de dj-shwary et backends d'exécution.
+
+`ShwaryService.make_payment(..., defer=True)` crée la transaction PENDING puis
+confie l'appel à l'API Shwary au backend configuré, pour que la latence du
+checkout ne dépende plus de celle de Shwary :
+
+    SHWARY = {
+        ...,
+        "DEFER_INITIATION": True,
+        "TASK_BACKEND": "dj_shwary.tasks.DatabaseBackend",  # défaut
+    }
+
+Backends fournis :
+- DatabaseBackend : file en base (modèle ShwaryTask) consommée par `manage.py shwary_worker`.
+- CeleryBackend : tâche Celery `dj_shwary.run_task` (Celery requis).
+- DjangoTasksBackend : API `django.tasks` (Django 6.0+).
+- EagerBackend : exécution immédiate et synchrone, pour les tests.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction as db_transaction
+from django.utils.module_loading import import_string
+
+from .utils import get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+# Marqueur posé (et validé) avant l'appel à l'API : une tâche reprise après un crash
+# du worker entre l'appel et l'enregistrement ne relance pas le paiement
+INITIATION_IN_FLIGHT = "Initiating (task)..."
+INITIATION_INTERRUPTED = "Initiation interrupted: outcome unknown at Shwary, check manually"
+
+# Service de l'appelant, pour les backends qui exécutent la tâche dans son processus
+_caller_service: ContextVar = ContextVar("shwary_caller_service", default=None)
+
+
+@contextmanager
+def caller_service(service):
+    """Les tâches exécutées dans le bloc (EagerBackend) réutilisent `service` (client, délai)."""
+    token = _caller_service.set(service)
+    try:
+        yield
+    finally:
+        _caller_service.reset(token)
+
+
+# --- Tâches ---
+
+
+def initiate_payment(transaction_id: str, country: str, callback_url: str | None) -> None:
+    """Initie auprès de Shwary une transaction créée par `make_payment(defer=True)`."""
+    from django.utils import timezone
+    from shwary import ShwaryError
+
+    from .models import ShwaryTransaction
+    from .services import ShwaryService
+
+    # Transaction tout juste créée : on ne la cherche pas sur un réplica en retard
+    txn = ShwaryTransaction.objects.on_primary().filter(pk=transaction_id).first()
+    if txn is None:
+        logger.warning(f"Initiation différée : transaction {transaction_id} introuvable.")
+        return
+
+    if txn.shwary_id or txn.status != ShwaryTransaction.Status.PENDING:
+        # Tâche livrée deux fois : la transaction a déjà été initiée
+        return
+
+    claimed = ShwaryTransaction.objects.on_primary().filter(
+        pk=txn.pk, shwary_id__isnull=True, status=ShwaryTransaction.Status.PENDING
+    ).exclude(
+        error_message__in=(INITIATION_IN_FLIGHT, INITIATION_INTERRUPTED)
+    ).update(error_message=INITIATION_IN_FLIGHT, updated_at=timezone.now())
+    if not claimed:
+        if txn.error_message == INITIATION_IN_FLIGHT:
+            # Tâche reprise : l'appel précédent a peut-être abouti chez Shwary sans être enregistré
+            ShwaryTransaction.objects.on_primary().filter(pk=txn.pk).update(
+                error_message=INITIATION_INTERRUPTED, updated_at=timezone.now()
+            )
+            logger.error(
+                f"Initiation différée interrompue pour {transaction_id} : non relancée, "
+                "état inconnu chez Shwary (vérification manuelle nécessaire)."
+            )
+        return
+    txn.error_message = INITIATION_IN_FLIGHT
+
+    # Marchand de la transaction ; dans le processus appelant, son propre service
+    service = _caller_service.get() or ShwaryService(merchant=txn.merchant or None)
+    try:
+        service.initiate_payment(txn, country, callback_url, notify=True)
+    except ShwaryError:
+        # L'échec est enregistré sur la transaction et signalé via payment_failed
+        logger.warning(f"Initiation différée échouée pour {transaction_id}: {txn.error_message}")
+
+
+TASKS = {
+    "initiate_payment": initiate_payment,
+}
+
+
+def run_task(name: str, kwargs: dict) -> None:
+    """Point d'entrée commun à tous les backends."""
+    try:
+        func = TASKS[name]
+    except KeyError:
+        raise ValueError(f"Tâche Shwary inconnue : {name}")
+    func(**kwargs)
+
+
+# --- Backends ---
+
+
+class BaseTaskBackend:
+    # Attendre le commit avant de publier : le worker doit trouver la transaction
+    enqueue_on_commit = True
+    # La tâche s'exécute pendant `enqueue`, dans le processus appelant
+    eager = False
+
+    def enqueue(self, name: str, kwargs: dict) -> None:
+        raise NotImplementedError
+
+
+class EagerBackend(BaseTaskBackend):
+    """Exécute la tâche immédiatement, dans le processus appelant (tests)."""
+
+    enqueue_on_commit = False
+    eager = True
+
+    def enqueue(self, name, kwargs):
+        run_task(name, kwargs)
+
+
+class DatabaseBackend(BaseTaskBackend):
+    """Insère la tâche dans la table ShwaryTask (voir `manage.py shwary_worker`)."""
+
+    # La tâche est écrite dans la même transaction que le paiement
+    enqueue_on_commit = False
+
+    def enqueue(self, name, kwargs):
+        from .models import ShwaryTask
+
+        ShwaryTask.objects.create(name=name, kwargs=kwargs)
+
+
+class CeleryBackend(BaseTaskBackend):
+    def enqueue(self, name, kwargs):
+        if celery_run_task is None:
+            raise ImproperlyConfigured("CeleryBackend nécessite Celery (pip install celery).")
+        celery_run_task.delay(name, kwargs)
+
+
+class DjangoTasksBackend(BaseTaskBackend):
+    def enqueue(self, name, kwargs):
+        try:
+            from .tasks_django import run_task as django_run_task
+        except ImportError:
+            raise ImproperlyConfigured("DjangoTasksBackend nécessite Django 6.0 ou plus (django.tasks).")
+        django_run_task.enqueue(name, kwargs)
+
+
+try:
+    from celery import shared_task
+except ImportError:
+    celery_run_task = None
+else:
+    celery_run_task = shared_task(name="dj_shwary.run_task")(run_task)
+
+
+def get_task_backend() -> BaseTaskBackend:
+    path = get_shwary_setting("TASK_BACKEND", "dj_shwary.tasks.DatabaseBackend")
+    return import_string(path)()
+
+
+def enqueue_task(name: str, **kwargs) -> BaseTaskBackend:
+    """Confie une tâche au backend configuré (après le commit si nécessaire) ; retourne le backend."""
+    backend = get_task_backend()
+    if backend.enqueue_on_commit:
+        db_transaction.on_commit(lambda: backend.enqueue(name, kwargs))
+    else:
+        backend.enqueue(name, kwargs)
+    return backend
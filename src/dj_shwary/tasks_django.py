@@ -0,0 +1,13 @@
+"""
+Adaptateur pour l'API `django.tasks` (Django 6.0+), utilisé par DjangoTasksBackend.
+La tâche doit être définie au niveau module pour que les workers la retrouvent.
+"""
+
+from django.tasks import task
+
+from . import tasks
+
+
+@task
+def run_task(name: str, kwargs: dict) -> None:
+    tasks.run_task(name, kwargs)
@@ -1,8 +1,10 @@
 # shwary_django/templatetags/shwary_tags.py
 
 from django import template
-from django.utils.html import format_html
-from django.urls import reverse
+from django.contrib.contenttypes.models import ContentType
+
+from dj_shwary.badges import badge_cache_key, status_badge_html
+from dj_shwary.models import ShwaryTransaction
 
 register = template.Library()
 
@@ -18,22 +20,53 @@ def status_badge(value):
     if hasattr(value, 'status'):
         value = value.status
 
-    # Mapping des couleurs (Classes CSS standards type Bootstrap/Tailwind)
-    # On utilise des styles inline pour que ça marche même sans Bootstrap
-    colors = {
-        'completed': '#10b981', # Vert Emeraude
-        'failed': '#ef4444',    # Rouge
-        'cancelled': '#6b7280', # Gris
-        'pending': '#f59e0b',   # Orange
-        'refunded': '#8b5cf6',  # Violet
-    }
-    
-    color = colors.get(str(value).lower(), '#374151') # Gris foncé par défaut
-    label = str(value).capitalize()
-    
-    style = f"background-color: {color}; color: white; padding: 4px 8px; border-radius: 9999px; font-size: 0.75rem; font-weight: 600;"
-    
-    return format_html('<span style="{}">{}</span>', style, label)
+    # HTML pré-calculé par statut (voir dj_shwary.badges)
+    return status_badge_html(value)
+
+
+@register.simple_tag
+def shwary_badges(objects, using=None):
+    """
+    Résout les badges de toute une liste en une seule requête.
+    Accepte des transactions, des objets métier annotés par
+    `with_latest_shwary_status()` ou des objets métier quelconques.
+
+    Usage:
+        {% shwary_badges orders as rows %}
+        {% for order, badge in rows %}{{ order }} {{ badge }}{% endfor %}
+
+    La requête part sur `using`, sinon sur SHWARY["READ_DATABASE"] (réplica).
+    """
+    objects = list(objects)
+    to_resolve = [
+        obj for obj in objects
+        if not isinstance(obj, ShwaryTransaction) and not hasattr(obj, 'shwary_status')
+    ]
+    statuses = (
+        ShwaryTransaction.objects.for_reads(using).latest_status_by_object(to_resolve)
+        if to_resolve else {}
+    )
+
+    rows = []
+    for obj in objects:
+        if isinstance(obj, ShwaryTransaction):
+            status = obj.status
+        elif hasattr(obj, 'shwary_status'):
+            status = obj.shwary_status
+        else:
+            content_type = ContentType.objects.get_for_model(obj)
+            status = statuses.get((content_type.pk, str(obj.pk)))
+        rows.append((obj, status_badge_html(status) if status else ""))
+    return rows
+
+
+@register.filter(name='shwary_cache_key')
+def shwary_cache_key(transaction):
+    """
+    Clé pour {% cache %} basée sur (id, statut, updated_at).
+    Usage: {% cache 600 shwary_badge txn|shwary_cache_key %}...{% endcache %}
+    """
+    return badge_cache_key(transaction)
 
 
 # --- 2. LE BOUTON DE PAIEMENT (Inclusion Tag) ---
@@ -0,0 +1,11 @@
+"""
+Outils de test pour les projets qui utilisent dj-shwary.
+
+Faux clients en mémoire (`FakeShwary`, `FakeShwaryAsync`), remplacement des
+clients de tous les marchands (`use_fake_shwary`) et plugin pytest
+(`dj_shwary.testing.pytest_plugin`, chargé automatiquement à l'installation).
+"""
+
+from .fake import FakeShwary, FakeShwaryAsync, FakeTransaction, use_fake_shwary
+
+__all__ = ["FakeShwary", "FakeShwaryAsync", "FakeTransaction", "use_fake_shwary"]
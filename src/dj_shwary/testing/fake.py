@@ -0,0 +1,270 @@
+"""
+Faux clients Shwary en mémoire (mêmes méthodes que `Shwary` / `ShwaryAsync`).
+
+Aucun réseau : les transactions initiées sont conservées dans le fake, leur
+statut suit une progression configurable à chaque lecture, et les webhooks
+sont envoyés directement à `ShwaryWebhookView`.
+
+    fake = FakeShwary(progression=("pending", "completed"))
+    with use_fake_shwary(fake):
+        txn = ShwaryService().make_payment(order, 5000, "+243972345678")
+        fake.settle(txn.shwary_id)          # statut "completed" + webhook
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+
+@dataclass
+class FakeTransaction:
+    id: str
+    amount: float
+    phone_number: str | None = None
+    country: str | None = None
+    callback_url: str | None = None
+    reads: int = 0
+    # Statut imposé (settle, set_status) : remplace la progression
+    pinned_status: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class FakeShwary:
+    """
+    Faux client sync. Chaque appel est enregistré dans `calls`.
+
+    Args:
+        progression: Statuts successifs ; l'initiation renvoie le premier,
+            chaque lecture (`get_transaction`) avance d'un cran.
+        latency: Délai (s) ajouté à chaque appel.
+        error_rate: Probabilité qu'un appel échoue (ShwaryAPIError 500).
+        validate: Valide pays, montant et numéro comme le SDK (ValidationError).
+        seed: Graine du tirage des erreurs aléatoires.
+    """
+
+    def __init__(
+        self,
+        progression: tuple[str, ...] = ("pending", "completed"),
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        validate: bool = True,
+        seed: int | None = None,
+        is_sandbox: bool = True,
+        **kwargs,
+    ):
+        self.progression = tuple(progression)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.validate = validate
+        self.is_sandbox = is_sandbox
+        self.transactions: dict[str, FakeTransaction] = {}
+        self.calls: list[tuple[str, dict]] = []
+        self._failures: list[tuple[str | None, Exception]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # --- Interface du SDK ---
+
+    def initiate_payment(self, country: str, amount: float, phone_number: str, callback_url: str | None = None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._initiate(country, amount, phone_number, callback_url)
+
+    def get_transaction(self, transaction_id: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._get(transaction_id)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "FakeShwary":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def async_client(self) -> "FakeShwaryAsync":
+        """Client async partageant l'état (transactions, erreurs) de ce fake."""
+        return FakeShwaryAsync(self)
+
+    # --- Contrôle depuis les tests ---
+
+    def fail_next(self, method: str | None = None, error: Exception | None = None, times: int = 1) -> None:
+        """Fait échouer les `times` prochains appels (de `method`, ou de toute méthode)."""
+        with self._lock:
+            self._failures.extend([(method, error or _api_error(500, "Fake upstream error"))] * times)
+
+    def register(self, shwary_id: str, amount: float = 0, status: str | None = None) -> FakeTransaction:
+        """Déclare une transaction créée hors du fake (ex. fixture en base)."""
+        with self._lock:
+            txn = self.transactions.setdefault(shwary_id, FakeTransaction(id=shwary_id, amount=amount))
+            if status is not None:
+                txn.pinned_status = status
+        return txn
+
+    def set_status(self, shwary_id: str, status: str) -> None:
+        """Impose le statut servi par les prochaines lectures de `shwary_id`."""
+        self.register(shwary_id, status=status)
+
+    def status_of(self, shwary_id: str) -> str:
+        """Statut courant, sans avancer la progression."""
+        txn = self.transactions[shwary_id]
+        return txn.pinned_status or self.progression[min(txn.reads, len(self.progression) - 1)]
+
+    def fire_webhook(self, shwary_id: str, status: str | None = None, payload: dict | None = None):
+        """
+        Envoie un webhook à `ShwaryWebhookView` (sans passer par le réseau ni
+        les URLs du projet) et retourne la réponse HTTP. Le statut annoncé est,
+        par défaut, le statut courant de la transaction dans le fake.
+        """
+        from django.test import RequestFactory
+
+        from dj_shwary.views import ShwaryWebhookView
+
+        if payload is None:
+            txn = self.transactions.get(shwary_id)
+            payload = {
+                "id": shwary_id,
+                "status": status or (self.status_of(shwary_id) if txn else "completed"),
+                "amount": txn.amount if txn else 0,
+            }
+        request = RequestFactory().post("/shwary/webhook/", data=json.dumps(payload), content_type="application/json")
+        return ShwaryWebhookView.as_view()(request)
+
+    def settle(self, shwary_id: str, status: str = "completed", webhook: bool = True):
+        """Fixe le statut final d'une transaction et, par défaut, envoie le webhook correspondant."""
+        self.set_status(shwary_id, status)
+        if webhook:
+            return self.fire_webhook(shwary_id, status)
+        return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.transactions.clear()
+            self.calls.clear()
+            self._failures.clear()
+
+    # --- Implémentation ---
+
+    def _maybe_fail(self, method: str) -> None:
+        with self._lock:
+            for index, (target, error) in enumerate(self._failures):
+                if target in (None, method):
+                    del self._failures[index]
+                    raise error
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if failed:
+            raise _api_error(500, "Fake upstream error")
+
+    def _initiate(self, country, amount, phone_number, callback_url):
+        from shwary import PaymentResponse
+
+        kwargs = {"country": country, "amount": amount, "phone_number": phone_number, "callback_url": callback_url}
+        self.calls.append(("initiate_payment", kwargs))
+        if self.validate:
+            from shwary.core import prepare_payment_request
+
+            _, payload = prepare_payment_request(country, float(amount), phone_number, callback_url, self.is_sandbox)
+            phone_number = payload["clientPhoneNumber"]
+        self._maybe_fail("initiate_payment")
+
+        txn = FakeTransaction(
+            id=str(uuid.uuid4()),
+            amount=float(amount),
+            phone_number=phone_number,
+            country=str(country),
+            callback_url=callback_url,
+        )
+        with self._lock:
+            self.transactions[txn.id] = txn
+        return PaymentResponse(id=txn.id, status=self.progression[0], isSandbox=self.is_sandbox)
+
+    def _get(self, transaction_id):
+        from shwary import TransactionResponse
+
+        self.calls.append(("get_transaction", {"transaction_id": transaction_id}))
+        self._maybe_fail("get_transaction")
+        with self._lock:
+            txn = self.transactions.get(transaction_id)
+            if txn is None:
+                raise _api_error(404, f"Transaction {transaction_id} not found")
+            txn.reads += 1
+            status = self.status_of(transaction_id)
+        return TransactionResponse(
+            id=txn.id,
+            status=status,
+            amount=txn.amount,
+            recipientPhoneNumber=txn.phone_number,
+            createdAt=txn.created_at,
+            updatedAt=datetime.now(timezone.utc),
+        )
+
+
+class FakeShwaryAsync:
+    """Faux client async ; partage l'état d'un FakeShwary (créé si absent)."""
+
+    def __init__(self, fake: FakeShwary | None = None, **kwargs):
+        self.fake = fake or FakeShwary(**kwargs)
+
+    async def initiate_payment(self, country: str, amount: float, phone_number: str, callback_url: str | None = None):
+        if self.fake.latency:
+            await asyncio.sleep(self.fake.latency)
+        return self.fake._initiate(country, amount, phone_number, callback_url)
+
+    async def get_transaction(self, transaction_id: str):
+        if self.fake.latency:
+            await asyncio.sleep(self.fake.latency)
+        return self.fake._get(transaction_id)
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "FakeShwaryAsync":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def __getattr__(self, name):
+        # Méthodes de contrôle (fail_next, settle...) déléguées au fake partagé
+        return getattr(self.fake, name)
+
+
+@contextmanager
+def use_fake_shwary(fake: FakeShwary | None = None):
+    """
+    Remplace les clients de tous les marchands (pool sync, clients async du
+    batcher) par `fake` le temps du bloc. Retourne le fake utilisé.
+    """
+    from unittest.mock import patch
+
+    from dj_shwary import batching, merchants
+
+    fake = fake or FakeShwary()
+
+    def reset_clients():
+        merchants.close_clients()
+        if batching._batcher is not None:
+            batching._batcher._clients.clear()
+
+    reset_clients()
+    try:
+        with patch.object(merchants, "new_client", lambda merchant: fake), \
+                patch.object(merchants, "new_async_client", lambda merchant: fake.async_client()), \
+                patch.object(batching, "new_async_client", lambda merchant: fake.async_client()):
+            yield fake
+    finally:
+        reset_clients()
+
+
+def _api_error(status_code: int, message: str):
+    from shwary import ShwaryAPIError
+
+    return ShwaryAPIError(status_code, message)
@@ -0,0 +1,35 @@
+"""
+Plugin pytest de dj-shwary (déclaré dans l'entry point `pytest11`).
+
+Fixtures :
+- `fake_shwary` : FakeShwary installé à la place des clients de tous les marchands.
+- `fake_shwary_async` : client async partageant l'état de `fake_shwary`.
+
+Options du fake via le marqueur `shwary` :
+
+    @pytest.mark.shwary(progression=("pending", "failed"), latency=0.01)
+    def test_paiement_refuse(fake_shwary): ...
+"""
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "shwary(**options): options du FakeShwary de la fixture fake_shwary (progression, latency...)"
+    )
+
+
+@pytest.fixture
+def fake_shwary(request):
+    from .fake import FakeShwary, use_fake_shwary
+
+    marker = request.node.get_closest_marker("shwary")
+    fake = FakeShwary(**(marker.kwargs if marker else {}))
+    with use_fake_shwary(fake):
+        yield fake
+
+
+@pytest.fixture
+def fake_shwary_async(fake_shwary):
+    return fake_shwary.async_client()
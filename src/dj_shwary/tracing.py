@@ -0,0 +1,271 @@
+"""
+Traces des opérations de paiement lentes (slow path).
+
+Quand un webhook ou un `make_payment` est lent, la trace indique où le temps
+est passé : appels à l'API Shwary, requêtes SQL (durée de chacune), attente
+de verrou (`select_for_update`), résolution du Site, receivers des signaux.
+
+    SHWARY = {
+        ...,
+        "TRACE": True,
+        "TRACE_THRESHOLD_MS": 500,      # seules les opérations plus lentes sont émises
+        "TRACE_SAMPLE_RATE": 0.1,       # part des opérations instrumentées (0 à 1)
+        "TRACE_SINKS": ["dj_shwary.tracing.LogSink"],
+    }
+
+Opérations tracées : `ShwaryService` (make_payment, initiate_payment,
+check_status), `ShwaryWebhookView`, les lots de webhooks groupés et chaque
+vérification de `check_pending_pay`. Une opération non échantillonnée ne coûte
+qu'un tirage aléatoire ; le SQL n'est capturé que pendant une opération
+échantillonnée (sans les paramètres, qui peuvent contenir des numéros de téléphone).
+
+Sinks fournis :
+- LogSink : une ligne JSON sur le logger `dj_shwary.tracing` (niveau WARNING).
+- DatabaseSink : table ShwaryTrace (admin en lecture seule).
+- OpenTelemetrySink : rejoue l'arbre de spans via l'API OpenTelemetry
+  (opentelemetry-api requis, exportateur configuré par le projet).
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from .utils import get_shwary_setting
+
+logger = logging.getLogger(__name__)
+
+SQL_MAX_LENGTH = 500
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.children: list[Span] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "children": [child.as_dict(origin) for child in self.children],
+        }
+
+
+_current: ContextVar[Span | None] = ContextVar("shwary_trace_span", default=None)
+
+
+def is_enabled() -> bool:
+    return get_shwary_setting("TRACE", False)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def annotate(**attrs) -> None:
+    """Ajoute des attributs au span courant (sans effet hors d'une opération tracée)."""
+    span = _current.get()
+    if span is not None:
+        span.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Span enfant du span courant ; sans effet hors d'une opération tracée."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+@contextmanager
+def operation(name: str, **attrs):
+    """
+    Opération racine d'une trace (ou simple span si une trace est déjà en cours).
+    La trace est émise vers les sinks si sa durée dépasse SHWARY["TRACE_THRESHOLD_MS"].
+    """
+    if _current.get() is not None:
+        with span(name, **attrs) as child:
+            yield child
+        return
+
+    if not is_enabled() or random.random() >= get_shwary_setting("TRACE_SAMPLE_RATE", 1.0):
+        yield None
+        return
+
+    root = Span(name, attrs)
+    started_ns = time.time_ns()
+    token = _current.set(root)
+    try:
+        with ExitStack() as stack:
+            # Wrappers par connexion et par thread : seul le SQL de cette opération est capturé
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_sql_wrapper))
+            yield root
+    except BaseException as e:
+        root.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end = time.perf_counter()
+        _current.reset(token)
+        if root.duration_ms >= get_shwary_setting("TRACE_THRESHOLD_MS", 500):
+            emit(build_trace(root, started_ns))
+
+
+def traced(name: str):
+    """Décorateur : exécute la fonction dans `operation(name)`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with operation(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    with span("sql", sql=sql[:SQL_MAX_LENGTH], many=many, database=context["connection"].alias):
+        return execute(sql, params, many, context)
+
+
+def build_trace(root: Span, started_ns: int) -> dict:
+    """Trace sérialisable : arbre de spans et temps cumulé par catégorie (sql, shwary, lock, signal...)."""
+    breakdown: dict[str, float] = {}
+    sql_count = 0
+    for node in root.walk():
+        if node is root:
+            continue
+        category = node.name.split(".")[0]
+        breakdown[category] = round(breakdown.get(category, 0.0) + node.duration_ms, 3)
+        sql_count += node.name == "sql"
+    return {
+        "trace_id": uuid.uuid4().hex,
+        "name": root.name,
+        "started_ns": started_ns,
+        "duration_ms": round(root.duration_ms, 3),
+        "sql_count": sql_count,
+        "breakdown_ms": breakdown,
+        "root": root.as_dict(root.start),
+    }
+
+
+def get_sinks() -> list:
+    return [
+        import_string(sink)() if isinstance(sink, str) else sink
+        for sink in get_shwary_setting("TRACE_SINKS", ["dj_shwary.tracing.LogSink"])
+    ]
+
+
+def emit(trace: dict) -> None:
+    """Envoie une trace à chaque sink ; une erreur de sink n'interrompt jamais l'opération."""
+    for sink in get_sinks():
+        try:
+            sink.emit(trace)
+        except Exception as e:
+            logger.exception(f"Échec de l'émission de la trace {trace['name']} vers {type(sink).__name__}: {e}")
+
+
+# --- Sinks ---
+
+
+class LogSink:
+    def emit(self, trace: dict) -> None:
+        logger.warning(
+            f"Opération Shwary lente : {trace['name']} ({trace['duration_ms']:.0f} ms) "
+            + json.dumps(trace, cls=DjangoJSONEncoder, ensure_ascii=False)
+        )
+
+
+class DatabaseSink:
+    def emit(self, trace: dict) -> None:
+        from datetime import datetime, timezone as dt_timezone
+
+        from django.conf import settings
+
+        from .models import ShwaryTrace
+        from .routers import get_write_database
+
+        started_at = datetime.fromtimestamp(trace["started_ns"] / 1e9, tz=dt_timezone.utc)
+        if not settings.USE_TZ:
+            started_at = started_at.replace(tzinfo=None)
+        ShwaryTrace.objects.using(get_write_database(ShwaryTrace)).create(
+            trace_id=trace["trace_id"],
+            name=trace["name"],
+            started_at=started_at,
+            duration_ms=trace["duration_ms"],
+            sql_count=trace["sql_count"],
+            trace=trace,
+        )
+
+
+class OpenTelemetrySink:
+    """Rejoue la trace via l'API OpenTelemetry (horodatages d'origine conservés)."""
+
+    def __init__(self):
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            raise ImportError("OpenTelemetrySink nécessite opentelemetry-api (pip install opentelemetry-api).")
+        self.otel_trace = otel_trace
+        self.tracer = otel_trace.get_tracer("dj_shwary")
+
+    def emit(self, trace: dict) -> None:
+        self._replay(trace["root"], trace["started_ns"], None)
+
+    def _replay(self, node: dict, origin_ns: int, parent) -> None:
+        start_ns = origin_ns + int(node["start_ms"] * 1_000_000)
+        context = self.otel_trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.tracer.start_span(
+            node["name"],
+            context=context,
+            start_time=start_ns,
+            attributes={key: _otel_value(value) for key, value in node["attrs"].items()},
+        )
+        for child in node["children"]:
+            self._replay(child, origin_ns, otel_span)
+        otel_span.end(end_time=start_ns + int(node["duration_ms"] * 1_000_000))
+
+
+def _otel_value(value):
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
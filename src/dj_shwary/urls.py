@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import ShwaryWebhookView
+from .views import ShwaryBacklogView, ShwaryHistoryView, ShwaryStatusView, ShwaryWebhookView
 
 app_name = "dj_shwary"
 
 urlpatterns = [
     path("webhook/", ShwaryWebhookView.as_view(), name="shwary-webhook"),
+    path("status/<uuid:pk>/", ShwaryStatusView.as_view(), name="shwary-status"),
+    path("history/", ShwaryHistoryView.as_view(), name="shwary-history"),
+    path("backlog/", ShwaryBacklogView.as_view(), name="shwary-backlog"),
 ]
\ No newline at end of file
@@ -1,61 +1,65 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from shwary import Shwary, ShwaryAsync
+
+if TYPE_CHECKING:
+    from shwary import Shwary, ShwaryAsync
 
 
-def get_shwary_client() -> Shwary:
+def get_shwary_client(merchant: str | None = None) -> Shwary:
     """
-    Retourne une instance configurée du client sync Shwary
+    Retourne une nouvelle instance configurée du client sync Shwary
     en utilisant les variables définies dans settings.py.
+    Pour un client partagé (pool de connexions), voir `merchants.get_client`.
     """
 
-    merchant_id, merchant_key, is_sandbox, timeout = get_shwary_config()
+    from .merchants import get_merchant, new_client
 
-    return Shwary(
-        merchant_id=merchant_id,
-        merchant_key=merchant_key,
-        is_sandbox=is_sandbox,
-        timeout=timeout,
-    )
+    return new_client(get_merchant(merchant))
 
 
 # Recupérer le client async
-def get_shwary_async_client() -> ShwaryAsync:
+def get_shwary_async_client(merchant: str | None = None) -> ShwaryAsync:
     """
     Retourne une instance configurée du client async ShwaryAsync
     en utilisant les variables définies dans settings.py.
     """
 
-    merchant_id, merchant_key, is_sandbox, timeout = get_shwary_config()
+    from .merchants import get_merchant, new_async_client
 
-    return ShwaryAsync(
-        merchant_id=merchant_id,
-        merchant_key=merchant_key,
-        is_sandbox=is_sandbox,
-        timeout=timeout,
-    )
+    return new_async_client(get_merchant(merchant))
 
 
-def get_shwary_config() -> tuple[str, str, bool, float]:
+def get_shwary_config(merchant: str | None = None) -> tuple[str, str, bool, float]:
     """
     Récupère la configuration Shwary depuis settings.py et vérifie sa complétude.
-    Retourne les paramètres nécessaires à l'instanciation du client.
+    Retourne les paramètres nécessaires à l'instanciation du client
+    (du marchand par défaut, ou de `merchant`).
     Lève une exception ImproperlyConfigured si la configuration est incomplète.
     """
 
-    shwary = getattr(settings, "SHWARY", {})
-    merchant_id: str = shwary.get("MERCHANT_ID")
-    merchant_key: str = shwary.get("MERCHANT_KEY")
-    is_sandbox: bool = shwary.get("SANDBOX", True)
-    timeout: float = shwary.get("TIMEOUT", 30.0)
+    from .merchants import get_merchant
+
+    config = get_merchant(merchant)
+    return config.merchant_id, config.merchant_key, config.is_sandbox, config.timeout
 
-    if not merchant_id or not merchant_key:
-        raise ImproperlyConfigured(
-            "La configuration Shwary est incomplète. "
-            "Veuillez définir les clés MERCHANT_ID et MERCHANT_KEY dans le dictionnaire SHWARY dans le settings.py"
-        )
 
-    return merchant_id, merchant_key, is_sandbox, timeout
+def get_shwary_setting(name: str, default=None):
+    """Lit une clé optionnelle du dictionnaire SHWARY de settings.py."""
+    return getattr(settings, "SHWARY", {}).get(name, default)
+
+
+def get_shwary_cache():
+    """
+    Cache Django utilisé par dj-shwary (notifications de statut, compteurs...).
+    Alias configurable via SHWARY["CACHE_ALIAS"] (défaut: "default").
+    """
+    from django.core.cache import caches
+
+    return caches[get_shwary_setting("CACHE_ALIAS", "default")]
 
 
 def get_webhook_absolute_url(relative_path: str) -> str:
@@ -83,3 +87,49 @@ def get_webhook_absolute_url(relative_path: str) -> str:
         "Impossible de générer l'URL absolue du webhook. "
         "Veuillez définir SITE_BASE_URL dans settings.py ou configurez SITE_ID pour resoudre l'erreur."
     )
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Percentile par rang le plus proche d'une liste de valeurs (0 si vide).
+    Suffisant pour des rapports de latence, sans dépendre de numpy.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# Pays couverts par Shwary (RDC, Kenya, Ouganda) : leurs indicatifs sont
+# reconnus même saisis sans le "+"
+PHONE_REGIONS = ("CD", "KE", "UG")
+
+
+def normalize_phone(value: str | None, region: str | None = None) -> str | None:
+    """
+    Numéro au format E.164 ("+243972345678"), quelle que soit sa saisie
+    ("243 97 234 5678", "0972345678", "972345678"...). Les numéros locaux sont
+    interprétés dans `region` (défaut SHWARY["PHONE_REGION"], "CD"). None si
+    illisible ou invalide pour son pays.
+    """
+    if not value:
+        return None
+    import phonenumbers
+
+    region = region or get_shwary_setting("PHONE_REGION", "CD")
+    value = "".join(char for char in str(value) if char.isdigit() or char == "+")
+    candidates = [value]
+    if value and not value.startswith(("+", "0")):
+        codes = {str(phonenumbers.country_code_for_region(code)) for code in (region, *PHONE_REGIONS)}
+        if value.startswith(tuple(codes)):
+            # "243..." : indicatif saisi sans le "+", sinon numéro local sans le 0
+            candidates.insert(0, f"+{value}")
+    for candidate in candidates:
+        try:
+            parsed = phonenumbers.parse(candidate, region)
+        except phonenumbers.NumberParseException:
+            continue
+        if phonenumbers.is_valid_number(parsed):
+            return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    return None
@@ -1,16 +1,35 @@
+import asyncio
 import json
 import logging
 
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
 from django.views import View
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction as db_transaction
 
 from dj_shwary.services import ShwaryService
 
+from . import tracing
+from .backlog import get_backlog
+from .batching import get_webhook_batcher
+from .history import InvalidCursor, paginate
+from .limits import webhook_limiter
 from .models import ShwaryTransaction
-from .signals import payment_success, payment_status_changed, payment_failed
+from .notifier import get_status_notifier
+from .scheduling import amark_watched
+from .utils import get_shwary_setting
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +44,20 @@ class ShwaryWebhookView(View):
     """
 
     def post(self, request, *args, **kwargs):
+        # Délestage : au-delà de la limite, on répond avant tout accès base/API
+        # et Shwary réessaiera plus tard (voir dj_shwary.limits).
+        with webhook_limiter.slot() as acquired:
+            if not acquired:
+                response = HttpResponse("Too many webhooks in flight, retry later", status=503)
+                response["Retry-After"] = str(get_shwary_setting("WEBHOOK_RETRY_AFTER", 5))
+                return response
+            with tracing.operation("webhook") as trace:
+                response = self.process(request)
+                if trace is not None:
+                    trace.attrs["status_code"] = response.status_code
+                return response
+
+    def process(self, request):
         try:
             payload = json.loads(request.body)
         except json.JSONDecodeError:
@@ -37,12 +70,37 @@ class ShwaryWebhookView(View):
             return HttpResponseBadRequest("Missing ID or Status")
 
         logger.info(f"Webhook reçu pour {shwary_id} prétendant être: {webhook_status}")
+        tracing.annotate(shwary_id=shwary_id)
+
+        # Mode groupé : vérification et mise à jour confiées au batcher du processus
+        batcher = get_webhook_batcher()
+        if batcher is not None:
+            future = batcher.submit(shwary_id, webhook_status, sender=self.__class__)
+            try:
+                status_code, body = future.result(timeout=get_shwary_setting("WEBHOOK_BATCH_TIMEOUT", 30))
+            except TimeoutError:
+                logger.error(f"Délai dépassé pour le traitement groupé du webhook {shwary_id}")
+                return HttpResponse("Verification failed, try again later", status=500)
+            return HttpResponse(body, status=status_code)
+
+        # Le marchand de la transaction détermine les identifiants à utiliser
+        # pour la vérification ; transaction inconnue -> inutile d'appeler l'API.
+        # Lecture sur le primaire : la transaction vient peut-être d'être créée.
+        merchant = (
+            ShwaryTransaction.objects.on_primary().recent().filter(shwary_id=shwary_id)
+            .values_list("merchant", flat=True)
+            .first()
+        )
+        if merchant is None:
+            logger.warning(f"Transaction {shwary_id} introuvable localement (Webhook arrivé trop vite).")
+            return HttpResponse("Transaction not found yet", status=404)
 
         # --- COUCHE DE SÉCURITÉ : VERIFY BY REFERENCE ---
         try:
             # On utilise le service pour lire la vérité depuis l'API.
-            shwary = ShwaryService()
-            api_response = shwary.client.get_transaction(shwary_id)
+            shwary = ShwaryService(merchant=merchant)
+            with tracing.span("shwary.get_transaction", merchant=merchant):
+                api_response = shwary.client.get_transaction(shwary_id)
             real_status = api_response.status.lower()
 
         except Exception as e:
@@ -64,41 +122,152 @@ class ShwaryWebhookView(View):
         # --- MISE À JOUR ATOMIQUE EN BASE ---
         try:
             with db_transaction.atomic():
-                txn = (
-                    ShwaryTransaction.objects.select_for_update()
-                    .filter(shwary_id=shwary_id)
-                    .first()
-                )
+                with tracing.span("lock.select_for_update"):
+                    txn = (
+                        ShwaryTransaction.objects.select_for_update()
+                        .recent()
+                        .filter(shwary_id=shwary_id)
+                        .first()
+                    )
 
                 if not txn:
                     logger.warning(f"Transaction {shwary_id} introuvable localement (Webhook arrivé trop vite).")
                     return HttpResponse("Transaction not found yet", status=404)
 
-                previous_status = txn.status
-
-                # On met à jour avec le statut DE CONFIANCE
-                txn.status = trusted_status
-                txn.raw_response = payload
-                txn.save(update_fields=("status", "raw_response", "updated_at"))
-
-                # --- DISPATCH DES SIGNAUX ---
-                _signal_params = {
-                    "sender": self.__class__,
-                    "transaction": txn,
-                    "raw_data": payload,
-                }
-
-                if previous_status != trusted_status:
-                    payment_status_changed.send(**_signal_params)
-
-                    match trusted_status:
-                        case ShwaryTransaction.Status.COMPLETED:
-                            payment_success.send(**_signal_params)
-                        case ShwaryTransaction.Status.FAILED:
-                            payment_failed.send(**_signal_params)
+                # On met à jour avec le statut DE CONFIANCE.
+                # set_status dispatche les signaux si le statut a changé.
+                txn.set_status(
+                    trusted_status, payload, sender=self.__class__, via=ShwaryTransaction.SettledVia.WEBHOOK
+                )
 
             return HttpResponse("OK", status=200)
 
         except Exception as e:
             logger.exception(f"Erreur critique lors de l'enregistrement du webhook: {e}")
             return HttpResponse("Internal Error", status=500)
+
+
+
+class ShwaryStatusView(View):
+    """
+    Endpoint de statut pour les pages "en attente de paiement".
+    L'état est servi depuis le cache alimenté par les signaux de paiement
+    (voir notifier.py) : aucun appel à l'API Shwary, et au plus une requête
+    en base quand le cache est vide.
+
+    - GET classique : JSON + ETag ; `If-None-Match` identique -> 304.
+    - Long-poll : `?wait=<secondes>` avec `If-None-Match` attend un changement
+      (plafonné par SHWARY["STATUS_MAX_WAIT"], défaut 25s) avant de répondre.
+    - SSE : `Accept: text/event-stream` (ou `?stream=1`) envoie un événement à
+      chaque changement, jusqu'au statut final. À servir en ASGI.
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        notifier = get_status_notifier()
+        state = await notifier.aget_state(pk)
+        if state is None:
+            raise Http404("Transaction introuvable")
+        if not state["is_final"]:
+            # Un client attend : le rattrapage vérifie cette transaction en priorité
+            await amark_watched(pk)
+
+        if request.GET.get("stream") or "text/event-stream" in request.headers.get("Accept", ""):
+            response = StreamingHttpResponse(
+                self.event_stream(notifier, pk, state), content_type="text/event-stream"
+            )
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"
+            return response
+
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+
+        try:
+            wait = float(request.GET.get("wait", 0))
+        except ValueError:
+            return HttpResponseBadRequest("Invalid wait")
+        wait = min(max(wait, 0), get_shwary_setting("STATUS_MAX_WAIT", 25))
+
+        if wait and state["etag"] in client_etags and not state["is_final"]:
+            state = await notifier.wait_for_change(pk, state["etag"], wait) or state
+
+        if state["etag"] in client_etags or "*" in client_etags:
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse({k: v for k, v in state.items() if k != "etag"})
+        response["ETag"] = state["etag"]
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    async def event_stream(self, notifier, pk, state):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + get_shwary_setting("STATUS_STREAM_TIMEOUT", 300)
+        sent_etag = None
+
+        while state is not None:
+            if state["etag"] != sent_etag:
+                data = json.dumps({k: v for k, v in state.items() if k != "etag"})
+                yield f"event: status\nid: {state['etag']}\ndata: {data}\n\n"
+                sent_etag = state["etag"]
+            else:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxies
+                yield ": keep-alive\n\n"
+
+            remaining = deadline - loop.time()
+            if state["is_final"] or remaining <= 0:
+                break
+            await amark_watched(pk)
+            state = await notifier.wait_for_change(pk, sent_etag, min(15, remaining))
+
+
+class ShwaryHistoryView(View):
+    """
+    Historique des paiements pour le support (réservé au staff), paginé par
+    curseur : `?phone=<numéro>` ou `?content_type=<app_label.model>&object_id=<pk>`,
+    puis `&cursor=<next_cursor>` pour la page suivante ; `&limit=` (max 200).
+    Lecture sur SHWARY["READ_DATABASE"] si défini.
+    """
+
+    def get(self, request, *args, **kwargs):
+        user = getattr(request, "user", None)
+        if user is None or not (user.is_active and user.is_staff):
+            raise PermissionDenied
+
+        transactions = ShwaryTransaction.objects.for_reads()
+        if phone := request.GET.get("phone"):
+            transactions = transactions.for_phone(phone)
+        elif (content_type := request.GET.get("content_type")) and (object_id := request.GET.get("object_id")):
+            try:
+                app_label, model = content_type.split(".", 1)
+                content_type = ContentType.objects.get_by_natural_key(app_label, model.lower())
+            except (ValueError, ContentType.DoesNotExist):
+                return HttpResponseBadRequest("Unknown content_type")
+            transactions = transactions.filter(content_type=content_type, object_id=object_id)
+        else:
+            return HttpResponseBadRequest("Missing phone or content_type/object_id")
+
+        try:
+            limit = int(request.GET.get("limit", 50))
+            page = paginate(transactions, request.GET.get("cursor"), limit)
+        except (ValueError, InvalidCursor):
+            return HttpResponseBadRequest("Invalid cursor or limit")
+        return JsonResponse({"results": page.results, "next_cursor": page.next_cursor})
+
+
+class ShwaryBacklogView(View):
+    """
+    Jauge du backlog de rattrapage (JSON, voir `dj_shwary.backlog.get_backlog`)
+    pour un autoscaler des workers `check_pending_pay`. Accès : staff, ou
+    `Authorization: Bearer <SHWARY["BACKLOG_TOKEN"]>` pour un scaler sans session.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = get_shwary_setting("BACKLOG_TOKEN")
+        if not (token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")):
+            user = getattr(request, "user", None)
+            if user is None or not (user.is_active and user.is_staff):
+                raise PermissionDenied
+
+        backlog = get_backlog()
+        response = JsonResponse(backlog)
+        response["Cache-Control"] = f"private, max-age={backlog['max_age']}"
+        return response
@@ -0,0 +1,3 @@
+# Le plugin est chargé par l'entry point pytest11 une fois le paquet installé ;
+# ici, les tests tournent depuis les sources.
+pytest_plugins = ["dj_shwary.testing.pytest_plugin"]
@@ -1,8 +1,11 @@
+import os
+
 SECRET_KEY = "fake-key"
 INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sites",
     "django.contrib.auth",
+    "django.contrib.admin",
     "dj_shwary",
 ]
 SITE_ID = 1
@@ -12,8 +15,24 @@ DATABASES = {
         "NAME": ":memory:",
     }
 }
+# Tests PostgreSQL (partitionnement) : SHWARY_TEST_POSTGRES=1 pytest
+if os.environ.get("SHWARY_TEST_POSTGRES"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("PGDATABASE", "dj_shwary"),
+        "USER": os.environ.get("PGUSER", "postgres"),
+        "PASSWORD": os.environ.get("PGPASSWORD", ""),
+        "HOST": os.environ.get("PGHOST", "localhost"),
+        "PORT": os.environ.get("PGPORT", "5432"),
+    }
 SHWARY = {
     "MERCHANT_ID": "test_id",
     "MERCHANT_KEY": "test_key",
 }
-ROOT_URLCONF = "tests.urls"
\ No newline at end of file
+ROOT_URLCONF = "tests.urls"
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+    }
+]
@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import MagicMock
+from django.contrib.admin.actions import delete_selected
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from dj_shwary.admin import ShwaryTransactionAdmin
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.signals import payment_success
+
+User = get_user_model()
+
+
+@pytest.fixture
+def model_admin():
+    model_admin = ShwaryTransactionAdmin(ShwaryTransaction, AdminSite())
+    model_admin.message_user = MagicMock()
+    return model_admin
+
+
+@pytest.mark.django_db
+def test_manual_status_goes_through_set_status(model_admin):
+    user = User.objects.create(username="admin-fix")
+    txn = ShwaryTransaction.objects.create(shwary_id="SHW-ADM", content_object=user, amount=10)
+    received = []
+    handler = lambda sender, transaction, **kwargs: received.append(transaction.pk)
+    payment_success.connect(handler)
+    try:
+        model_admin.mark_completed(RequestFactory().post("/"), ShwaryTransaction.objects.all())
+    finally:
+        payment_success.disconnect(handler)
+
+    txn.refresh_from_db()
+    assert txn.status == "completed"
+    assert txn.settled_via == "admin" and txn.settled_at is not None
+    assert received == [txn.pk]
+    assert "status" in model_admin.get_readonly_fields(RequestFactory().get("/"), txn)
+
+
+@pytest.mark.django_db
+def test_phone_search_adds_to_default_search(model_admin):
+    user = User.objects.create(username="search")
+    by_phone = ShwaryTransaction.objects.create(content_object=user, amount=10, phone_number="+243972345678")
+    by_id = ShwaryTransaction.objects.create(
+        shwary_id="972345678", content_object=user, amount=10, phone_number="+243810000000"
+    )
+    request = RequestFactory().get("/")
+
+    results, _ = model_admin.get_search_results(request, ShwaryTransaction.objects.all(), "0972345678")
+    assert set(results) == {by_phone}
+    # Numéro saisi autrement : normalisé ; shwary_id qui ressemble à un numéro : recherche par défaut
+    results, _ = model_admin.get_search_results(request, ShwaryTransaction.objects.all(), "972345678")
+    assert set(results) == {by_phone, by_id}
+    # Numéro partiel
+    results, _ = model_admin.get_search_results(request, ShwaryTransaction.objects.all(), "81000")
+    assert set(results) == {by_id}
+
+
+@pytest.mark.django_db
+def test_changelist_actions_run_on_primary(model_admin, settings):
+    settings.SHWARY = {**settings.SHWARY, "READ_DATABASE": "replica"}
+    user = User.objects.create(username="replica-admin", is_superuser=True, is_staff=True)
+    ShwaryTransaction.objects.create(shwary_id="SHW-DEL", content_object=user, amount=10)
+    factory = RequestFactory()
+    changelist = MagicMock(url_name="dj_shwary_shwarytransaction_changelist")
+
+    request = factory.get("/")
+    request.resolver_match = changelist
+    assert model_admin.get_queryset(request).db == "replica"
+
+    # Confirmation de delete_selected : la suppression doit partir sur le primaire
+    request = factory.post("/", {"action": "delete_selected", "post": "yes"})
+    request.resolver_match, request.user = changelist, user
+    queryset = model_admin.get_queryset(request)
+    assert queryset.db == "default"
+    delete_selected(model_admin, request, queryset.filter(shwary_id="SHW-DEL"))
+    assert not ShwaryTransaction.objects.filter(shwary_id="SHW-DEL").exists()
@@ -0,0 +1,66 @@
+import json
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from dj_shwary.backlog import get_backlog
+from dj_shwary.models import ShwaryTask, ShwaryTransaction
+from dj_shwary.views import ShwaryBacklogView
+
+User = get_user_model()
+
+SETTINGS = {"MERCHANT_ID": "id", "MERCHANT_KEY": "key", "BACKLOG_COUNT_LIMIT": 4, "BACKLOG_BUCKETS": (60, 3600)}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_pending(user, ages):
+    now = timezone.now()
+    for minutes in ages:
+        txn = ShwaryTransaction.objects.create(content_object=user, amount=10)
+        ShwaryTransaction.objects.filter(pk=txn.pk).update(created_at=now - timedelta(minutes=minutes))
+
+
+@pytest.mark.django_db
+@override_settings(SHWARY=SETTINGS)
+def test_backlog_buckets_and_cache(django_assert_num_queries):
+    user = User.objects.create(username="backlog")
+    create_pending(user, [0, 2, 3, 120])
+    ShwaryTransaction.objects.create(content_object=user, amount=10, status="completed")
+    ShwaryTask.objects.create(name="initiate_payment")
+
+    backlog = get_backlog()
+    assert backlog["pending"] == {"total": 4, "older_than": {"60": 3, "3600": 1}, "truncated": True}
+    assert 120 * 60 <= backlog["oldest_pending_age"] < 121 * 60
+    assert backlog["tasks"] == {"queued": 1}
+    assert backlog["webhooks"]["in_flight"] == 0 and backlog["webhooks"]["batch_queue"] == 0
+
+    # Les pollers suivants lisent le cache
+    with django_assert_num_queries(0):
+        assert get_backlog()["pending"] == backlog["pending"]
+
+
+@pytest.mark.django_db
+@override_settings(SHWARY={**SETTINGS, "BACKLOG_TOKEN": "s3cret"})
+def test_backlog_view_access():
+    factory = RequestFactory()
+    view = ShwaryBacklogView.as_view()
+
+    request = factory.get("/backlog/", HTTP_AUTHORIZATION="Bearer s3cret")
+    response = view(request)
+    assert response.status_code == 200
+    assert json.loads(response.content)["pending"]["total"] == 0
+    assert response["Cache-Control"] == "private, max-age=5"
+
+    request = factory.get("/backlog/", HTTP_AUTHORIZATION="Bearer wrong")
+    request.user = User.objects.create(username="visitor")
+    with pytest.raises(PermissionDenied):
+        view(request)
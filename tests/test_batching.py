@@ -0,0 +1,94 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from dj_shwary.batching import WebhookBatcher, WebhookItem
+from dj_shwary.models import ShwaryTransaction
+
+User = get_user_model()
+
+
+def api_response(shwary_id, status):
+    response = MagicMock(status=status)
+    response.model_dump.return_value = {"id": shwary_id, "status": status}
+    return response
+
+
+@pytest.mark.django_db
+def test_flush_verifies_concurrently_and_answers_each_request():
+    user = User.objects.create(username="batch")
+    for shwary_id in ("SHW-B1", "SHW-B2", "SHW-B3"):
+        ShwaryTransaction.objects.create(shwary_id=shwary_id, content_object=user, amount=100)
+
+    async def get_transaction(shwary_id):
+        if shwary_id == "SHW-B3":
+            raise Exception("API down")
+        return api_response(shwary_id, "completed")
+
+    client = MagicMock()
+    client.get_transaction = AsyncMock(side_effect=get_transaction)
+    items = [
+        WebhookItem("SHW-B1", "completed"),
+        WebhookItem("SHW-B2", "failed"),
+        WebhookItem("SHW-B3", "completed"),
+        WebhookItem("SHW-UNKNOWN", "completed"),
+        WebhookItem("SHW-B1", "completed"),  # doublon dans le même lot
+    ]
+
+    batcher = WebhookBatcher()
+    with patch("dj_shwary.batching.new_async_client", return_value=client), \
+         patch("dj_shwary.signals.payment_success.send") as mock_success:
+        batcher.flush(items)
+
+    assert [item.future.result() for item in items] == [
+        (200, "OK"), (200, "OK"), (500, "Verification failed, try again later"),
+        (404, "Transaction not found yet"), (200, "OK"),
+    ]
+    # Identifiants inconnus localement : pas d'appel API
+    assert client.get_transaction.await_count == 3
+    assert mock_success.call_count == 2
+    assert set(ShwaryTransaction.objects.filter(status="completed").values_list("shwary_id", flat=True)) == {"SHW-B1", "SHW-B2"}
+
+
+def test_collect_groups_requests_within_window():
+    batcher = WebhookBatcher(window_ms=50, max_size=2)
+    for i in range(3):
+        batcher.queue.put(WebhookItem(f"SHW-{i}", "completed"))
+
+    assert [item.shwary_id for item in batcher.collect()] == ["SHW-0", "SHW-1"]
+    assert [item.shwary_id for item in batcher.collect()] == ["SHW-2"]
+
+
+@pytest.mark.django_db
+def test_webhook_view_uses_batcher(client, settings):
+    settings.SHWARY = {**settings.SHWARY, "WEBHOOK_BATCH_WINDOW_MS": 5}
+    batcher = MagicMock()
+    batcher.submit.return_value.result.return_value = (404, "Transaction not found yet")
+
+    with patch("dj_shwary.views.get_webhook_batcher", return_value=batcher):
+        response = client.post(
+            reverse("dj_shwary:shwary-webhook"),
+            data=json.dumps({"id": "SHW-X", "status": "completed"}),
+            content_type="application/json",
+        )
+
+    assert response.status_code == 404
+    batcher.submit.assert_called_once()
+    assert batcher.submit.call_args.args == ("SHW-X", "completed")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batcher_thread_end_to_end():
+    user = User.objects.create(username="batchthread")
+    ShwaryTransaction.objects.create(shwary_id="SHW-T1", content_object=user, amount=100)
+
+    client = MagicMock()
+    client.get_transaction = AsyncMock(return_value=api_response("SHW-T1", "completed"))
+
+    batcher = WebhookBatcher(window_ms=5)
+    with patch("dj_shwary.batching.new_async_client", return_value=client):
+        futures = [batcher.submit("SHW-T1", "completed") for _ in range(3)]
+        assert [future.result(timeout=5) for future in futures] == [(200, "OK")] * 3
+
+    assert ShwaryTransaction.objects.get(shwary_id="SHW-T1").status == "completed"
@@ -0,0 +1,48 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from dj_shwary import exports
+from dj_shwary.models import ShwaryTransaction
+
+User = get_user_model()
+
+
+@pytest.fixture
+def transactions():
+    user = User.objects.create(username="export")
+    ShwaryTransaction.objects.create(
+        shwary_id="SHW-E1", content_object=user, amount=100, status="completed",
+        raw_response={"id": "SHW-E1", "meta": {"operator": "orange"}},
+    )
+    ShwaryTransaction.objects.create(shwary_id="SHW-E2", content_object=user, amount=50, status="failed")
+    return user
+
+
+@pytest.mark.django_db
+def test_export_csv_with_flattened_raw_response(transactions):
+    queryset = exports.filter_transactions(ShwaryTransaction.objects.all(), statuses=["completed"])
+    content = b"".join(exports.export(queryset, include_raw=True)).decode()
+
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert len(rows) == 1
+    assert rows[0]["shwary_id"] == "SHW-E1"
+    assert rows[0]["amount"] == "100.00"
+    assert rows[0]["raw.meta.operator"] == "orange"
+
+
+@pytest.mark.django_db
+def test_export_command_jsonl_gzip(transactions, tmp_path):
+    output = tmp_path / "export.jsonl.gz"
+    call_command("shwary_export", output=str(output), format="jsonl", gzip=True, stderr=StringIO())
+
+    lines = gzip.decompress(output.read_bytes()).decode().splitlines()
+    assert {json.loads(line)["shwary_id"] for line in lines} == {"SHW-E1", "SHW-E2"}
+
+    out = StringIO()
+    call_command("shwary_export", status=["failed"], since="2000-01-01", stdout=out)
+    assert "SHW-E2" in out.getvalue() and "SHW-E1" not in out.getvalue()
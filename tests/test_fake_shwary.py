@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from django.contrib.auth import get_user_model
+from shwary import ShwaryAPIError, ShwaryError
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.services import ShwaryService
+from dj_shwary.signals import payment_success
+from dj_shwary.testing import FakeShwary, use_fake_shwary
+
+User = get_user_model()
+
+PHONE = "+243972345678"
+
+
+@pytest.mark.django_db
+def test_payment_flow_end_to_end(fake_shwary):
+    user = User.objects.create(username="buyer")
+    received = []
+    payment_success.connect(lambda sender, transaction, **kw: received.append(transaction.pk), weak=False,
+                            dispatch_uid="fake-test")
+    try:
+        txn = ShwaryService().make_payment(user, 5000, PHONE)
+        assert txn.status == "pending"
+        assert fake_shwary.transactions[txn.shwary_id].phone_number == PHONE
+
+        response = fake_shwary.settle(txn.shwary_id)
+    finally:
+        payment_success.disconnect(dispatch_uid="fake-test")
+
+    assert response.status_code == 200
+    txn.refresh_from_db()
+    assert txn.status == ShwaryTransaction.Status.COMPLETED
+    assert received == [txn.pk]
+    assert [name for name, _ in fake_shwary.calls] == ["initiate_payment", "get_transaction"]
+
+
+@pytest.mark.django_db
+@pytest.mark.shwary(progression=("pending", "pending", "failed"))
+def test_status_progression_on_reads(fake_shwary):
+    user = User.objects.create(username="poller")
+    txn = ShwaryService().make_payment(user, 5000, PHONE)
+    service = ShwaryService()
+
+    assert service.check_status(txn.shwary_id) == "pending"
+    assert service.check_status(txn.shwary_id) == "failed"
+    txn.refresh_from_db()
+    assert txn.status == ShwaryTransaction.Status.FAILED
+
+
+@pytest.mark.django_db
+def test_failure_injection_and_validation(fake_shwary):
+    user = User.objects.create(username="unlucky")
+    fake_shwary.fail_next("initiate_payment")
+    with pytest.raises(ShwaryError):
+        ShwaryService().make_payment(user, 5000, PHONE)
+
+    # Montant inférieur au minimum RDC : refusé comme par le SDK
+    with pytest.raises(ShwaryError):
+        ShwaryService().make_payment(user, 100, PHONE)
+
+    assert list(ShwaryTransaction.objects.values_list("status", flat=True)) == ["failed", "failed"]
+    assert ShwaryService().make_payment(user, 5000, PHONE).status == "pending"
+
+
+@pytest.mark.django_db
+def test_webhook_for_unknown_transaction(fake_shwary):
+    with pytest.raises(ShwaryAPIError):
+        fake_shwary.get_transaction("missing")
+    assert fake_shwary.fire_webhook("missing", "completed").status_code == 404
+
+
+def test_async_client_shares_state(fake_shwary, fake_shwary_async):
+    async def flow():
+        payment = await fake_shwary_async.initiate_payment("KE", 10, "+254712345678")
+        return payment, await fake_shwary_async.get_transaction(payment.id)
+
+    payment, transaction = asyncio.run(flow())
+    assert payment.id in fake_shwary.transactions
+    assert transaction.status == "completed"
+
+
+def test_use_fake_shwary_restores_clients():
+    from dj_shwary import merchants
+
+    fake = FakeShwary(latency=0.001)
+    with use_fake_shwary(fake):
+        assert merchants.get_client() is fake
+    assert merchants.get_client() is not fake
+    merchants.close_clients()
@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from dj_shwary import hedging
+from dj_shwary.services import ShwaryService
+
+
+@pytest.fixture
+def hedge_settings(settings):
+    settings.SHWARY = {**settings.SHWARY, "HEDGE": True, "HEDGE_AFTER_MS": 20}
+    hedging.stats = hedging.HedgingStats()
+    return settings
+
+
+def slow_then_fast():
+    """Premier appel lent (200 ms), les suivants immédiats."""
+    counter = itertools.count()
+
+    def get_transaction(transaction_id):
+        if next(counter) == 0:
+            time.sleep(0.2)
+            return "slow"
+        return "fast"
+    return get_transaction
+
+
+def test_hedged_call_returns_first_answer(hedge_settings):
+    started = time.monotonic()
+    assert hedging.call(slow_then_fast(), "SHW-1") == "fast"
+    assert time.monotonic() - started < 0.15
+
+    stats = hedging.get_hedging_stats()
+    assert stats["calls"] == 1 and stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_deadline_exceeded(hedge_settings):
+    with pytest.raises(hedging.DeadlineExceeded):
+        hedging.call(lambda _id: time.sleep(0.3), "SHW-1", deadline=0.05, hedge=False)
+    assert hedging.get_hedging_stats()["deadline_exceeded"] == 1
+
+
+def test_async_hedged_call(hedge_settings):
+    calls = []
+
+    async def get_transaction(transaction_id):
+        calls.append(transaction_id)
+        await asyncio.sleep(0.2 if len(calls) == 1 else 0)
+        return len(calls)
+
+    assert asyncio.run(hedging.acall(get_transaction, "SHW-1")) == 2
+    assert hedging.get_hedging_stats()["hedge_wins"] == 1
+
+
+def test_service_wraps_reads_only_when_configured(settings):
+    client = MagicMock()
+    assert ShwaryService(client=client).client is client
+
+    service = ShwaryService(client=client, deadline=1.0)
+    assert isinstance(service.client, hedging.HedgedClient)
+    service.client.initiate_payment(amount=1)
+    client.initiate_payment.assert_called_once_with(amount=1)
+
+
+def test_saturated_pool_fails_fast_without_hedging(hedge_settings, monkeypatch):
+    hedge_settings.SHWARY = {**hedge_settings.SHWARY, "HEDGE_MAX_WORKERS": 1}
+    monkeypatch.setattr(hedging, "_executor", None)
+    monkeypatch.setattr(hedging, "_slots", None)
+    release = threading.Event()
+
+    # Appel abandonné au délai : il garde l'unique thread du pool
+    with pytest.raises(hedging.DeadlineExceeded):
+        hedging.call(lambda _id: release.wait(5), "SHW-1", deadline=0.05)
+    assert hedging.get_hedging_stats()["hedged"] == 0
+
+    started = time.monotonic()
+    with pytest.raises(hedging.PoolSaturated):
+        hedging.call(lambda _id: "ok", "SHW-2", deadline=1.0)
+    assert time.monotonic() - started < 0.05
+    assert hedging.get_hedging_stats()["saturated"] == 1
+
+    release.set()
+    # Le thread rendu, les vérifications repartent
+    for _ in range(50):
+        try:
+            assert hedging.call(lambda _id: "ok", "SHW-3", deadline=1.0) == "ok"
+            break
+        except hedging.PoolSaturated:
+            time.sleep(0.01)
+    else:
+        pytest.fail("Le pool n'a pas été libéré")
+    hedging._executor.shutdown(wait=False)
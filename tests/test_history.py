@@ -0,0 +1,130 @@
+import json
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone
+from dj_shwary.history import InvalidCursor, encode_cursor, history_for_object, history_for_phone, paginate
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.utils import normalize_phone
+from dj_shwary.views import ShwaryHistoryView
+
+User = get_user_model()
+
+
+def create_txns(user, phone, count):
+    now = timezone.now()
+    txns = [
+        ShwaryTransaction.objects.create(content_object=user, amount=100 + i, phone_number=phone)
+        for i in range(count)
+    ]
+    # Deux transactions à la même seconde : le curseur départage par id
+    for i, txn in enumerate(txns):
+        ShwaryTransaction.objects.filter(pk=txn.pk).update(created_at=now - timedelta(minutes=i // 2))
+    return txns
+
+
+def test_normalize_phone():
+    assert normalize_phone("+243 97 234 5678") == "+243972345678"
+    assert normalize_phone("243972345678") == "+243972345678"
+    assert normalize_phone("0972345678") == "+243972345678"
+    assert normalize_phone("0712345678", region="KE") == "+254712345678"
+    assert normalize_phone("n/a") is None
+
+
+def test_normalize_phone_without_plus_or_trunk_prefix():
+    # Numéro local sans le 0 : pas un indicatif étranger ("+97...")
+    assert normalize_phone("972345678") == "+243972345678"
+    assert normalize_phone("712345678", region="KE") == "+254712345678"
+    # Indicatif d'un autre pays couvert, saisi sans le "+"
+    assert normalize_phone("254712345678") == "+254712345678"
+    assert normalize_phone("256772345678") == "+256772345678"
+
+
+def test_normalize_phone_rejects_invalid_numbers():
+    assert normalize_phone("12345") is None
+    assert normalize_phone("+243 12") is None
+    assert normalize_phone("0123") is None
+    assert normalize_phone("97234567890123") is None
+
+
+@pytest.mark.django_db
+def test_phone_normalized_on_save():
+    user = User.objects.create(username="client")
+    txn = ShwaryTransaction.objects.create(content_object=user, amount=100, phone_number="243 97 234 5678")
+    assert txn.phone_normalized == "+243972345678"
+
+    txn.phone_number = "0812345678"
+    txn.save(update_fields=["phone_number"])
+    txn.refresh_from_db()
+    assert txn.phone_normalized == "+243812345678"
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_walks_every_row_once():
+    user = User.objects.create(username="history")
+    other = User.objects.create(username="other")
+    txns = create_txns(user, "+243972345678", 7)
+    create_txns(other, "+243811111111", 2)
+
+    seen, cursor = [], None
+    while True:
+        page = history_for_phone("0972345678", cursor=cursor, limit=3)
+        seen += [row["id"] for row in page.results]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 7
+    assert set(seen) == {txn.pk for txn in txns}
+
+    assert len(history_for_object(user, limit=50).results) == 7
+    assert history_for_phone("???").results == []
+    with pytest.raises(InvalidCursor):
+        paginate(ShwaryTransaction.objects.all(), cursor="garbage")
+    with pytest.raises(InvalidCursor):
+        paginate(ShwaryTransaction.objects.all(), cursor=encode_cursor(timezone.now(), "not-a-uuid"))
+
+
+@pytest.mark.django_db
+def test_backfill_command():
+    user = User.objects.create(username="legacy")
+    create_txns(user, "+243 97 234 5678", 5)
+    ShwaryTransaction.objects.update(phone_normalized=None)
+
+    out = StringIO()
+    call_command("shwary_backfill_phones", chunk_size=2, stdout=out)
+    assert "5 numéros normalisés sur 5" in out.getvalue()
+    assert set(ShwaryTransaction.objects.values_list("phone_normalized", flat=True)) == {"+243972345678"}
+
+
+@pytest.mark.django_db
+def test_history_view_is_staff_only():
+    user = User.objects.create(username="buyer")
+    staff = User.objects.create(username="support", is_staff=True)
+    create_txns(user, "+243972345678", 3)
+    factory = RequestFactory()
+    view = ShwaryHistoryView.as_view()
+
+    request = factory.get("/history/", {"phone": "+243972345678"})
+    request.user = user
+    with pytest.raises(PermissionDenied):
+        view(request)
+
+    request = factory.get("/history/", {"content_type": "auth.user", "object_id": user.pk, "limit": 2})
+    request.user = staff
+    response = view(request)
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert len(data["results"]) == 2
+    assert data["next_cursor"]
+
+    request = factory.get("/history/", {"phone": "+243972345678", "cursor": "bad"})
+    request.user = staff
+    assert view(request).status_code == 400
+
+    request = factory.get("/history/", {"phone": "+243972345678", "cursor": encode_cursor(timezone.now(), "42")})
+    request.user = staff
+    assert view(request).status_code == 400
@@ -0,0 +1,50 @@
+import json
+import pytest
+from unittest.mock import patch
+from django.core.cache import cache
+from django.urls import reverse
+from dj_shwary.limits import InFlightLimiter, get_shedding_stats, webhook_limiter
+
+
+def test_local_limit(settings):
+    settings.SHWARY = {**settings.SHWARY, "TEST_MAX_IN_FLIGHT": 1}
+    limiter = InFlightLimiter("test")
+
+    with limiter.slot() as first:
+        with limiter.slot() as second:
+            assert first and not second
+    assert limiter.stats() == {"in_flight": 0, "shed": 1}
+
+    with limiter.slot() as again:
+        assert again
+
+
+def test_global_limit(settings):
+    settings.SHWARY = {**settings.SHWARY, "TEST_MAX_IN_FLIGHT_GLOBAL": 1}
+    cache.clear()
+    process_a, process_b = InFlightLimiter("test"), InFlightLimiter("test")
+
+    with process_a.slot() as first:
+        with process_b.slot() as second:
+            assert first and not second
+            assert process_b.stats()["global_in_flight"] == 1
+    assert process_b.stats()["global_shed"] == 1
+    assert cache.get(process_a.key("count")) == 0
+
+
+@pytest.mark.django_db
+def test_webhook_sheds_before_db_and_api(client, settings, django_assert_num_queries):
+    settings.SHWARY = {**settings.SHWARY, "WEBHOOK_MAX_IN_FLIGHT": 0, "WEBHOOK_RETRY_AFTER": 7}
+    shed_before = webhook_limiter.shed
+
+    with patch("dj_shwary.views.ShwaryService") as MockService, django_assert_num_queries(0):
+        response = client.post(
+            reverse("dj_shwary:shwary-webhook"),
+            data=json.dumps({"id": "SHW-1", "status": "completed"}),
+            content_type="application/json",
+        )
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == "7"
+    assert not MockService.called
+    assert get_shedding_stats()["webhook"]["shed"] == shed_before + 1
@@ -0,0 +1,93 @@
+import json
+import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from dj_shwary.models import ShwaryDailyRollup, ShwaryTransaction
+from dj_shwary.signals import payment_success
+
+
+@pytest.mark.django_db
+def test_loadtest_in_process_report():
+    """Le load test interne rejoue les webhooks via un stub et produit un rapport JSON."""
+    out = StringIO()
+    call_command(
+        "shwary_webhook_loadtest",
+        requests=20,
+        concurrency=1,
+        duplicate_ratio=0.25,
+        status_mix="completed=1",
+        seed=1,
+        keep=True,
+        json=True,
+        stdout=out,
+    )
+
+    report = json.loads(out.getvalue().split("\n", 1)[1])
+    assert report["requests"] == 20
+    assert report["status_codes"] == {"200": 20}
+    assert report["rate_500"] == 0
+    assert "lock_wait_ms" in report
+
+    # 15 transactions uniques, toutes confirmées par le stub
+    assert ShwaryTransaction.objects.filter(status=ShwaryTransaction.Status.COMPLETED).count() == 15
+
+
+@pytest.mark.django_db
+def test_loadtest_missing_transactions_and_cleanup():
+    out = StringIO()
+    call_command(
+        "shwary_webhook_loadtest",
+        requests=10,
+        concurrency=1,
+        missing_ratio=1.0,
+        json=True,
+        stdout=out,
+    )
+
+    report = json.loads(out.getvalue().split("\n", 1)[1])
+    assert report["rate_404"] == 1.0
+    assert ShwaryTransaction.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_loadtest_cleanup_leaves_rollups_balanced(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("shwary_webhook_loadtest", requests=10, concurrency=1, json=True, stdout=StringIO())
+
+    assert ShwaryTransaction.objects.count() == 0
+    # Créées par bulk_create puis supprimées : agrégats revenus à zéro, jamais négatifs
+    assert set(ShwaryDailyRollup.objects.values_list("count", flat=True)) <= {0}
+
+
+@pytest.mark.django_db
+def test_loadtest_mutes_application_receivers():
+    received = []
+    handler = lambda sender, transaction, **kwargs: received.append(transaction.shwary_id)
+    payment_success.connect(handler)
+    try:
+        options = dict(requests=5, concurrency=1, status_mix="completed=1", json=True, stdout=StringIO())
+        call_command("shwary_webhook_loadtest", **options)
+        # Transactions synthétiques : aucune "commande" livrée
+        assert received == []
+
+        call_command("shwary_webhook_loadtest", with_receivers=True, **options)
+        assert len(received) == 5
+    finally:
+        payment_success.disconnect(handler)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_stubs_batched_verifications(settings):
+    settings.SHWARY = {**settings.SHWARY, "WEBHOOK_BATCH_WINDOW_MS": 5}
+    out = StringIO()
+    # Le mode groupé ne doit jamais construire de vrai client Shwary
+    with patch("dj_shwary.batching.new_async_client", side_effect=AssertionError("vraie API appelée")):
+        call_command(
+            "shwary_webhook_loadtest", requests=5, concurrency=1, status_mix="completed=1",
+            keep=True, json=True, stdout=out,
+        )
+
+    report = json.loads(out.getvalue().split("\n", 1)[1])
+    assert report["status_codes"] == {"200": 5}
+    assert ShwaryTransaction.objects.filter(status=ShwaryTransaction.Status.COMPLETED).count() == 5
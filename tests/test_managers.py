@@ -0,0 +1,57 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from dj_shwary.managers import ShwaryPayableQuerySet
+from dj_shwary.models import ShwaryTransaction
+
+User = get_user_model()
+
+
+@pytest.fixture
+def users_with_payments():
+    paid = User.objects.create(username="paid")
+    pending = User.objects.create(username="pending")
+    nothing = User.objects.create(username="nothing")
+
+    old = ShwaryTransaction.objects.create(
+        content_object=paid, amount=1000, status=ShwaryTransaction.Status.FAILED
+    )
+    ShwaryTransaction.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=1))
+    ShwaryTransaction.objects.create(content_object=paid, amount=2500, status=ShwaryTransaction.Status.COMPLETED)
+    ShwaryTransaction.objects.create(content_object=paid, amount=500, status=ShwaryTransaction.Status.COMPLETED)
+    ShwaryTransaction.objects.create(content_object=pending, amount=700)
+    return paid, pending, nothing
+
+
+@pytest.mark.django_db
+def test_host_annotations_in_one_query(users_with_payments):
+    paid, pending, nothing = users_with_payments
+    queryset = ShwaryPayableQuerySet(User).with_latest_shwary_status().with_paid_total().order_by("pk")
+
+    with CaptureQueriesContext(connection) as ctx:
+        rows = {user.username: (user.shwary_status, user.shwary_paid_total) for user in queryset}
+
+    assert len(ctx.captured_queries) == 1
+    assert rows["paid"] == (ShwaryTransaction.Status.COMPLETED, Decimal("3000"))
+    assert rows["pending"] == (ShwaryTransaction.Status.PENDING, Decimal("0"))
+    assert rows["nothing"] == (None, Decimal("0"))
+
+
+@pytest.mark.django_db
+def test_latest_status_by_object(users_with_payments):
+    paid, pending, nothing = users_with_payments
+
+    with CaptureQueriesContext(connection) as ctx:
+        statuses = ShwaryTransaction.objects.latest_status_by_object([paid, pending, nothing])
+
+    assert len(ctx.captured_queries) == 1
+    assert ShwaryTransaction.objects.for_object(paid).count() == 3
+    content_type_id = ShwaryTransaction.objects.for_object(paid).first().content_type_id
+    assert statuses == {
+        (content_type_id, str(paid.pk)): ShwaryTransaction.Status.COMPLETED,
+        (content_type_id, str(pending.pk)): ShwaryTransaction.Status.PENDING,
+    }
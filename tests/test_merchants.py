@@ -0,0 +1,123 @@
+import json
+import pytest
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.urls import reverse
+from dj_shwary import merchants
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.services import ShwaryService
+
+User = get_user_model()
+
+MULTI = {
+    "SANDBOX": False,
+    "DEFAULT_MERCHANT": "drc",
+    "MERCHANTS": {
+        "drc": {"MERCHANT_ID": "drc_id", "MERCHANT_KEY": "drc_key", "COUNTRIES": ["DRC"]},
+        "east": {"MERCHANT_ID": "east_id", "MERCHANT_KEY": "east_key", "COUNTRIES": ["KE", "UG"], "SANDBOX": True},
+    },
+}
+
+
+def test_legacy_settings_define_default_merchant():
+    merchant = merchants.get_merchant()
+    assert merchant.name == "default"
+    assert merchant.merchant_id == "test_id"
+
+
+def test_multi_merchant_settings(settings):
+    settings.SHWARY = MULTI
+    assert set(merchants.get_merchants()) == {"drc", "east"}
+    assert merchants.get_merchant().name == "drc"
+    assert merchants.resolve_merchant("KE").name == "east"
+    assert merchants.resolve_merchant("KE").is_sandbox is True
+    assert merchants.resolve_merchant("XX").name == "drc"
+
+
+def test_incomplete_merchant_raises(settings):
+    settings.SHWARY = {"MERCHANTS": {"drc": {"MERCHANT_ID": "drc_id"}}}
+    with pytest.raises(ImproperlyConfigured):
+        merchants.get_merchants()
+    settings.SHWARY = MULTI
+    with pytest.raises(ImproperlyConfigured):
+        merchants.get_merchant("unknown")
+
+
+def test_clients_are_pooled_per_merchant(settings):
+    settings.SHWARY = MULTI
+    drc = merchants.get_client("drc")
+    assert merchants.get_client("drc") is drc
+    assert merchants.get_client("east") is not drc
+
+    # Un changement de configuration vide le pool
+    settings.SHWARY = {**MULTI, "TIMEOUT": 5.0}
+    assert merchants.get_client("drc") is not drc
+
+
+@pytest.mark.django_db
+def test_make_payment_routes_by_country(settings):
+    settings.SHWARY = MULTI
+    user = User.objects.create(username="multi")
+    clients = {"drc": MagicMock(), "east": MagicMock()}
+    for name, client in clients.items():
+        client.initiate_payment.return_value.id = f"SHW-{name}"
+        client.initiate_payment.return_value.status = "pending"
+        client.initiate_payment.return_value.model_dump.return_value = {}
+
+    with patch("dj_shwary.services.get_client", side_effect=lambda name: clients[name]):
+        txn = ShwaryService().make_payment(
+            related_object=user, amount=100, phone_number="+254712345678", country="KE", currency="KES"
+        )
+
+    assert txn.merchant == "east"
+    assert txn.is_sandbox is True
+    assert txn.shwary_id == "SHW-east"
+    assert not clients["drc"].initiate_payment.called
+
+
+@pytest.mark.django_db
+def test_webhook_verifies_with_transaction_merchant(client, settings):
+    settings.SHWARY = MULTI
+    user = User.objects.create(username="multiwebhook")
+    ShwaryTransaction.objects.create(
+        shwary_id="SHW-EAST", content_object=user, amount=100, merchant="east"
+    )
+
+    with patch("dj_shwary.views.ShwaryService") as MockService:
+        api_res = MagicMock(status="completed")
+        api_res.model_dump.return_value = {"id": "SHW-EAST", "status": "completed"}
+        MockService.return_value.client.get_transaction.return_value = api_res
+
+        url = reverse("dj_shwary:shwary-webhook")
+        response = client.post(url, data=json.dumps({"id": "SHW-EAST", "status": "completed"}), content_type="application/json")
+
+        # Transaction inconnue : 404 sans appeler l'API
+        missing = client.post(url, data=json.dumps({"id": "SHW-NONE", "status": "completed"}), content_type="application/json")
+
+    assert response.status_code == 200
+    MockService.assert_called_once_with(merchant="east")
+    assert missing.status_code == 404
+
+
+@pytest.mark.django_db
+def test_check_pending_uses_merchant_client(settings):
+    settings.SHWARY = MULTI
+    user = User.objects.create(username="multipending")
+    ShwaryTransaction.objects.create(shwary_id="SHW-D", content_object=user, amount=1, merchant="drc")
+    ShwaryTransaction.objects.create(shwary_id="SHW-E", content_object=user, amount=1, merchant="east")
+    ShwaryTransaction.objects.update(created_at="2020-01-01T00:00:00Z")
+
+    clients = {"drc": MagicMock(), "east": MagicMock()}
+    for client in clients.values():
+        client.get_transaction.return_value.status = "completed"
+        client.get_transaction.return_value.model_dump.return_value = {}
+
+    with patch("dj_shwary.management.commands.check_pending_pay.get_client", side_effect=lambda name: clients[name]):
+        call_command("check_pending_pay", stdout=StringIO())
+
+    clients["drc"].get_transaction.assert_called_once_with("SHW-D")
+    clients["east"].get_transaction.assert_called_once_with("SHW-E")
+    assert ShwaryTransaction.objects.filter(status=ShwaryTransaction.Status.COMPLETED).count() == 2
@@ -0,0 +1,113 @@
+import json
+import pytest
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import reverse
+from django.utils import timezone
+from dj_shwary import partitioning
+from dj_shwary.models import ShwaryTransaction
+
+User = get_user_model()
+
+requires_postgres = pytest.mark.skipif(connection.vendor != "postgresql", reason="PostgreSQL requis")
+
+
+def test_partition_sql():
+    assert partitioning.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partitioning.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitioning.create_partition_sql(date(2026, 12, 15)) == (
+        'CREATE TABLE IF NOT EXISTS "dj_shwary_shwarytransaction_p2026_12" '
+        'PARTITION OF "dj_shwary_shwarytransaction" '
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+    statements = partitioning.convert_sql(date(2026, 11, 1), date(2027, 1, 1))
+    assert 'PARTITION BY RANGE ("created_at")' in statements[0]
+    assert sum("PARTITION OF" in sql and "FOR VALUES" in sql for sql in statements) == 3
+    # shwary_id unique dans chaque partition (3 mois + DEFAULT), pas sur la table parente
+    assert sum(sql.startswith("CREATE UNIQUE INDEX") for sql in statements) == 4
+    assert not any('UNIQUE ("shwary_id", "created_at")' in sql for sql in statements)
+    assert statements[-1].endswith('RENAME TO "dj_shwary_shwarytransaction"')
+
+
+@pytest.mark.django_db
+def test_command_is_noop_without_postgres():
+    if connection.vendor == "postgresql":
+        pytest.skip("Comportement SQLite")
+    out = StringIO()
+    call_command("shwary_partitions", convert=True, stdout=out)
+    assert "non supporté" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_lookback_bounds_webhook_lookup(client, settings):
+    settings.SHWARY = {**settings.SHWARY, "PARTITION_LOOKBACK_DAYS": 30}
+    user = User.objects.create(username="lookback")
+    old = ShwaryTransaction.objects.create(shwary_id="SHW-OLD", content_object=user, amount=1)
+    ShwaryTransaction.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=90))
+
+    assert not ShwaryTransaction.objects.recent().filter(shwary_id="SHW-OLD").exists()
+    assert ShwaryTransaction.objects.recent(days=120).filter(shwary_id="SHW-OLD").exists()
+
+    with patch("dj_shwary.views.ShwaryService") as MockService:
+        response = client.post(
+            reverse("dj_shwary:shwary-webhook"),
+            data=json.dumps({"id": "SHW-OLD", "status": "completed"}),
+            content_type="application/json",
+        )
+    assert response.status_code == 404
+    assert not MockService.called
+
+
+@requires_postgres
+@pytest.mark.django_db(transaction=True)
+def test_convert_and_maintain_partitions(client):
+    user = User.objects.create(username="partition")
+    ShwaryTransaction.objects.create(shwary_id="SHW-PART", content_object=user, amount=10)
+
+    call_command("shwary_partitions", convert=True, months_ahead=2, stdout=StringIO())
+    assert partitioning.is_partitioned(connection)
+    assert len(partitioning.list_partitions(connection)) >= 3
+
+    with patch("dj_shwary.views.ShwaryService") as MockService:
+        api_res = MagicMock(status="completed")
+        api_res.model_dump.return_value = {"id": "SHW-PART", "status": "completed"}
+        MockService.return_value.client.get_transaction.return_value = api_res
+        response = client.post(
+            reverse("dj_shwary:shwary-webhook"),
+            data=json.dumps({"id": "SHW-PART", "status": "completed"}),
+            content_type="application/json",
+        )
+    assert response.status_code == 200
+    assert ShwaryTransaction.objects.get(shwary_id="SHW-PART").status == "completed"
+
+
+@requires_postgres
+@pytest.mark.django_db(transaction=True)
+def test_migration_operation_uses_historical_model():
+    user = User.objects.create(username="historical")
+    ShwaryTransaction.objects.create(shwary_id="SHW-DUP", content_object=user, amount=10)
+
+    loader = MigrationExecutor(connection).loader
+    from_state = loader.project_state(loader.graph.leaf_nodes("dj_shwary")[0])
+    to_state = from_state.clone()
+    operation = partitioning.ConvertToMonthlyPartitions(months_ahead=1)
+    assert operation.reversible is False
+    operation.state_forwards("dj_shwary", to_state)
+
+    with patch("dj_shwary.partitioning.convert", wraps=partitioning.convert) as convert:
+        with connection.schema_editor() as editor:
+            operation.database_forwards("dj_shwary", editor, from_state, to_state)
+    model = convert.call_args.args[2]
+    assert model is not ShwaryTransaction
+    assert model._meta.db_table == ShwaryTransaction._meta.db_table
+    assert partitioning.is_partitioned(connection)
+
+    # Doublon dans le même mois : refusé par l'index unique de la partition
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ShwaryTransaction.objects.create(shwary_id="SHW-DUP", content_object=user, amount=10)
@@ -0,0 +1,75 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from dj_shwary.management.commands.check_pending_pay import Command, close_worker_connections
+from dj_shwary.managers import TransactionRecord
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.reconciliation import refresh_record
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_records_are_lean(django_assert_num_queries):
+    user = User.objects.create(username="records")
+    for i in range(5):
+        ShwaryTransaction.objects.create(shwary_id=f"SHW-REC{i}", content_object=user, amount=10)
+
+    with django_assert_num_queries(1):
+        records = list(ShwaryTransaction.objects.filter(status="pending").records(chunk_size=2))
+
+    assert len(records) == 5
+    assert isinstance(records[0], TransactionRecord)
+    assert not hasattr(records[0], "__dict__")
+    assert {r.shwary_id for r in records} == {f"SHW-REC{i}" for i in range(5)}
+
+
+@pytest.mark.django_db
+def test_refresh_record_only_loads_changed_transactions(django_assert_num_queries):
+    user = User.objects.create(username="refreshrecord")
+    ShwaryTransaction.objects.create(shwary_id="SHW-RR", content_object=user, amount=10)
+    record = next(ShwaryTransaction.objects.records())
+
+    client = MagicMock()
+    client.get_transaction.return_value.status = "pending"
+    with django_assert_num_queries(0):
+        assert refresh_record(record, client=client)
+
+    client.get_transaction.return_value.status = "completed"
+    client.get_transaction.return_value.model_dump.return_value = {"status": "completed"}
+    with patch("dj_shwary.signals.payment_success.send") as mock_success:
+        assert refresh_record(record, client=client)
+
+    assert record.status == "completed"
+    assert mock_success.call_count == 1
+    assert ShwaryTransaction.objects.get(shwary_id="SHW-RR").raw_response == {"status": "completed"}
+
+    client.get_transaction.side_effect = Exception("API down")
+    assert refresh_record(record, client=client) is False
+
+
+def test_worker_connections_closed_once_per_thread():
+    closed = []
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # Un seul thread a servi : les autres sont créés par la barrière, sans connexion ouverte
+        executor.submit(lambda: None).result()
+        with patch("dj_shwary.management.commands.check_pending_pay.connections") as connections:
+            connections.close_all.side_effect = lambda: closed.append(threading.get_ident())
+            close_worker_connections(executor, 3)
+
+    assert len(closed) == len(set(closed)) == 3
+
+
+@pytest.mark.django_db
+def test_worker_thread_keeps_its_connection_between_records(settings):
+    settings.DATABASES["default"]["CONN_MAX_AGE"] = 0
+    command = Command(stdout=MagicMock())
+    record = TransactionRecord("pk", "SHW-CONN", "pending", "default")
+    with patch.object(connection, "close") as close, \
+         patch("dj_shwary.management.commands.check_pending_pay.refresh_record", return_value=True):
+        for _ in range(3):
+            command.check_threaded(record, MagicMock(), batch=None)
+    assert not close.called
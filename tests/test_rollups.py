@@ -0,0 +1,98 @@
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from dj_shwary import rollups
+from dj_shwary.models import ShwaryDailyRollup, ShwaryTransaction
+
+User = get_user_model()
+
+
+def snapshot():
+    return {
+        (r.currency, r.status, r.is_sandbox): (r.count, r.amount)
+        for r in ShwaryDailyRollup.objects.all()
+        if r.count
+    }
+
+
+@pytest.mark.django_db
+def test_rollup_follows_creations_transitions_and_deletes(django_capture_on_commit_callbacks):
+    user = User.objects.create(username="rollup")
+    with django_capture_on_commit_callbacks(execute=True):
+        a = ShwaryTransaction.objects.create(shwary_id="SHW-R1", content_object=user, amount=100)
+        ShwaryTransaction.objects.create(shwary_id="SHW-R2", content_object=user, amount=50)
+        ShwaryTransaction.objects.create(shwary_id="SHW-R3", content_object=user, amount=10, currency="KES")
+
+    assert snapshot() == {
+        ("CDF", "pending", True): (2, Decimal("150.00")),
+        ("KES", "pending", True): (1, Decimal("10.00")),
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        # Transition sur une instance rechargée depuis la base
+        ShwaryTransaction.objects.get(pk=a.pk).set_status(ShwaryTransaction.Status.COMPLETED)
+        # Sauvegarde sans changement de statut : rien ne bouge
+        ShwaryTransaction.objects.get(shwary_id="SHW-R2").save()
+        ShwaryTransaction.objects.get(shwary_id="SHW-R3").delete()
+
+    assert snapshot() == {
+        ("CDF", "pending", True): (1, Decimal("50.00")),
+        ("CDF", "completed", True): (1, Decimal("100.00")),
+    }
+    day = timezone.localdate()
+    assert list(ShwaryDailyRollup.objects.between(day, day).totals("currency")) == [
+        {"currency": "CDF", "total_count": 2, "total_amount": Decimal("150.00")},
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_command_recomputes_from_transactions(settings):
+    settings.SHWARY = {**settings.SHWARY, "DAILY_ROLLUP": False}
+    user = User.objects.create(username="rebuild")
+    ShwaryTransaction.objects.create(shwary_id="SHW-RB1", content_object=user, amount=100, status="completed")
+    ShwaryTransaction.objects.create(shwary_id="SHW-RB2", content_object=user, amount=20, status="completed")
+    assert not ShwaryDailyRollup.objects.exists()
+
+    out = StringIO()
+    call_command("shwary_rebuild_rollups", stdout=out)
+
+    assert "1 agrégats" in out.getvalue()
+    assert snapshot() == {("CDF", "completed", True): (2, Decimal("120.00"))}
+
+
+@pytest.mark.django_db
+def test_rollup_waits_for_commit(django_capture_on_commit_callbacks):
+    user = User.objects.create(username="deferred")
+    with django_capture_on_commit_callbacks() as callbacks:
+        ShwaryTransaction.objects.create(shwary_id="SHW-D1", content_object=user, amount=100)
+        # La ligne du jour n'est pas touchée pendant la transaction de l'écriture
+        assert snapshot() == {}
+
+    for callback in callbacks:
+        callback()
+    assert snapshot() == {("CDF", "pending", True): (1, Decimal("100.00"))}
+
+
+@pytest.mark.django_db
+def test_bulk_create_then_delete_nets_to_zero(django_capture_on_commit_callbacks):
+    user = User.objects.create(username="bulk")
+    with django_capture_on_commit_callbacks(execute=True):
+        txns = ShwaryTransaction.objects.bulk_create([
+            ShwaryTransaction(shwary_id=f"SHW-B{i}", content_object=user, amount=10) for i in range(3)
+        ])
+        rollups.record_bulk_create(txns)
+    assert snapshot() == {("CDF", "pending", True): (3, Decimal("30.00"))}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ShwaryTransaction.objects.filter(shwary_id__startswith="SHW-B").delete()
+    assert snapshot() == {}
+
+    # Suppression hors agrégats (nettoyage de données synthétiques) : rien ne bouge
+    with django_capture_on_commit_callbacks(execute=True):
+        ShwaryTransaction.objects.create(shwary_id="SHW-B9", content_object=user, amount=10)
+    with rollups.suspended(), django_capture_on_commit_callbacks(execute=True):
+        ShwaryTransaction.objects.filter(shwary_id="SHW-B9").delete()
+    assert snapshot() == {("CDF", "pending", True): (1, Decimal("10.00"))}
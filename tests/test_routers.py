@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.auth import get_user_model
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.routers import ShwaryReplicaRouter, pin_primary
+
+User = get_user_model()
+
+ROUTED = {"MERCHANT_ID": "test_id", "MERCHANT_KEY": "test_key", "READ_REPLICAS": ["replica"]}
+
+
+def test_read_database_setting(settings):
+    assert ShwaryTransaction.objects.for_reads().db == "default"
+
+    settings.SHWARY = {**settings.SHWARY, "READ_DATABASE": "replica"}
+    assert ShwaryTransaction.objects.for_reads().db == "replica"
+    assert ShwaryTransaction.objects.for_reads("other").db == "other"
+    assert ShwaryTransaction.objects.on_primary().db == "default"
+
+
+def test_replica_router(settings):
+    settings.SHWARY = ROUTED
+    settings.DATABASE_ROUTERS = ["dj_shwary.routers.ShwaryReplicaRouter"]
+
+    assert ShwaryTransaction.objects.filter(status="pending").db == "replica"
+    # select_for_update est une lecture pour écrire : toujours sur le primaire
+    assert ShwaryTransaction.objects.select_for_update().db == "default"
+    assert ShwaryTransaction.objects.on_primary().db == "default"
+    with pin_primary():
+        assert ShwaryTransaction.objects.filter(status="pending").db == "default"
+
+    # Les autres applications ne sont pas routées
+    assert User.objects.all().db == "default"
+    assert ShwaryReplicaRouter().allow_migrate("replica", "dj_shwary") is False
+
+
+@pytest.mark.django_db
+def test_set_status_writes_to_primary(settings):
+    settings.SHWARY = {**settings.SHWARY, "READ_DATABASE": "replica"}
+    user = User.objects.create(username="replica")
+    txn = ShwaryTransaction.objects.create(shwary_id="SHW-REP", content_object=user, amount=100)
+
+    # Instance lue sur le réplica : l'écriture doit quand même partir sur le primaire
+    txn._state.db = "replica"
+    txn.set_status(ShwaryTransaction.Status.COMPLETED)
+
+    assert txn._state.db == "default"
+    assert ShwaryTransaction.objects.get(pk=txn.pk).status == ShwaryTransaction.Status.COMPLETED
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.scheduling import ReconciliationScheduler, amark_watched
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_pending(user, name, minutes, amount=10, currency="CDF", country="DRC"):
+    txn = ShwaryTransaction.objects.create(
+        shwary_id=name, content_object=user, amount=amount, currency=currency, country=country
+    )
+    ShwaryTransaction.objects.filter(pk=txn.pk).update(created_at=timezone.now() - timedelta(minutes=minutes))
+    return txn
+
+
+@pytest.mark.django_db
+def test_priority_order_with_round_robin():
+    user = User.objects.create(username="scheduler")
+    create_pending(user, "DRC-old", 60)
+    create_pending(user, "DRC-mid", 5, amount=10)
+    create_pending(user, "DRC-rich", 5, amount=10_000)
+    watched = create_pending(user, "DRC-watched", 1)
+    create_pending(user, "KE-old", 45, currency="KES", country="KE")
+    create_pending(user, "KE-new", 10, currency="KES", country="KE")
+    asyncio.run(amark_watched(watched.pk))
+
+    pending = ShwaryTransaction.objects.filter(status="pending")
+    order = [record.shwary_id for record in ReconciliationScheduler(pending, page_size=3)]
+
+    # Une file par (devise, pays), servies à tour de rôle ; le client en attente passe devant
+    assert order == ["DRC-old", "KE-old", "DRC-watched", "KE-new", "DRC-rich", "DRC-mid"]
+
+
+@pytest.mark.django_db
+@pytest.mark.shwary(latency=0.05)
+def test_max_seconds_stops_after_most_urgent(fake_shwary):
+    user = User.objects.create(username="budget")
+    oldest = create_pending(user, "SHW-OLD", 120)
+    create_pending(user, "SHW-NEW", 10)
+    for txn in ShwaryTransaction.objects.all():
+        fake_shwary.set_status(txn.shwary_id, "completed")
+
+    out = StringIO()
+    call_command("check_pending_pay", max_seconds=0.01, stdout=out)
+
+    assert "1 mises à jour, 0 erreurs sur 1 transactions" in out.getvalue()
+    assert "Budget de 0.01s atteint" in out.getvalue()
+    assert set(ShwaryTransaction.objects.filter(status="completed").values_list("pk", flat=True)) == {oldest.pk}
+
+
+@pytest.mark.django_db
+def test_watched_record_in_small_lane_is_yielded_once():
+    user = User.objects.create(username="small-lane")
+    watched = create_pending(user, "A", 1)
+    create_pending(user, "B", 30)
+    asyncio.run(amark_watched(watched.pk))
+
+    pending = ShwaryTransaction.objects.filter(status="pending")
+    order = [record.shwary_id for record in ReconciliationScheduler(pending, page_size=10)]
+    assert order == ["B", "A"]
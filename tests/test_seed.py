@@ -0,0 +1,74 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from dj_shwary.models import ShwaryDailyRollup, ShwaryTransaction
+
+User = get_user_model()
+
+
+def rollup_snapshot():
+    return {
+        (r.day, r.currency, r.status, r.is_sandbox): (r.count, r.amount)
+        for r in ShwaryDailyRollup.objects.all()
+        if r.count
+    }
+
+
+@pytest.mark.django_db
+def test_seed_generates_realistic_rows():
+    out = StringIO()
+    call_command("shwary_seed", count=60, chunk_size=25, hosts=10, seed=1, stdout=out)
+
+    assert "60/60 transactions" in out.getvalue() and "lignes/s" in out.getvalue()
+    assert ShwaryTransaction.objects.count() == 60
+    assert User.objects.filter(username__startswith="shwary-seed-").count() == 10
+    assert ShwaryTransaction.objects.values("object_id").distinct().count() <= 10
+
+    # Dates générées conservées (auto_now_add suspendu puis rétabli)
+    assert ShwaryTransaction.objects.filter(created_at__lt=timezone.now() - timedelta(days=1)).exists()
+    assert ShwaryTransaction._meta.get_field("created_at").auto_now_add
+    assert set(ShwaryTransaction.objects.values_list("status", flat=True)) >= {"completed", "failed"}
+    settled = ShwaryTransaction.objects.filter(settled_at__isnull=False).exclude(settled_via="initiation")
+    assert all(txn.settled_at > txn.created_at for txn in settled)
+    assert ShwaryTransaction.objects.exclude(phone_normalized__startswith="+").count() == 0
+
+
+@pytest.mark.django_db
+def test_seed_links_existing_rows_and_clears(django_capture_on_commit_callbacks):
+    host = User.objects.create(username="existing")
+    with django_capture_on_commit_callbacks(execute=True):
+        ShwaryTransaction.objects.create(shwary_id="SHW-REAL", content_object=host, amount=100)
+    before = rollup_snapshot()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("shwary_seed", count=5, related_model="auth.user", seed=2, stdout=StringIO())
+    seeded = ShwaryTransaction.objects.filter(shwary_id__startswith="SEED-")
+    assert set(seeded.values_list("object_id", flat=True)) == {str(host.pk)}
+    assert sum(count for count, _ in rollup_snapshot().values()) == 6
+
+    call_command("shwary_seed", count=3, related_model="auth.user", clear=True, stdout=StringIO())
+    assert ShwaryTransaction.objects.count() == 4
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("shwary_seed", count=0, clear=True, stdout=StringIO())
+    assert list(ShwaryTransaction.objects.values_list("shwary_id", flat=True)) == ["SHW-REAL"]
+    # Agrégats recalculés sur les jours concernés : identiques à l'état d'avant génération
+    assert rollup_snapshot() == before
+
+    with pytest.raises(CommandError):
+        call_command("shwary_seed", count=1, related_model="shop.missing", stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_clear_removes_generated_users():
+    call_command("shwary_seed", count=6, hosts=2, seed=3, stdout=StringIO())
+    assert User.objects.filter(username__startswith="shwary-seed-").count() == 2
+
+    out = StringIO()
+    call_command("shwary_seed", count=0, clear=True, stdout=out)
+    assert "6 transactions générées supprimées" in out.getvalue()
+    assert not User.objects.filter(username__startswith="shwary-seed-").exists()
+    assert not ShwaryTransaction.objects.exists()
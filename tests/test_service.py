@@ -56,3 +56,43 @@ def test_make_payment_api_failure():
     txn = ShwaryTransaction.objects.get(phone_number="243810000001")
     assert txn.status == ShwaryTransaction.Status.FAILED
     assert "API Connection Timeout" in txn.error_message
+
+
+@pytest.mark.django_db
+def test_check_status_dispatches_signals():
+    """Le rattrapage (polling) envoie les mêmes signaux que le webhook."""
+    from unittest.mock import patch
+    from dj_shwary.models import ShwaryTransaction
+
+    ShwaryTransaction.objects.create(shwary_id="SHW-POLL", amount=1000)
+    mock_client = MagicMock()
+    mock_client.get_transaction.return_value.status = "completed"
+    mock_client.get_transaction.return_value.model_dump.return_value = {"status": "completed"}
+
+    with patch("dj_shwary.signals.payment_success.send") as mock_signal:
+        status = ShwaryService(client=mock_client).check_status("SHW-POLL")
+
+    assert status == "completed"
+    assert mock_signal.call_count == 1
+    assert mock_signal.call_args.kwargs["previous_status"] == "pending"
+
+
+@pytest.mark.django_db
+def test_check_status_on_stale_replica_does_not_resend_signals():
+    """Réplica en retard (encore pending) alors que le webhook a déjà appliqué completed."""
+    from unittest.mock import patch
+    from dj_shwary.managers import ShwaryTransactionQuerySet, TransactionRecord
+    from dj_shwary.models import ShwaryTransaction
+
+    txn = ShwaryTransaction.objects.create(shwary_id="SHW-STALE", amount=1000)
+    txn.set_status("completed")
+    stale = TransactionRecord(txn.pk, txn.shwary_id, "pending", txn.merchant)
+    mock_client = MagicMock()
+    mock_client.get_transaction.return_value.status = "completed"
+    mock_client.get_transaction.return_value.model_dump.return_value = {"status": "completed"}
+
+    with patch.object(ShwaryTransactionQuerySet, "records", return_value=iter([stale])), \
+            patch("dj_shwary.signals.payment_success.send") as mock_signal:
+        assert ShwaryService(client=mock_client).check_status("SHW-STALE") == "completed"
+
+    assert mock_signal.call_count == 0
@@ -0,0 +1,129 @@
+import threading
+import pytest
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction as db_transaction
+from django.test import override_settings
+from dj_shwary import settlements
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.settlements import collect_settlements
+from dj_shwary.signals import payment_status_changed, payment_success, payments_settled_bulk
+
+User = get_user_model()
+
+
+@pytest.fixture
+def bulk_calls():
+    calls = []
+
+    def receiver(sender, transactions, succeeded, failed, **kwargs):
+        calls.append({"sender": sender, "all": transactions, "succeeded": succeeded, "failed": failed})
+
+    payments_settled_bulk.connect(receiver, dispatch_uid="test-bulk")
+    yield calls
+    payments_settled_bulk.disconnect(dispatch_uid="test-bulk")
+
+
+@pytest.fixture
+def success_calls():
+    calls = []
+    payment_success.connect(lambda sender, transaction, **kw: calls.append(transaction.pk), weak=False,
+                            dispatch_uid="test-success")
+    yield calls
+    payment_success.disconnect(dispatch_uid="test-success")
+
+
+def create_pending(count, prefix="SHW-B"):
+    user = User.objects.create(username=f"bulk-{prefix}")
+    return [
+        ShwaryTransaction.objects.create(shwary_id=f"{prefix}{i}", content_object=user, amount=10)
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_one_bulk_signal_per_batch(bulk_calls, success_calls, django_capture_on_commit_callbacks):
+    txns = create_pending(5)
+    with django_capture_on_commit_callbacks(execute=True), collect_settlements(sender="import"):
+        for txn in txns[:3]:
+            txn.set_status("completed")
+        txns[3].set_status("failed")
+        txns[4].set_status("pending")
+
+    [call] = bulk_calls
+    assert call["sender"] == "import"
+    assert [t.pk for t in call["all"]] == [t.pk for t in txns[:4]]
+    assert len(call["succeeded"]) == 3 and len(call["failed"]) == 1
+    # Les signaux individuels restent envoyés par défaut
+    assert success_calls == [t.pk for t in txns[:3]]
+
+
+@pytest.mark.django_db
+def test_per_item_signals_can_be_disabled(bulk_calls, success_calls, django_capture_on_commit_callbacks):
+    txns = create_pending(2)
+    changed = []
+    payment_status_changed.connect(lambda sender, transaction, **kw: changed.append(transaction.pk), weak=False,
+                                   dispatch_uid="test-changed")
+    try:
+        with override_settings(SHWARY={"MERCHANT_ID": "id", "MERCHANT_KEY": "key", "BULK_PER_ITEM_SIGNALS": False}):
+            with django_capture_on_commit_callbacks(execute=True), collect_settlements():
+                for txn in txns:
+                    txn.set_status("completed")
+    finally:
+        payment_status_changed.disconnect(dispatch_uid="test-changed")
+
+    assert success_calls == []
+    assert len(changed) == 2
+    assert len(bulk_calls[0]["succeeded"]) == 2
+
+
+@pytest.mark.django_db
+def test_rolled_back_settlements_are_not_collected(bulk_calls, django_capture_on_commit_callbacks):
+    txns = create_pending(2)
+    with django_capture_on_commit_callbacks(execute=True), collect_settlements():
+        txns[0].set_status("completed")
+        with pytest.raises(RuntimeError):
+            with db_transaction.atomic():
+                txns[1].set_status("completed")
+                raise RuntimeError("receiver failed")
+
+    assert [t.pk for t in bulk_calls[0]["all"]] == [txns[0].pk]
+
+
+@pytest.mark.django_db
+def test_large_batches_are_split(bulk_calls, django_capture_on_commit_callbacks):
+    txns = create_pending(5)
+    with override_settings(SHWARY={"MERCHANT_ID": "id", "MERCHANT_KEY": "key", "BULK_SIGNAL_SIZE": 2}):
+        with django_capture_on_commit_callbacks(execute=True), collect_settlements():
+            for txn in txns:
+                txn.set_status("completed")
+    assert [len(call["all"]) for call in bulk_calls] == [2, 2, 1]
+
+
+@pytest.mark.django_db
+def test_worker_threads_join_the_batch():
+    seen = []
+    with collect_settlements() as batch:
+        def work():
+            with collect_settlements(batch=batch):
+                seen.append(settlements.current_batch())
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert seen == [batch]
+
+
+@pytest.mark.django_db
+def test_check_pending_pay_sends_bulk_signal(bulk_calls, fake_shwary, django_capture_on_commit_callbacks):
+    txns = create_pending(3, prefix="SHW-R")
+    ShwaryTransaction.objects.update(created_at="2020-01-01T00:00:00Z")
+    for txn in txns:
+        fake_shwary.set_status(txn.shwary_id, "completed")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("check_pending_pay", stdout=StringIO())
+
+    [call] = bulk_calls
+    assert {t.shwary_id for t in call["succeeded"]} == {t.shwary_id for t in txns}
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from django.apps import apps
+from django.test import override_settings
+from dj_shwary import merchants
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Budget d'import des modules dj_shwary (hors Django lui-même), en secondes.
+# L'import du SDK et de sa pile HTTP coûte à lui seul ~200 ms.
+IMPORT_BUDGET = 0.15
+
+PROBE = """
+import json, sys, time
+import django
+django.setup()
+started = time.perf_counter()
+import dj_shwary.services, dj_shwary.views, dj_shwary.tasks, dj_shwary.batching, dj_shwary.reconciliation
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "sdk": sorted(m for m in sys.modules if m.split(".")[0] in ("shwary", "httpx"))}))
+"""
+
+
+def run_probe():
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="tests.settings")
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT), str(ROOT / "src"), env.get("PYTHONPATH", "")])
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_sdk_is_not_imported_at_startup():
+    result = run_probe()
+    assert result["sdk"] == []
+    assert result["elapsed"] < IMPORT_BUDGET
+
+
+def test_sdk_is_imported_on_first_client():
+    merchants.close_clients()
+    client = merchants.get_client()
+    assert type(client).__module__.startswith("shwary")
+    merchants.close_clients()
+
+
+def test_warm_up_opens_each_merchant_connection():
+    client = MagicMock()
+    with patch.object(merchants, "get_client", return_value=client) as get_client:
+        assert merchants.warm_up(background=False) is None
+    get_client.assert_called_once_with("default")
+    client._client.head.assert_called_once_with("")
+
+
+def test_warm_up_never_raises():
+    client = MagicMock()
+    client._client.head.side_effect = OSError("dns")
+    with patch.object(merchants, "get_client", return_value=client):
+        merchants.warm_up(background=False)
+
+    with override_settings(SHWARY={}):
+        merchants.warm_up(background=False)
+
+
+def test_ready_warms_up_only_when_enabled():
+    config = apps.get_app_config("dj_shwary")
+    with patch.object(merchants, "warm_up") as warm_up:
+        config.ready()
+        warm_up.assert_not_called()
+        with override_settings(SHWARY={"MERCHANT_ID": "id", "MERCHANT_KEY": "key", "WARMUP": True}):
+            config.ready()
+        warm_up.assert_called_once_with()
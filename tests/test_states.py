@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.services import ShwaryService
+from dj_shwary import states as states_module
+from dj_shwary.states import PaymentState, object_key, payment_state, payment_states
+
+User = get_user_model()
+
+PHONE = "+243972345678"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_batched_fallback_then_cache_hits(django_assert_num_queries):
+    users = [User.objects.create(username=f"buyer-{i}") for i in range(3)]
+    ShwaryTransaction.objects.create(content_object=users[0], amount=10, status="completed")
+    ShwaryTransaction.objects.create(content_object=users[0], amount=10, status="failed")
+    ShwaryTransaction.objects.create(content_object=users[1], amount=10)
+
+    with django_assert_num_queries(1):
+        states = payment_states(users)
+    with django_assert_num_queries(0):
+        assert payment_states(users) == states
+
+    # Un nouvel essai échoué ne "dé-paie" pas la commande
+    assert states[users[0]].is_paid and states[users[0]].status == "failed"
+    assert states[users[1]] == PaymentState(status="pending", transaction_id=states[users[1]].transaction_id)
+    assert states[users[2]] == PaymentState()
+
+
+@pytest.mark.django_db
+def test_transitions_write_the_cache(fake_shwary, django_capture_on_commit_callbacks, django_assert_num_queries):
+    user = User.objects.create(username="order")
+    with django_capture_on_commit_callbacks(execute=True):
+        txn = ShwaryService().make_payment(user, 5000, PHONE)
+    assert payment_state(user).status == "pending"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        fake_shwary.settle(txn.shwary_id)
+    with django_assert_num_queries(0):
+        assert payment_state(user).is_paid
+
+    with django_capture_on_commit_callbacks(execute=True):
+        txn.delete()
+    assert payment_state(user) == PaymentState()
+
+
+
+@pytest.mark.django_db
+def test_miss_fill_does_not_overwrite_a_newer_refresh():
+    user = User.objects.create(username="race")
+    ShwaryTransaction.objects.create(content_object=user, amount=10)
+    key = object_key(user)
+    stale = states_module.load_states([key])
+    fresh = PaymentState(status="completed", is_paid=True, transaction_id=stale[key].transaction_id)
+
+    def load_then_refresh(keys, using=None):
+        # Un webhook réécrit l'état pendant que le lecteur interroge (un réplica en retard)
+        states_module.store_states({key: fresh})
+        return stale
+
+    with patch("dj_shwary.states.load_states", side_effect=load_then_refresh):
+        assert payment_state(user) == stale[key]
+    assert payment_state(user) == fresh
@@ -0,0 +1,83 @@
+import json
+import pytest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from shwary import ShwaryError
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.services import ShwaryService
+from dj_shwary.stats import settlement_stats
+
+User = get_user_model()
+
+PHONE = "+243972345678"
+
+Via = ShwaryTransaction.SettledVia
+
+
+@pytest.mark.django_db
+def test_every_writer_records_settlement(fake_shwary):
+    user = User.objects.create(username="buyer")
+    service = ShwaryService()
+
+    txn = service.make_payment(user, 5000, PHONE)
+    assert txn.country == "DRC"
+    assert txn.initiated_at is not None and txn.settled_at is None
+
+    fake_shwary.settle(txn.shwary_id)
+    txn.refresh_from_db()
+    assert txn.settled_via == Via.WEBHOOK
+    settled_at = txn.settled_at
+
+    # Un webhook rejoué ne déplace pas l'horodatage
+    fake_shwary.settle(txn.shwary_id, status="failed")
+    txn.refresh_from_db()
+    assert txn.settled_at == settled_at
+
+    polled = service.make_payment(user, 5000, PHONE)
+    fake_shwary.set_status(polled.shwary_id, "completed")
+    service.check_status(polled.shwary_id)
+    polled.refresh_from_db()
+    assert polled.settled_via == Via.RECONCILE
+
+    fake_shwary.fail_next("initiate_payment")
+    with pytest.raises(ShwaryError):
+        service.make_payment(user, 5000, PHONE)
+    failed = ShwaryTransaction.objects.get(status="failed", shwary_id__isnull=True)
+    assert failed.settled_via == Via.INITIATION and failed.initiated_at is None
+
+
+def create_settled(user, country, via, seconds, day=date(2026, 3, 2)):
+    initiated_at = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+    txn = ShwaryTransaction.objects.create(content_object=user, amount=10, phone_number=PHONE, country=country)
+    ShwaryTransaction.objects.filter(pk=txn.pk).update(
+        status="completed",
+        initiated_at=initiated_at,
+        settled_at=initiated_at + timedelta(seconds=seconds),
+        settled_via=via,
+    )
+
+
+@pytest.mark.django_db
+def test_settlement_stats_per_country_and_day():
+    user = User.objects.create(username="stats")
+    for seconds in range(1, 11):
+        create_settled(user, "DRC", Via.WEBHOOK if seconds <= 8 else Via.RECONCILE, seconds)
+    create_settled(user, "KE", Via.ADMIN, 300)
+    create_settled(user, "KE", Via.INITIATION, 0)
+    create_settled(user, "DRC", Via.WEBHOOK, 5, day=date(2026, 2, 1))
+
+    drc, ke = settlement_stats(ShwaryTransaction.objects.all(), date(2026, 3, 1), date(2026, 3, 2))
+    assert (drc.country, drc.settled, drc.webhook_share, drc.reconcile_share) == ("DRC", 10, 0.8, 0.2)
+    assert (drc.p50, drc.p95, drc.p99) == (5, 10, 10)
+    assert (ke.settled, ke.admin_share, ke.p50) == (1, 1.0, 300)
+
+    out = StringIO()
+    call_command("shwary_stats", since="2026-03-01", until="2026-03-02", country=["KE"], format="json", stdout=out)
+    [row] = json.loads(out.getvalue())
+    assert row["day"] == "2026-03-02" and row["country"] == "KE"
+
+    out = StringIO()
+    call_command("shwary_stats", since="2026-03-01", until="2026-03-02", stdout=out)
+    assert "80%" in out.getvalue()
@@ -0,0 +1,90 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache
+from django.urls import reverse
+from dj_shwary.models import ShwaryTransaction
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_status_etag_and_not_modified(client):
+    txn = ShwaryTransaction.objects.create(amount=1000, shwary_id="SHW-ST-1")
+    url = reverse("dj_shwary:shwary-status", args=[txn.pk])
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    etag = response["ETag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_status_change_published_on_commit(client, django_capture_on_commit_callbacks):
+    txn = ShwaryTransaction.objects.create(amount=1000, shwary_id="SHW-ST-2")
+    url = reverse("dj_shwary:shwary-status", args=[txn.pk])
+    etag = client.get(url)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        txn.set_status(ShwaryTransaction.Status.COMPLETED, {"status": "completed"})
+
+    # Le long-poll voit immédiatement le nouvel état publié dans le cache
+    response = client.get(url, {"wait": 5}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": str(txn.pk),
+        "status": "completed",
+        "updated_at": txn.updated_at.isoformat(),
+        "is_final": True,
+    }
+
+
+@pytest.mark.django_db
+def test_status_long_poll_timeout(client, settings):
+    settings.SHWARY = {**settings.SHWARY, "STATUS_POLL_INTERVAL": 0.01}
+    txn = ShwaryTransaction.objects.create(amount=1000, shwary_id="SHW-ST-3")
+    url = reverse("dj_shwary:shwary-status", args=[txn.pk])
+    etag = client.get(url)["ETag"]
+
+    response = client.get(url, {"wait": 0.05}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+@pytest.mark.filterwarnings("ignore:StreamingHttpResponse must consume asynchronous iterators")
+def test_status_event_stream_ends_on_final_status(client):
+    txn = ShwaryTransaction.objects.create(amount=1000, status=ShwaryTransaction.Status.FAILED)
+    response = client.get(reverse("dj_shwary:shwary-status", args=[txn.pk]), {"stream": 1})
+
+    assert response["Content-Type"] == "text/event-stream"
+    body = b"".join(response).decode()
+    assert body.count("event: status") == 1
+    assert json.loads(body.split("data: ")[1])["status"] == "failed"
+
+
+@pytest.mark.django_db
+def test_status_unknown_transaction(client):
+    response = client.get(reverse("dj_shwary:shwary-status", args=["00000000-0000-0000-0000-000000000000"]))
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_status_falls_back_to_database_when_cache_is_down(client, caplog):
+    txn = ShwaryTransaction.objects.create(amount=1000, status=ShwaryTransaction.Status.COMPLETED)
+    url = reverse("dj_shwary:shwary-status", args=[txn.pk])
+
+    down = ConnectionError("cache down")
+    with patch.object(BaseCache, "aget", AsyncMock(side_effect=down)), \
+            patch.object(BaseCache, "aset", AsyncMock(side_effect=down)):
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert "cache down" in caplog.text
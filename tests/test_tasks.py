@@ -0,0 +1,155 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from dj_shwary.models import ShwaryTask, ShwaryTransaction
+from dj_shwary.services import ShwaryService
+from dj_shwary.tasks import INITIATION_IN_FLIGHT, INITIATION_INTERRUPTED, initiate_payment
+
+User = get_user_model()
+
+
+def mock_shwary_client():
+    client = MagicMock()
+    client.initiate_payment.return_value.id = "SHW-DEFER"
+    client.initiate_payment.return_value.status = "pending"
+    client.initiate_payment.return_value.model_dump.return_value = {"id": "SHW-DEFER", "status": "pending"}
+    return client
+
+
+@pytest.mark.django_db
+def test_deferred_payment_with_database_backend():
+    user = User.objects.create(username="defer")
+    client = mock_shwary_client()
+
+    txn = ShwaryService(client=client).make_payment(
+        related_object=user, amount=5000, phone_number="+243972345678", defer=True
+    )
+
+    # Rien n'est envoyé à Shwary tant que le worker n'a pas tourné
+    assert txn.shwary_id is None
+    assert not client.initiate_payment.called
+    task = ShwaryTask.objects.get()
+    assert task.kwargs["transaction_id"] == str(txn.pk)
+
+    with patch("dj_shwary.services.get_client", return_value=client), \
+         patch("dj_shwary.signals.payment_status_changed.send") as mock_signal:
+        call_command("shwary_worker", once=True, stdout=StringIO())
+
+    txn.refresh_from_db()
+    assert txn.shwary_id == "SHW-DEFER"
+    assert txn.error_message is None
+    assert mock_signal.call_count == 1
+    assert not ShwaryTask.objects.exists()
+
+
+@pytest.mark.django_db
+def test_deferred_payment_eager_backend_failure(settings):
+    settings.SHWARY = {**settings.SHWARY, "TASK_BACKEND": "dj_shwary.tasks.EagerBackend"}
+    user = User.objects.create(username="eager")
+    client = MagicMock()
+    client.initiate_payment.side_effect = Exception("Numéro refusé")
+
+    with patch("dj_shwary.services.get_client", return_value=client), \
+         patch("dj_shwary.signals.payment_failed.send") as mock_failed:
+        txn = ShwaryService(client=client).make_payment(
+            related_object=user, amount=5000, phone_number="+243972345678", defer=True
+        )
+
+    txn.refresh_from_db()
+    assert txn.status == ShwaryTransaction.Status.FAILED
+    assert "Numéro refusé" in txn.error_message
+    assert mock_failed.call_count == 1
+
+
+@pytest.mark.django_db
+def test_worker_retries_failed_task():
+    task = ShwaryTask.objects.create(name="unknown_task")
+    call_command("shwary_worker", once=True, stdout=StringIO())
+
+    task.refresh_from_db()
+    assert task.status == ShwaryTask.Status.QUEUED
+    assert task.attempts == 1
+    assert "inconnue" in task.last_error
+
+
+@pytest.mark.django_db
+def test_eager_backend_uses_caller_client_and_returns_fresh_instance(settings):
+    settings.SHWARY = {**settings.SHWARY, "TASK_BACKEND": "dj_shwary.tasks.EagerBackend"}
+    user = User.objects.create(username="eager-client")
+    client = mock_shwary_client()
+
+    # Pas de patch de get_client : le client de l'appelant doit être utilisé
+    txn = ShwaryService(client=client).make_payment(
+        related_object=user, amount=5000, phone_number="+243972345678", defer=True
+    )
+
+    assert client.initiate_payment.call_count == 1
+    assert txn.shwary_id == "SHW-DEFER"
+    assert txn.error_message is None
+
+
+@pytest.mark.django_db
+def test_reclaimed_task_does_not_reinitiate():
+    user = User.objects.create(username="reclaim")
+    txn = ShwaryService(client=mock_shwary_client()).make_payment(
+        related_object=user, amount=5000, phone_number="+243972345678", defer=True
+    )
+    # Worker tué entre l'appel à l'API et l'enregistrement du résultat
+    ShwaryTransaction.objects.filter(pk=txn.pk).update(error_message=INITIATION_IN_FLIGHT)
+
+    client = mock_shwary_client()
+    with patch("dj_shwary.services.get_client", return_value=client):
+        initiate_payment(str(txn.pk), "DRC", None)
+        initiate_payment(str(txn.pk), "DRC", None)
+
+    assert not client.initiate_payment.called
+    txn.refresh_from_db()
+    assert txn.shwary_id is None
+    assert txn.error_message == INITIATION_INTERRUPTED
+
+
+@pytest.mark.django_db
+def test_check_pending_pay_skips_uninitiated_transactions():
+    user = User.objects.create(username="uninitiated")
+    queued = ShwaryService(client=mock_shwary_client()).make_payment(
+        related_object=user, amount=5000, phone_number="+243972345678", defer=True
+    )
+    interrupted = ShwaryTransaction.objects.create(
+        content_object=user, amount=10, error_message=INITIATION_INTERRUPTED
+    )
+    ShwaryTransaction.objects.filter(pk__in=[queued.pk, interrupted.pk]).update(
+        created_at=timezone.now() - timedelta(hours=1)
+    )
+
+    client = MagicMock()
+    out = StringIO()
+    with patch("dj_shwary.management.commands.check_pending_pay.get_client", return_value=client):
+        call_command("check_pending_pay", stdout=out)
+
+    assert not client.get_transaction.called
+    assert "Aucune transaction en attente" in out.getvalue()
+    assert "1 initiations différées interrompues" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_worker_touches_each_task_before_running_it():
+    first = ShwaryTask.objects.create(name="initiate_payment", kwargs={"n": 1})
+    second = ShwaryTask.objects.create(name="initiate_payment", kwargs={"n": 2})
+    started = []
+
+    def run(name, kwargs):
+        started.append(kwargs["n"])
+        if kwargs["n"] == 1:
+            # Pendant la première tâche, un autre worker reprend la seconde (jugée périmée)
+            ShwaryTask.objects.filter(pk=second.pk).update(updated_at=timezone.now())
+
+    with patch("dj_shwary.management.commands.shwary_worker.run_task", side_effect=run):
+        call_command("shwary_worker", once=True, batch_size=2, stdout=StringIO())
+
+    # La seconde tâche appartient désormais à l'autre worker : elle n'est pas rejouée ici
+    assert started == [1]
+    assert ShwaryTask.objects.filter(pk=second.pk, status=ShwaryTask.Status.RUNNING).exists()
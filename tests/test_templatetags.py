@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from dj_shwary.models import ShwaryTransaction
+from dj_shwary.templatetags.shwary_tags import shwary_cache_key, status_badge
+
+User = get_user_model()
+
+
+def test_badge_is_precomputed_and_customizable(settings):
+    assert status_badge("completed") is status_badge("COMPLETED")
+    assert "#10b981" in status_badge("completed")
+    assert "#374151" in status_badge("unknown")
+
+    settings.SHWARY = {**settings.SHWARY, "BADGE_COLORS": {"completed": "#000001"}}
+    assert "#000001" in status_badge("completed")
+
+
+@pytest.mark.django_db
+def test_bulk_badges_one_query():
+    users = [User.objects.create(username=f"u{i}") for i in range(5)]
+    for user in users[:3]:
+        ShwaryTransaction.objects.create(content_object=user, amount=100, status="completed")
+
+    template = Template(
+        "{% load shwary_tags %}{% shwary_badges users as rows %}"
+        "{% for user, badge in rows %}[{{ user.username }}:{{ badge }}]{% endfor %}"
+    )
+    with CaptureQueriesContext(connection) as ctx:
+        html = template.render(Context({"users": users}))
+
+    assert len(ctx.captured_queries) == 1
+    assert html.count("Completed") == 3
+    assert "[u4:]" in html
+
+
+@pytest.mark.django_db
+def test_cache_key_changes_with_status():
+    txn = ShwaryTransaction.objects.create(amount=100)
+    key = shwary_cache_key(txn)
+    assert key.startswith(f"{txn.pk}:pending:")
+
+    txn.status = ShwaryTransaction.Status.COMPLETED
+    txn.save()
+    assert shwary_cache_key(txn) != key
@@ -0,0 +1,134 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from dj_shwary import tracing
+from dj_shwary.models import ShwaryTrace, ShwaryTransaction
+from dj_shwary.services import ShwaryService
+
+User = get_user_model()
+
+
+class MemorySink:
+    def __init__(self):
+        self.traces = []
+
+    def emit(self, trace):
+        self.traces.append(trace)
+
+
+def trace_settings(sink, **extra):
+    return override_settings(SHWARY={
+        "MERCHANT_ID": "test_id",
+        "MERCHANT_KEY": "test_key",
+        "TRACE": True,
+        "TRACE_THRESHOLD_MS": 0,
+        "TRACE_SINKS": [sink],
+        **extra,
+    })
+
+
+def names(node):
+    return [node["name"]] + [name for child in node["children"] for name in names(child)]
+
+
+def api_response(status):
+    response = MagicMock()
+    response.status = status
+    response.model_dump.return_value = {"status": status}
+    return response
+
+
+def test_operation_is_noop_when_disabled():
+    with tracing.operation("webhook") as root:
+        assert root is None
+        with tracing.span("sql") as child:
+            assert child is None
+
+
+@pytest.mark.django_db
+def test_webhook_trace_has_upstream_lock_sql_and_receivers(client):
+    user = User.objects.create(username="traced")
+    ShwaryTransaction.objects.create(shwary_id="SHW-T1", content_object=user, amount=100)
+    sink = MemorySink()
+
+    with trace_settings(sink), patch("dj_shwary.views.ShwaryService") as MockService:
+        MockService.return_value.client.get_transaction.return_value = api_response("completed")
+        response = client.post(
+            reverse("dj_shwary:shwary-webhook"),
+            data=json.dumps({"id": "SHW-T1", "status": "completed"}),
+            content_type="application/json",
+        )
+
+    assert response.status_code == 200
+    [trace] = sink.traces
+    assert trace["name"] == "webhook"
+    assert trace["root"]["attrs"] == {"shwary_id": "SHW-T1", "status_code": 200}
+    spans = names(trace["root"])
+    for name in ("shwary.get_transaction", "lock.select_for_update", "signal.payment_status_changed",
+                 "signal.payment_success"):
+        assert name in spans
+    assert trace["sql_count"] >= 3
+    assert {"sql", "shwary", "lock", "signal"} <= set(trace["breakdown_ms"])
+
+    lock = next(c for c in trace["root"]["children"] if c["name"] == "lock.select_for_update")
+    assert [c["name"] for c in lock["children"]] == ["sql"]
+    assert lock["children"][0]["attrs"]["sql"].startswith("SELECT")
+
+
+@pytest.mark.django_db
+def test_nested_service_calls_share_one_trace():
+    user = User.objects.create(username="payer")
+    sink = MemorySink()
+    mock_client = MagicMock()
+    mock_client.initiate_payment.return_value = MagicMock(id="SHW-T2", status="pending")
+    mock_client.initiate_payment.return_value.model_dump.return_value = {"id": "SHW-T2"}
+
+    with trace_settings(sink):
+        ShwaryService(client=mock_client).make_payment(user, 100, "+243000000000", callback_url="https://x/cb")
+
+    [trace] = sink.traces
+    assert trace["name"] == "service.make_payment"
+    assert "service.initiate_payment" in names(trace["root"])
+    assert "shwary.initiate_payment" in names(trace["root"])
+
+
+@pytest.mark.django_db
+def test_fast_or_unsampled_operations_are_not_emitted():
+    sink = MemorySink()
+    with trace_settings(sink, TRACE_THRESHOLD_MS=10_000):
+        with tracing.operation("fast"):
+            ShwaryTransaction.objects.count()
+    with trace_settings(sink, TRACE_SAMPLE_RATE=0):
+        with tracing.operation("unsampled") as root:
+            assert root is None
+    assert sink.traces == []
+
+
+@pytest.mark.django_db
+def test_errors_are_recorded_and_sink_failures_swallowed():
+    sink = MemorySink()
+    broken = MagicMock()
+    broken.emit.side_effect = RuntimeError("sink down")
+
+    with trace_settings(sink, TRACE_SINKS=[broken, sink]):
+        with pytest.raises(ValueError):
+            with tracing.operation("failing"):
+                raise ValueError("boom")
+
+    [trace] = sink.traces
+    assert trace["root"]["attrs"]["error"] == "ValueError: boom"
+
+
+@pytest.mark.django_db
+def test_database_sink_stores_trace():
+    with trace_settings("dj_shwary.tracing.DatabaseSink"):
+        with tracing.operation("check_pending_pay.check", shwary_id="SHW-T3"):
+            ShwaryTransaction.objects.count()
+
+    stored = ShwaryTrace.objects.get()
+    assert stored.name == "check_pending_pay.check"
+    assert stored.sql_count == 1
+    assert stored.trace["root"]["attrs"] == {"shwary_id": "SHW-T3"}